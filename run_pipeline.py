@@ -2,21 +2,79 @@
 """
 Haupt-Pipeline-Skript für das Solar Activity Data Wrangling Projekt
 
-Dieses Skript orchestriert die gesamte Datenverarbeitungspipeline:
-1. Import & Bereinigung (cleaning.py)
-2. Transformation & Merge (cleaning.py)
-3. Visualisierung (visualization.py)
+Dieses Skript orchestriert die gesamte Datenverarbeitungspipeline als
+Abhängigkeitsgraph von Stufen (siehe scripts/stages.py und scripts/scheduler.py):
+
+    Rohdaten → Tagesdaten → Monatsdaten/Pyramide → Master → Korrelationen → Plots
+
+Jede Stufe deklariert ihre Ein- und Ausgabedateien und wird nur ausgeführt,
+wenn sich eine Eingabe (Rohdatei, Zwischenergebnis oder Skript) inhaltlich
+geändert hat oder eine Ausgabe fehlt. Unabhängige Stufen laufen parallel.
 
 Ausführung:
-    python run_pipeline.py
+    python run_pipeline.py                      # nur veraltete Stufen
+    python run_pipeline.py --no-csv             # keine CSV-Dateien
+    python run_pipeline.py --force              # alle Stufen neu
+    python run_pipeline.py --only rolling       # eine Stufe (+ veraltete Vorgänger)
+    python run_pipeline.py --no-significance    # ohne Bootstrap/Surrogate (schnell)
+    python run_pipeline.py --force --profile    # mit cProfile-Dumps pro Stufe
+
+Jeder Lauf schreibt einen Laufbericht (Zeiten, Speicher, Zeilen pro Stufe)
+nach data/results/run_report.json (siehe scripts/instrumentation.py).
 """
 
+import argparse
 import sys
-import subprocess
 import os
 from pathlib import Path
 
-def main():
+SCRIPTS_DIR = Path(__file__).parent.absolute() / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+
+def run_step(step_name, func, *args):
+    """Führt einen Pipeline-Schritt aus und bricht bei Fehlern ab."""
+    print(f"\n{'='*70}")
+    print(f"Schritt: {step_name}")
+    print(f"{'='*70}\n")
+
+    try:
+        result = func(*args)
+    except Exception as e:
+        print(f"\n✗ FEHLER in {step_name}: {e}")
+        sys.exit(1)
+    print(f"\n✓ {step_name} erfolgreich abgeschlossen")
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solar Activity Data Wrangling – Pipeline")
+    parser.add_argument("--no-csv", action="store_true",
+                        help="Keine CSV-Dateien nach data/processed und data/results schreiben")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Rohdaten immer neu parsen, data/cache nicht verwenden")
+    parser.add_argument("--rebuild-cache", action="store_true",
+                        help="Cache-Einträge verwerfen und aus den Rohdaten neu aufbauen")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Nur seit dem letzten Lauf angehängte Rohdaten parsen (Wasserzeichen)")
+    parser.add_argument("--serial", action="store_true",
+                        help="Quellen und Abbildungen nacheinander statt parallel verarbeiten")
+    parser.add_argument("--no-significance", action="store_true",
+                        help="Keine Konfidenzintervalle und p-Werte (Block-Bootstrap, Surrogate) berechnen")
+    parser.add_argument("--figures", nargs="+", metavar="FIGURE",
+                        help="Nur diese Abbildungen erstellen (siehe visualization.FIGURES)")
+    parser.add_argument("--force-plots", action="store_true",
+                        help="Alle Abbildungen neu rendern, auch wenn die Eingaben unverändert sind")
+    parser.add_argument("--force", action="store_true",
+                        help="Stufen ausführen, auch wenn sie aktuell sind (alle bzw. die aus --only)")
+    parser.add_argument("--only", nargs="+", metavar="STAGE",
+                        help="Nur diese Stufen (und ihre veralteten Vorgänger) ausführen")
+    parser.add_argument("--profile", action="store_true",
+                        help="cProfile-Dump pro Stufe nach data/results/profiles/ schreiben")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Speicherspitze pro Stufe mit tracemalloc messen (langsamer)")
+    args = parser.parse_args(argv)
+
     # Stelle sicher, dass wir im Hauptverzeichnis des Projekts sind
     # Finde das Verzeichnis, in dem dieses Skript liegt
     script_dir = Path(__file__).parent.absolute()
@@ -26,36 +84,55 @@ def main():
     print("SOLAR ACTIVITY DATA WRANGLING - PIPELINE")
     print("="*70)
     print(f"Working Directory: {os.getcwd()}")
-    
-    scripts = [
-        ("Import & Bereinigung", "scripts/cleaning.py"),
-        ("Visualisierung", "scripts/visualization.py")
-    ]
-    
-    for step_name, script in scripts:
-        print(f"\n{'='*70}")
-        print(f"Schritt: {step_name}")
-        print(f"Skript: {script}")
-        print(f"{'='*70}\n")
-        
-        if not os.path.exists(script):
-            print(f"FEHLER: Skript '{script}' nicht gefunden!")
-            sys.exit(1)
-        
-        try:
-            result = subprocess.run(
-                [sys.executable, script],
-                check=True,
-                capture_output=False
-            )
-            print(f"\n✓ {step_name} erfolgreich abgeschlossen")
-        except subprocess.CalledProcessError as e:
-            print(f"\n✗ FEHLER in {step_name}: {e}")
-            sys.exit(1)
-        except FileNotFoundError:
-            print(f"\n✗ FEHLER: Python nicht gefunden. Bitte installieren Sie Python.")
-            sys.exit(1)
-    
+
+    import cleaning
+    import instrumentation
+    import scheduler
+    import stages
+    import visualization
+
+    unknown = set(args.only or ()) - set(stages.STAGE_NAMES)
+    if unknown:
+        parser.error(f"Unbekannte Stufe(n): {', '.join(sorted(unknown))} "
+                     f"(verfügbar: {', '.join(stages.STAGE_NAMES)})")
+    unknown = set(args.figures or ()) - set(visualization.FIGURES)
+    if unknown:
+        parser.error(f"Unbekannte Abbildung(en): {', '.join(sorted(unknown))} "
+                     f"(verfügbar: {', '.join(visualization.FIGURES)})")
+
+    options = {
+        "write_csv": not args.no_csv,
+        "use_cache": not args.no_cache,
+        "rebuild_cache": args.rebuild_cache,
+        "incremental": args.incremental,
+        "parallel": not args.serial,
+        "significance": not args.no_significance,
+        "figures": args.figures,
+        "force_plots": args.force_plots,
+    }
+    pipeline = stages.build_stages(options)
+    force = set()
+    if args.force:
+        force |= set(args.only or stages.STAGE_NAMES)
+    if args.rebuild_cache:
+        force |= {name for name in stages.STAGE_NAMES if name.startswith("load_")}
+    if args.force_plots:
+        force.add("plots")
+
+    run_info = instrumentation.start_run(profile=args.profile, trace_memory=args.trace_memory)
+    try:
+        report = run_step("Stufen", scheduler.run_stages, pipeline, args.only, force, not args.serial)
+    finally:
+        run_report = instrumentation.finish_run(run_info, argv)
+
+    print(f"\n{'Stufe':<16} {'Status':<12} {'Zeit':>8}")
+    for name, (status, seconds) in report.items():
+        print(f"{name:<16} {status:<12} {seconds:7.2f}s")
+
+    if any(status == "ausgeführt" for status, _ in report.values()):
+        cleaning.print_summary(stages.summary_results())
+        instrumentation.print_report(run_report)
+
     print("\n" + "="*70)
     print("PIPELINE ERFOLGREICH ABGESCHLOSSEN")
     print("="*70)
@@ -74,11 +151,26 @@ def main():
     print("    * correlation_matrix_main.csv")
     print("    * correlation_lags_kp.csv")
     print("    * correlation_lags_ap.csv")
+    print("    * lag_spectrum_monthly.csv")
+    print("    * lag_spectrum_daily.csv")
+    print("    * rolling_correlation_monthly.csv")
+    print("    * rolling_correlation_daily.csv")
+    print("    * storm_events.csv")
+    print("    * superposed_epoch_daily.csv")
+    print("    * recurrence_daily.csv")
+    print("    * bartels_rotations.csv")
+    print("    * coherence_daily.csv")
+    print("    * coherence_monthly.csv")
+    print("    * forecast_skill_monthly.csv")
     print("  - Visualisierungen (plots/):")
     print("    * timeseries_all_variables.png")
     print("    * correlation_scatterplots.png")
     print("    * correlation_heatmap.png")
     print("    * lag_correlations_kp.png")
+    print("    * rolling_correlation.png")
+    print("    * timeseries_daily.png")
+    print("    * superposed_epoch.png")
+    print("    * coherence.png")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,172 @@
+"""
+Aggregations-Pyramide: mehrere Zeitauflösungen aus den Tagesdaten in einem Durchgang
+
+Für jede Quelle werden die Tagesdaten einmal in ganzzahlige Tagesnummern
+(Tage seit 1970-01-01) umgerechnet. Daraus ergeben sich die Gruppencodes jeder
+Auflösung durch reine Ganzzahl-Arithmetik (Woche, Carrington-Rotation, Monat,
+Quartal, Jahr). Jede Auflösung kostet danach nur noch eine ``np.bincount``-
+Reduktion pro Spalte, nicht einen weiteren ``resample``-Durchgang.
+
+Regeln pro Spalte wie bisher: ``n_obs`` wird summiert, alle anderen Spalten
+gemittelt (NaN werden ignoriert, leere Perioden ergeben NaN bzw. 0 bei Summen).
+Als Regel ist außerdem ``"median"`` möglich (einmal nach Periode und Wert
+sortiert, danach Zugriff auf die mittleren Positionen jeder Periode).
+
+Carrington-Rotationen werden aus der Spalte ``fluxcarrington`` von F10.7
+abgeleitet: Rotationsnummer und Tagesnummer hängen linear zusammen, die
+Gerade wird einmal angepasst und für alle Quellen (auch vor 2004) verwendet.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Aggregationsregeln pro Spalte (alle Quellen)
+AGG_RULES = {
+    "sn": "mean",
+    "sn_std": "mean",
+    "n_obs": "sum",  # Summe der Beobachtungen pro Periode
+    "fluxobsflux": "mean",
+    "fluxadjflux": "mean",
+    "fluxursi": "mean",
+    "kp": "mean",
+    "ap": "mean",
+}
+
+RESOLUTIONS = ["weekly", "carrington", "monthly", "quarterly", "yearly"]
+
+# Carrington-Rotation als lineare Funktion der Tagesnummer (Fallback, falls
+# keine fluxcarrington-Werte vorliegen; angepasst an fluxtable.txt 2004-2025)
+CARRINGTON_PERIOD_DAYS = 27.2756
+CARRINGTON_AT_EPOCH = 1556.267  # Rotationsnummer am 1970-01-01
+
+
+def day_numbers(dates):
+    """Tage seit 1970-01-01 als int64."""
+    return np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+
+
+def carrington_model(f107_daily=None):
+    """
+    (Rotation am 1970-01-01, Rotationen pro Tag) aus ``fluxcarrington``.
+
+    Ohne F10.7-Daten werden die Standardwerte verwendet.
+    """
+    if f107_daily is not None and "fluxcarrington" in f107_daily:
+        valid = f107_daily["fluxcarrington"].notna().to_numpy()
+        if valid.sum() >= 2:
+            days = day_numbers(f107_daily["date"].to_numpy()[valid])
+            slope, intercept = np.polyfit(days, f107_daily["fluxcarrington"].to_numpy()[valid], 1)
+            return intercept, slope
+    return CARRINGTON_AT_EPOCH, 1.0 / CARRINGTON_PERIOD_DAYS
+
+
+def group_codes(days, resolution, carrington=None):
+    """Ganzzahliger Periodencode pro Tag (fortlaufend über alle Quellen)."""
+    if resolution == "weekly":
+        return (days + 3) // 7  # Wochen ab Montag (1970-01-01 war ein Donnerstag)
+    if resolution == "carrington":
+        intercept, slope = carrington or carrington_model()
+        return np.floor(intercept + slope * days).astype(np.int64)
+
+    months = np.asarray(days, dtype="datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    if resolution == "monthly":
+        return months
+    if resolution == "quarterly":
+        return months // 3
+    if resolution == "yearly":
+        return months // 12
+    raise ValueError(f"Unbekannte Auflösung: {resolution}")
+
+
+def period_start(codes, resolution, carrington=None):
+    """Startdatum jeder Periode (datetime64[ns])."""
+    if resolution == "weekly":
+        days = codes * 7 - 3
+    elif resolution == "carrington":
+        intercept, slope = carrington or carrington_model()
+        days = np.ceil((codes - intercept) / slope).astype(np.int64)
+    else:
+        months = {"monthly": 1, "quarterly": 3, "yearly": 12}[resolution] * codes
+        return months.astype("datetime64[M]").astype("datetime64[ns]")
+    return days.astype("datetime64[D]").astype("datetime64[ns]")
+
+
+def _median(idx, values, size):
+    """Median pro Periode ``idx`` (0 .. size - 1); leere Perioden ergeben NaN."""
+    if len(values) == 0:
+        return np.full(size, np.nan)
+    ordered = values[np.lexsort((values, idx))]
+    counts = np.bincount(idx, minlength=size)
+    first = np.cumsum(counts) - counts
+    # leere Perioden: Positionen begrenzen, Ergebnis wird danach durch NaN ersetzt
+    lo = np.minimum(first + (counts - 1) // 2, len(ordered) - 1)
+    hi = np.minimum(first + counts // 2, len(ordered) - 1)
+    return np.where(counts > 0, (ordered[lo] + ordered[hi]) / 2, np.nan)
+
+
+def _reduce(frame, codes, start, size, rules):
+    """bincount-Reduktion aller Spalten eines Frames auf ``size`` Perioden ab Code ``start``."""
+    idx = codes - start
+    out = {}
+    for col, rule in rules.items():
+        if col not in frame:
+            continue
+        s = frame[col]
+        values = s.to_numpy(dtype=float, na_value=np.nan)
+        valid = ~np.isnan(values)
+        sums = np.bincount(idx[valid], weights=values[valid], minlength=size)
+        if rule == "sum":
+            integer = pd.api.types.is_integer_dtype(s.dtype)
+            out[col] = pd.array(np.rint(sums).astype(np.int64), dtype=s.dtype) if integer else sums
+        elif rule == "median":
+            out[col] = _median(idx[valid], values[valid], size)
+        else:
+            counts = np.bincount(idx[valid], minlength=size)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out[col] = sums / counts
+    return out
+
+
+def _aggregate_days(frames, days, resolution, rules, carrington):
+    """Wie ``aggregate``, aber mit bereits berechneten Tagesnummern pro Frame."""
+    codes = [group_codes(d, resolution, carrington) for d in days]
+    non_empty = [c for c in codes if len(c)]
+    if not non_empty:
+        return pd.DataFrame({"date": pd.Series([], dtype="datetime64[ns]")})
+    start = min(c.min() for c in non_empty)
+    stop = max(c.max() for c in non_empty)
+    period = np.arange(start, stop + 1)
+
+    data = {"date": period_start(period, resolution, carrington)}
+    if resolution == "carrington":
+        data["rotation"] = period
+    for frame, c in zip(frames, codes):
+        data.update(_reduce(frame, c, start, len(period), rules))
+    return pd.DataFrame(data)
+
+
+def aggregate(frames, resolution, rules=AGG_RULES, carrington=None):
+    """
+    Aggregiert einen oder mehrere Tages-Frames (Spalte ``date``) auf ``resolution``.
+
+    Alle Frames landen auf demselben lückenlosen Periodenraster (vom frühesten
+    bis zum spätesten Datum aller Frames). Gibt einen DataFrame mit ``date``
+    (Periodenbeginn), bei Carrington zusätzlich ``rotation``, und den Spalten
+    aus ``rules`` zurück.
+    """
+    days = [day_numbers(f["date"].to_numpy()) for f in frames]
+    return _aggregate_days(frames, days, resolution, rules, carrington)
+
+
+def build_pyramid(frames, resolutions=RESOLUTIONS, rules=AGG_RULES, carrington=None):
+    """
+    Baut alle Auflösungen für die gegebenen Tages-Frames.
+
+    Die Tagesnummern werden pro Quelle nur einmal berechnet; jede Auflösung
+    kostet danach eine Reduktion. Gibt ein dict ``{auflösung: DataFrame}`` zurück.
+    """
+    days = [day_numbers(f["date"].to_numpy()) for f in frames]
+    return {
+        resolution: _aggregate_days(frames, days, resolution, rules, carrington)
+        for resolution in resolutions
+    }
@@ -0,0 +1,44 @@
+"""
+Gemeinsame Hilfsfunktionen für gestapelte Berechnungen (Prozesspool, Quantile)
+
+- ``run_jobs``: unabhängige Jobs in einem Prozesspool (höchstens ein Prozess
+  pro CPU; seriell bei einem Job, einer CPU oder ``parallel=False``). Die
+  Ergebnisse kommen in der Reihenfolge der Jobs zurück.
+- ``quantiles``: Quantile entlang Achse 0 ohne NaN, vektorisiert über alle
+  übrigen Achsen.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+def run_jobs(func, jobs, parallel=True):
+    """Ruft ``func(*job)`` für alle Jobs auf (Prozesspool, falls sinnvoll)."""
+    workers = min(len(jobs), os.cpu_count() or 1)
+    if not parallel or workers <= 1:
+        return [func(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(func, *zip(*jobs)))
+
+
+def quantiles(values, probs):
+    """
+    Quantile entlang Achse 0 ohne NaN (linear interpoliert wie ``np.nanquantile``).
+
+    Vektorisiert über alle übrigen Achsen (``np.nanquantile`` läuft pro Spalte).
+    Gibt eine Liste mit einem Array pro Wahrscheinlichkeit in ``probs`` zurück.
+    """
+    ordered = np.sort(values, axis=0)  # NaN ans Ende
+    count = (~np.isnan(values)).sum(axis=0)
+    result = []
+    for prob in probs:
+        pos = np.maximum(count - 1, 0) * prob
+        lo = np.floor(pos).astype(int)
+        hi = np.minimum(lo + 1, np.maximum(count - 1, 0))
+        a = np.take_along_axis(ordered, lo[None], axis=0)[0]
+        b = np.take_along_axis(ordered, hi[None], axis=0)[0]
+        q = a + (b - a) * (pos - lo)
+        result.append(np.where(count > 0, q, np.nan))
+    return result
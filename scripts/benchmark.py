@@ -0,0 +1,225 @@
+"""
+Benchmark der Pipeline mit synthetischen Rohdaten in mehreren Größen
+
+Für jede Größe (Standard: 1×, 10×, 100× der mitgelieferten Dateien) werden
+synthetische Rohdaten erzeugt (``synthetic_data.py``, zwischengespeichert
+unter ``data/cache/benchmark/<n>x/``) und die Pipeline einmal vollständig
+darauf ausgeführt: Einlesen ohne Cache, Tagesaggregation, Resampling, Merge,
+Lags, Korrelationen, rollende Korrelationen, Schreiben der Ausgaben und alle
+Abbildungen. Die Zeiten und Zeilenzahlen pro Stufe stammen aus
+``instrumentation.py``; jede Größe läuft in einem frischen Prozess, damit
+der Peak-RSS nicht von der vorherigen Größe verfälscht wird.
+
+Ausgabe pro Größe und Stufe: Wall-Zeit, Zeilen hinein, Durchsatz (Zeilen/s)
+und Peak-RSS (mit ``--trace-memory`` zusätzlich die tracemalloc-Spitze).
+Das Ergebnis wird nach ``data/results/benchmark_latest.json`` geschrieben;
+``--save-baseline`` speichert es als ``data/results/benchmark_baseline.json``.
+Existiert eine Baseline, wird jeder weitere Lauf mit ihr verglichen.
+
+Ausführung (vom Hauptverzeichnis):
+    python scripts/benchmark.py                     # 1×, 10×, 100×
+    python scripts/benchmark.py --scales 1 10       # nur diese Größen
+    python scripts/benchmark.py --save-baseline     # als Baseline speichern
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import cache
+import cleaning
+import instrumentation
+import synthetic_data
+import visualization
+
+SCALES = [1, 10, 100]
+BENCH_DIR = "data/cache/benchmark"
+LATEST_PATH = f"{cleaning.RESULTS_DIR}/benchmark_latest.json"
+BASELINE_PATH = f"{cleaning.RESULTS_DIR}/benchmark_baseline.json"
+
+# Stufen, deren Zeit sich gegenüber der Baseline um mehr als diesen Faktor
+# und um mindestens NOISE_FLOOR_S Sekunden verschlechtert, werden markiert
+SLOWDOWN_THRESHOLD = 1.10
+NOISE_FLOOR_S = 0.05
+
+
+def summarize(records):
+    """Fasst die Einträge des Laufberichts pro Stufenname zusammen."""
+    stages = {}
+    for r in records:
+        s = stages.setdefault(r["stage"], {
+            "calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "rows_in": None, "rows_out": None,
+            "peak_rss_mb": 0.0, "dropped": {},
+        })
+        s["calls"] += 1
+        s["wall_s"] += r["wall_s"]
+        s["cpu_s"] += r["cpu_s"]
+        for key in ("rows_in", "rows_out"):
+            if r[key] is not None:
+                s[key] = (s[key] or 0) + r[key]
+        s["peak_rss_mb"] = max(s["peak_rss_mb"], r["peak_rss_mb"])
+        if "tracemalloc_peak_mb" in r:
+            s["tracemalloc_peak_mb"] = max(s.get("tracemalloc_peak_mb", 0.0), r["tracemalloc_peak_mb"])
+        for mask, count in r["dropped"].items():
+            s["dropped"][mask] = s["dropped"].get(mask, 0) + count
+    for s in stages.values():
+        s["rows_per_s"] = s["rows_in"] / s["wall_s"] if s["rows_in"] and s["wall_s"] > 0 else None
+    return stages
+
+
+def run_scale(scale, meta, plots=True, trace_memory=False):
+    """
+    Führt die Pipeline auf den synthetischen Daten einer Größe aus.
+
+    Läuft in einem eigenen Prozess (siehe ``main``); Ausgaben landen unter
+    ``data/cache/benchmark/<n>x/out/``. Gibt das Ergebnis der Größe zurück.
+    """
+    out = Path(BENCH_DIR) / f"{scale}x" / "out"
+    dirs = {name: out / name for name in ("processed", "results", "plots")}
+    for d in dirs.values():
+        d.mkdir(parents=True, exist_ok=True)
+
+    paths = meta["paths"]
+    run_info = instrumentation.start_run(results_dir=dirs["results"], trace_memory=trace_memory)
+    try:
+        results = cleaning.run(paths["sunspots"], paths["f107"], paths["kp"],
+                               use_cache=False, parallel=False)
+        with instrumentation.stage("write_outputs"):
+            cleaning.write_outputs(results, dirs["processed"], dirs["results"])
+        if plots:
+            inputs = {
+                "master": results["merged_monthly"],
+                "rolling_monthly": results["rolling_corr_monthly"],
+                "rolling_daily": results["rolling_corr_daily"],
+                "daily": visualization.daily_frame(
+                    [results[k] for k in ("sn_clean", "f107_daily", "kp_daily")]),
+                "epoch": results["epoch_curves"],
+                "coherence_daily": results["coherence_daily"],
+                "coherence_monthly": results["coherence_monthly"],
+            }
+            for name in visualization.FIGURES:
+                visualization.render_figure(name, inputs, str(dirs["plots"]))
+    finally:
+        report = instrumentation.finish_run(run_info, [f"benchmark {scale}x"])
+
+    return {
+        "scale": scale,
+        "rows": meta["rows"],
+        "bytes": meta["bytes"],
+        "rows_per_day": meta["rows_per_day"],
+        "start": meta["start"],
+        "wall_s": report["wall_s"],
+        "peak_rss_mb": instrumentation._peak_rss_mb(),
+        "stages": summarize(report["stages"]),
+    }
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "cleaning_sha256": cache.file_hash("scripts/cleaning.py"),
+    }
+
+
+def _fmt(value, spec):
+    return "" if value is None else format(value, spec)
+
+
+def print_scale(result):
+    rows = result["rows"]
+    print(f"\n=== {result['scale']}× – Sunspots {rows['sunspots']:,} Zeilen, "
+          f"F10.7 {rows['f107']:,} ({result['rows_per_day']['f107']}/Tag), "
+          f"Kp {rows['kp']:,} ({result['rows_per_day']['kp']}/Tag) ===")
+    print(f"{'Stufe':<26} {'Wall':>9} {'rein':>12} {'Zeilen/s':>12} {'RSS MB':>8} {'tracemalloc':>11}")
+    for name, s in result["stages"].items():
+        print(f"{name:<26} {s['wall_s']:8.3f}s {_fmt(s['rows_in'], ',d'):>12} "
+              f"{_fmt(s['rows_per_s'], ',.0f'):>12} {s['peak_rss_mb']:8.1f} "
+              f"{_fmt(s.get('tracemalloc_peak_mb'), '.1f'):>11}")
+    total_rows = sum(rows.values())
+    print(f"Gesamt: {result['wall_s']:.2f} s, {total_rows / result['wall_s']:,.0f} Rohzeilen/s, "
+          f"Peak-RSS {result['peak_rss_mb']:.0f} MB")
+
+
+def compare(current, baseline):
+    """Vergleicht die Stufenzeiten mit der Baseline (gleiche Größe und Stufe)."""
+    before = {r["scale"]: r for r in baseline["results"]}
+    print(f"\n=== Vergleich mit Baseline vom {baseline['created']} ===")
+    if not any(r["scale"] in before for r in current["results"]):
+        print(f"Baseline enthält keine der gemessenen Größen ({', '.join(f'{s}×' for s in before)})")
+        return
+    if baseline["environment"]["cleaning_sha256"] != current["environment"]["cleaning_sha256"]:
+        print("(scripts/cleaning.py wurde seit der Baseline geändert)")
+    print(f"{'Größe':>6} {'Stufe':<26} {'Baseline':>9} {'jetzt':>9} {'Faktor':>7}")
+    for result in current["results"]:
+        old = before.get(result["scale"])
+        if old is None:
+            continue
+        for name, s in result["stages"].items():
+            if name not in old["stages"] or old["stages"][name]["wall_s"] <= 0:
+                continue
+            before_s = old["stages"][name]["wall_s"]
+            ratio = s["wall_s"] / before_s
+            slower = ratio > SLOWDOWN_THRESHOLD and s["wall_s"] - before_s > NOISE_FLOOR_S
+            flag = "  langsamer" if slower else ""
+            print(f"{result['scale']:>5}× {name:<26} {before_s:8.3f}s "
+                  f"{s['wall_s']:8.3f}s {ratio:7.2f}{flag}")
+        print(f"{result['scale']:>5}× {'Gesamt':<26} {old['wall_s']:8.3f}s {result['wall_s']:8.3f}s "
+              f"{result['wall_s'] / old['wall_s']:7.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark der Pipeline mit synthetischen Rohdaten")
+    parser.add_argument("--scales", nargs="+", type=int, default=SCALES, metavar="N",
+                        help="Größen als Vielfaches der mitgelieferten Rohdaten (Standard: 1 10 100)")
+    parser.add_argument("--seed", type=int, default=0, help="Startwert der Zufallsdaten")
+    parser.add_argument("--no-plots", action="store_true", help="Abbildungen nicht messen")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Speicherspitze pro Stufe mit tracemalloc messen (langsamer)")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help=f"Ergebnis als Baseline speichern ({BASELINE_PATH})")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline für den Vergleich")
+    args = parser.parse_args(argv)
+
+    results = []
+    for scale in args.scales:
+        print(f"Erzeuge synthetische Rohdaten {scale}× ...")
+        meta = synthetic_data.generate(Path(BENCH_DIR) / f"{scale}x", scale, args.seed)
+        # frischer Prozess pro Größe (Peak-RSS, keine warmen Caches)
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            result = pool.submit(run_scale, scale, meta, not args.no_plots, args.trace_memory).result()
+        print_scale(result)
+        results.append(result)
+
+    current = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "seed": args.seed,
+        "environment": environment(),
+        "results": results,
+    }
+    Path(cleaning.RESULTS_DIR).mkdir(parents=True, exist_ok=True)
+    Path(LATEST_PATH).write_text(json.dumps(current, indent=2))
+    print(f"\nErgebnis: {LATEST_PATH}")
+
+    if args.save_baseline:
+        Path(args.baseline).write_text(json.dumps(current, indent=2))
+        print(f"Baseline gespeichert: {args.baseline}")
+    elif os.path.exists(args.baseline):
+        compare(current, json.loads(Path(args.baseline).read_text()))
+    return current
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Cache für geparste Rohdaten
+
+Die bereinigten Tages-DataFrames (sn_clean, f107_daily, kp_daily) werden pro
+Rohdatei in einem binären, spaltenweisen Format (unkomprimiertes .npz, ein
+NumPy-Array pro Spalte) unter data/cache/ abgelegt. Der Schlüssel ist der
+SHA-256-Hash des Dateiinhalts; Größe und mtime dienen nur als Abkürzung, damit
+unveränderte Dateien nicht bei jedem Lauf neu gehasht werden müssen.
+
+Pro Quelle werden höchstens ``CACHE_KEEP`` Einträge behalten (zuletzt benutzte
+zuerst), ältere werden beim Schreiben gelöscht.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = "data/cache"
+
+# Erhöhen, wenn sich die Loader in cleaning.py so ändern, dass alte Einträge ungültig werden
+CACHE_VERSION = 6
+
+# Anzahl Einträge pro Quelle, die behalten werden
+CACHE_KEEP = 2
+
+
+def _atomic_write(path, write):
+    """Schreibt über eine temporäre Datei und benennt sie danach atomar um."""
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-256 des Dateiinhalts."""
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def fingerprint(name, path, cache_dir=CACHE_DIR):
+    """
+    Inhalts-Hash der Rohdatei ``path``.
+
+    Der letzte bekannte Stand (Größe, mtime, Hash) wird in
+    ``<cache_dir>/<name>.fingerprint.json`` gemerkt; stimmen Größe und mtime
+    überein, wird der gespeicherte Hash ohne erneutes Lesen verwendet.
+    """
+    stat = os.stat(path)
+    sidecar = Path(cache_dir) / f"{name}.fingerprint.json"
+    if sidecar.exists():
+        known = json.loads(sidecar.read_text())
+        if known.get("size") == stat.st_size and known.get("mtime_ns") == stat.st_mtime_ns:
+            return known["sha256"]
+
+    digest = file_hash(path)
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    info = {"path": str(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}
+    _atomic_write(sidecar, lambda tmp: tmp.write_text(json.dumps(info)))
+    return digest
+
+
+# -------------------------
+# DataFrame <-> .npz
+# -------------------------
+def save_frame(df, path):
+    """Speichert einen DataFrame spaltenweise als .npz (ohne Pickle)."""
+    arrays = {}
+    meta = []
+    for i, col in enumerate(df.columns):
+        s = df[col]
+        key = f"c{i}"
+        if pd.api.types.is_extension_array_dtype(s.dtype) and s.dtype.kind in "iufb":
+            # Nullable-Typen (z.B. Int64): Werte + NA-Maske
+            arrays[key] = s.to_numpy(dtype=s.dtype.numpy_dtype, na_value=0)
+            arrays[f"{key}_mask"] = s.isna().to_numpy()
+        elif pd.api.types.is_string_dtype(s.dtype):
+            arrays[key] = s.to_numpy().astype(str)
+        else:
+            arrays[key] = s.to_numpy()
+        meta.append({"name": col, "dtype": str(s.dtype)})
+
+    arrays["__meta__"] = np.array(json.dumps(meta))
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+    def write(tmp):
+        with open(tmp, "wb") as fh:
+            np.savez(fh, **arrays)
+
+    _atomic_write(Path(path), write)
+
+
+def load_frame(path):
+    """Lädt einen mit ``save_frame`` gespeicherten DataFrame."""
+    with np.load(path, allow_pickle=False) as npz:
+        meta = json.loads(str(npz["__meta__"]))
+        data = {}
+        for i, col in enumerate(meta):
+            key = f"c{i}"
+            values = npz[key]
+            if f"{key}_mask" in npz.files:
+                data[col["name"]] = pd.Series(values, dtype=col["dtype"]).mask(npz[f"{key}_mask"])
+            elif values.dtype.kind == "U":
+                data[col["name"]] = pd.Series(values, dtype=object).astype(col["dtype"])
+            else:
+                data[col["name"]] = values
+    return pd.DataFrame(data)
+
+
+# -------------------------
+# Cache-Zugriff
+# -------------------------
+def _entry_path(name, digest, cache_dir):
+    return Path(cache_dir) / f"{name}-v{CACHE_VERSION}-{digest[:16]}.npz"
+
+
+def is_cached(name, path, cache_dir=CACHE_DIR):
+    """True, wenn für den aktuellen Inhalt von ``path`` ein Eintrag existiert."""
+    return _entry_path(name, fingerprint(name, path, cache_dir), cache_dir).exists()
+
+
+def evict(name, cache_dir=CACHE_DIR, keep=CACHE_KEEP):
+    """Löscht alle bis auf die ``keep`` zuletzt benutzten Einträge von ``name``."""
+    entries = sorted(
+        Path(cache_dir).glob(f"{name}-v*.npz"),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True
+    )
+    for old in entries[keep:]:
+        old.unlink(missing_ok=True)
+
+
+def invalidate(name=None, cache_dir=CACHE_DIR):
+    """Entfernt alle Cache-Einträge (oder nur die der Quelle ``name``)."""
+    pattern = f"{name}-*" if name else "*"
+    for p in Path(cache_dir).glob(pattern):
+        if p.is_file():
+            p.unlink()
+    if name:
+        (Path(cache_dir) / f"{name}.fingerprint.json").unlink(missing_ok=True)
+
+
+def cached(name, path, loader, rebuild=False, cache_dir=CACHE_DIR, keep=CACHE_KEEP):
+    """
+    Gibt ``loader(path)`` zurück, bei unverändertem Inhalt von ``path`` aus dem Cache.
+
+    Mit ``rebuild=True`` wird der Eintrag unabhängig vom Cache neu berechnet
+    und überschrieben.
+    """
+    entry = _entry_path(name, fingerprint(name, path, cache_dir), cache_dir)
+    if entry.exists() and not rebuild:
+        os.utime(entry)  # als zuletzt benutzt markieren
+        return load_frame(entry)
+
+    df = loader(path)
+    save_frame(df, entry)
+    evict(name, cache_dir, keep)
+    return df
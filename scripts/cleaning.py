@@ -9,15 +9,21 @@ Dieses Skript führt folgende Schritte aus:
 
 2. Transformation (LE3):
    - Resampling auf monatliche Frequenz für alle Datensätze
+   - Aggregations-Pyramide (Woche, Carrington-Rotation, Monat, Quartal, Jahr)
    - Erstellung von Lag-Features (1, 3, 6 Monate)
 
 3. Verknüpfung (LE4):
    - Merge der drei Datensätze auf Tages- und Monatsebene
-   - Erstellung des Master-Datasets
+   - Erstellung des Master-Datasets (monatlich und täglich)
 
 4. Analyse (LE5):
    - Korrelationsanalyse (Pearson)
    - Korrelationen mit Lag-Features
+   - Lag-Spektren (0..60 Monate, 0..400 Tage) per FFT-Kreuzkorrelation
+   - Rollende Korrelationen (27 Tage, 1 Jahr, 1 Sonnenzyklus)
+
+Das Modul kann als Skript ausgeführt (``python scripts/cleaning.py``) oder
+importiert werden; ``run()`` liefert alle Zwischenergebnisse als DataFrames.
 
 Quellen:
 - Sunspots: https://www.sidc.be/SILSO/datafiles
@@ -25,317 +31,1003 @@ Quellen:
 - Kp/ap:    GFZ Helmholtz Centre for Geosciences (Kp_ap_since_1932.txt)
 """
 
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
 
+import aggregation
+import cache
+import forecasting
+import incremental
+import instrumentation
+import lag_correlation
+import rolling_correlation
+import recurrence
+import series_store
+import significance
+import spectral
+import superposed_epoch
+
+RAW_DIR = "data/raw"
+PROCESSED_DIR = "data/processed"
+RESULTS_DIR = "data/results"
+
+SN_PATH = f"{RAW_DIR}/SN_d_tot_V2.0.csv"
+F107_PATH = f"{RAW_DIR}/fluxtable.txt"
+KP_PATH = f"{RAW_DIR}/Kp_ap_since_1932.txt"
+
+# Lag-Variablen für Sunspots und F10.7 (1, 3, 6 Monate)
+LAG_MONTHS = [1, 3, 6]
+
+# Lag-Variablen im täglichen Master-Dataset (Tage; 27 = eine Sonnenrotation)
+LAG_DAYS = [1, 2, 3, 27, 54]
+
+# Hauptvariablen für Korrelationen
+CORR_VARS = ["sn", "fluxadjflux", "kp", "ap"]
+
+# Treiber/Ziele für die Lag-Spektren (alle Lags 0..N, siehe lag_correlation.py)
+LAG_DRIVERS = ["sn", "fluxadjflux"]
+LAG_TARGETS = ["kp", "ap"]
+
+# -------------------------
+# Loader
+# -------------------------
+# fluxtable.txt: fluxdate, fluxtime, fluxjulian, fluxcarrington, fluxobsflux, fluxadjflux, fluxursi
+F107_COLUMNS = ["fluxdate","fluxtime","fluxjulian","fluxcarrington","fluxobsflux","fluxadjflux","fluxursi"]
+F107_DTYPES = {
+    "fluxdate": "int64",     # YYYYMMDD
+    "fluxtime": "int64",     # hhmmss
+    "fluxjulian": "float64",
+    "fluxcarrington": "float64",
+    "fluxobsflux": "float64",
+    "fluxadjflux": "float64",
+    "fluxursi": "float64",
+}
+
+
+def _datetime_from_ints(ymd, hms):
+    """Baut datetime64 aus YYYYMMDD- und hhmmss-Ganzzahlen (ungültige Werte -> NaT)."""
+    year, month, day = ymd // 10000, ymd // 100 % 100, ymd % 100
+    month_start = ((year - 1970) * 12 + (month - 1)).astype("datetime64[M]")
+    days_in_month = ((month_start + 1).astype("datetime64[D]") - month_start.astype("datetime64[D]")).astype(int)
+    seconds = (hms // 10000) * 3600 + (hms // 100 % 100) * 60 + hms % 100
+
+    valid = (
+        (month >= 1) & (month <= 12) &
+        (day >= 1) & (day <= days_in_month) &
+        (hms >= 0) & (hms < 240000) & (hms // 100 % 100 < 60) & (hms % 100 < 60)
+    )
+    dt = (
+        month_start.astype("datetime64[D]") + (day - 1).astype("timedelta64[D]")
+    ).astype("datetime64[s]") + seconds.astype("timedelta64[s]")
+    dt[~valid] = np.datetime64("NaT")
+    return dt.astype("datetime64[ns]")
+
+
+def f107_header_lines(path):
+    """Anzahl Kopfzeilen von fluxtable.txt (Kopfzeile + Strichlinie oder keine)."""
+    with open(path) as fh:
+        header = fh.readline().split()
+    if header[:1] == ["fluxdate"]:
+        if header != F107_COLUMNS:
+            raise ValueError(f"Unerwartete Spalten in {path}: {header}")
+        return 2
+    return 0
+
+
+def load_f107(path):
+    """
+    Liest fluxtable.txt (F10.7) in einem vektorisierten Durchgang.
+
+    Die Datei hat ein festes Layout: Kopfzeile mit den Spaltennamen, Strichlinie,
+    danach sieben Spalten pro Messung (drei Messungen pro Tag). Die beiden Kopfzeilen
+    werden übersprungen, alle Spalten direkt mit festem dtype von der C-Engine
+    gelesen und ``datetime`` aus den Ganzzahlen fluxdate/fluxtime berechnet –
+    ohne Regex-Separator und ohne String-Operationen pro Zeile.
+
+    ``path`` darf auch ein Puffer mit Datenzeilen ohne Kopf sein (siehe incremental.py).
+    """
+    skip = f107_header_lines(path) if isinstance(path, (str, os.PathLike)) else 0
+
+    f107 = pd.read_csv(
+        path,
+        sep=r"\s+",
+        comment="#",
+        header=None,
+        names=F107_COLUMNS,
+        dtype=F107_DTYPES,
+        skiprows=skip
+    )
+    f107["datetime"] = _datetime_from_ints(
+        f107["fluxdate"].to_numpy(), f107["fluxtime"].to_numpy()
+    )
+    instrumentation.note(rows_in=len(f107), dropped={"datum_ungueltig": f107["datetime"].isna().sum()})
+    return f107.dropna(subset=["datetime"]).reset_index(drop=True)
+
+
+# Kp_ap_since_1932.txt: 30 Header-Zeilen mit #, dann 8 Zeilen pro Tag:
+# YYYY MM DD hh.h hh._m days days_m Kp ap D
+KP_COLUMNS = ["year","month","day","hour_start","hour_mid","days","days_mid","kp","ap","definitive"]
+KP_DTYPES = {
+    "year": "int64",
+    "month": "int64",
+    "day": "int64",
+    "kp": "float64",
+    "ap": "float64",
+    "definitive": "int64",
+}
+KP_CHUNKSIZE = 100_000  # Zeilen pro Block (~34 Jahre 3-stündlicher Werte)
+KP_HEADER_LINES = 30
+
+
+def load_kp_daily(path, chunksize=KP_CHUNKSIZE, header_lines=KP_HEADER_LINES, definitive_only=True):
+    """
+    Liest eine Kp/ap-Datei blockweise und aggregiert direkt auf Tagesmittel.
+
+    Pro Block werden nur definitive Werte (D=1) ohne Fehlkennung (-1) behalten und
+    je Tag Summe und Anzahl gebildet. Nur diese Teilsummen (eine Zeile pro Tag und
+    Block) werden gesammelt; der Rohdatensatz wird nie vollständig geladen. Tage,
+    die über eine Blockgrenze reichen, werden beim Zusammenfassen addiert.
+
+    Gibt einen DataFrame mit den Spalten date, kp, ap (Tagesmittel) zurück. Mit
+    ``definitive_only=False`` bleiben auch vorläufige Werte erhalten; die
+    zusätzliche Spalte ``definitive`` markiert Tage, deren Werte alle definitiv sind.
+    """
+    reader = pd.read_csv(
+        path,
+        sep=r"\s+",
+        comment="#",
+        header=None,
+        names=KP_COLUMNS,
+        usecols=list(KP_DTYPES),
+        dtype=KP_DTYPES,
+        skiprows=header_lines,  # 30 Header-Zeilen überspringen
+        chunksize=chunksize
+    )
+
+    partials, rows_in = [], 0
+    for chunk in reader:
+        kp = chunk["kp"].to_numpy()
+        ap = chunk["ap"].to_numpy()
+        # Missing values: -1.000 für Kp, -1 für ap; nur definitive Werte (D=1)
+        definitive = chunk["definitive"].to_numpy() == 1
+        kp_ok = (kp != -1.0) & ~np.isnan(kp)
+        ap_ok = (ap != -1) & ~np.isnan(ap)
+        mask = kp_ok & ap_ok
+        if definitive_only:
+            mask &= definitive
+        rows_in += len(chunk)
+        instrumentation.note(rows_in=rows_in, dropped={
+            "nicht_definitiv": (~definitive).sum() if definitive_only else 0,
+            "kp_fehlt": (~kp_ok).sum(), "ap_fehlt": (~ap_ok).sum()
+        })
+        ymd = (
+            chunk["year"].to_numpy() * 10000 +
+            chunk["month"].to_numpy() * 100 +
+            chunk["day"].to_numpy()
+        )
+        part = pd.DataFrame({"ymd": ymd[mask], "kp": kp[mask], "ap": ap[mask], "n": 1,
+                             "n_definitive": definitive[mask].astype(np.int64)})
+        partials.append(part.groupby("ymd").sum())
+
+    if partials:
+        sums = pd.concat(partials).groupby(level=0).sum()
+    else:
+        sums = pd.DataFrame({"kp": [], "ap": [], "n": [], "n_definitive": []},
+                            index=pd.Index([], dtype="int64"))
+
+    ymd = sums.index.to_numpy()
+    kp_daily = pd.DataFrame({
+        "date": _datetime_from_ints(ymd, np.zeros_like(ymd)),
+        "kp": sums["kp"].to_numpy() / sums["n"].to_numpy(),
+        "ap": sums["ap"].to_numpy() / sums["n"].to_numpy(),
+    })
+    if not definitive_only:
+        kp_daily["definitive"] = sums["n_definitive"].to_numpy() == sums["n"].to_numpy()
+    return (
+        kp_daily.dropna(subset=["date"])
+            .sort_values("date")
+            .reset_index(drop=True)
+    )
+
+
 # -------------------------
 # 1) SUNSPOTS laden + filtern
 # -------------------------
 cols_sn = ["year","month","day","year_frac","sn","sn_std","n_obs","definitive"]
-sn = pd.read_csv(
-    "data/raw/SN_d_tot_V2.0.csv",
-    sep=";", header=None, names=cols_sn,
-    na_values={"sn": [-1]}
-)
-sn["date"] = pd.to_datetime(sn[["year","month","day"]], errors="coerce")
-
-mask = (
-    sn["sn"].notna() &
-    sn["n_obs"].fillna(0) > 0 &
-    (sn["definitive"] == 1) &
-    sn["date"].notna()
-)
-sn_clean = (
-    sn.loc[mask, ["date","sn","sn_std","n_obs"]]
-      .sort_values("date")
-      .reset_index(drop=True)
-)
-sn_clean = sn_clean.astype({"n_obs": "Int64"})
-sn_clean["date_str"] = sn_clean["date"].dt.date.astype(str)  # YYYY-MM-DD
+
+
+def load_sunspots(path, definitive_only=True):
+    """
+    Liest SN_d_tot_V2.0.csv und behält nur definitive Tageswerte mit Beobachtungen.
+
+    Mit ``definitive_only=False`` bleiben auch vorläufige Werte erhalten und
+    die Spalte ``definitive`` markiert die definitiven Tage.
+    """
+    sn = pd.read_csv(
+        path,
+        sep=";", header=None, names=cols_sn,
+        na_values={"sn": [-1]}
+    )
+    sn["date"] = pd.to_datetime(sn[["year","month","day"]], errors="coerce")
+
+    mask = (
+        sn["sn"].notna() &
+        (sn["n_obs"].fillna(0) > 0) &
+        ((sn["definitive"] == 1) | (not definitive_only)) &
+        sn["date"].notna()
+    )
+    instrumentation.note(rows_in=len(sn), dropped={
+        "sn_fehlt": sn["sn"].isna().sum(),
+        "keine_beobachtungen": (sn["n_obs"].fillna(0) <= 0).sum(),
+        "nicht_definitiv": (sn["definitive"] != 1).sum() if definitive_only else 0,
+        "datum_ungueltig": sn["date"].isna().sum(),
+    })
+    columns = ["date","sn","sn_std","n_obs"]
+    if not definitive_only:
+        sn["definitive"] = sn["definitive"] == 1
+        columns.append("definitive")
+    sn_clean = (
+        sn.loc[mask, columns]
+          .sort_values("date")
+          .reset_index(drop=True)
+    )
+    return sn_clean.astype({"n_obs": "Int64"})
+
 
 # -------------------------
-# 2) F10.7 laden + Datum bauen
-#    Erwartetes Format mit Spalten:
-#    fluxdate, fluxtime, fluxjulian, fluxcarrington, fluxobsflux, fluxadjflux, fluxursi
+# 2) F10.7 auf Tagesebene aggregieren
 # -------------------------
-cols_f = ["fluxdate","fluxtime","fluxjulian","fluxcarrington","fluxobsflux","fluxadjflux","fluxursi"]
-
-# Datei kann Leerzeichen- oder Semikolon-getrennt sein, mit evtl. Headerlinien.
-f107 = pd.read_csv(
-    "data/raw/fluxtable.txt",               
-    sep=r"\s+|;", engine="python",
-    comment="#",
-    names=cols_f,
-    header=None
-)
-
-# Nur Zeilen behalten, wo fluxdate/fluxtime plausibel sind
-f107 = f107.dropna(subset=["fluxdate","fluxtime"])
-f107["fluxdate"] = f107["fluxdate"].astype(str).str.replace(r"\D","", regex=True)
-f107["fluxtime"] = f107["fluxtime"].astype(str).str.pad(6, fillchar="0")
-
-# Datum/Zeit parsen und Tagesdatum erzeugen
-f107["datetime"] = pd.to_datetime(
-    f107["fluxdate"] + f107["fluxtime"],
-    format="%Y%m%d%H%M%S",
-    errors="coerce"
-)
-f107 = f107.dropna(subset=["datetime"])
-f107["date"] = f107["datetime"].dt.normalize()
-f107["date_str"] = f107["date"].dt.date.astype(str)  # YYYY-MM-DD
-
-# Zahlenfelder sauber casten
-for c in ["fluxobsflux","fluxadjflux","fluxursi"]:
-    f107[c] = pd.to_numeric(f107[c], errors="coerce")
-
-# Auf Tagesebene mitteln (mehrere Messzeiten pro Tag)
-f107_daily = (
-    f107.groupby(["date","date_str"], as_index=False)[["fluxobsflux","fluxadjflux","fluxursi"]]
-        .mean(numeric_only=True)
-        .sort_values("date")
-)
+@instrumentation.measure("daily_aggregate_f107")
+def f107_to_daily(f107):
+    """Mittelt die Messungen aus load_f107() pro Tag (mehrere Messzeiten pro Tag)."""
+    f107 = f107.assign(date=f107["datetime"].dt.normalize())
+
+    # fluxcarrington bleibt für die Einteilung in Carrington-Rotationen erhalten
+    return (
+        f107.groupby("date", as_index=False, sort=True)
+            [["fluxcarrington","fluxobsflux","fluxadjflux","fluxursi"]]
+            .mean(numeric_only=True)
+    )
+
+
+def load_f107_daily(path):
+    """Liest fluxtable.txt und liefert Tagesmittel von F10.7."""
+    return f107_to_daily(load_f107(path))
+
 
 # -------------------------
-# 3) Kp/ap laden + auf Tagesebene aggregieren
+# 3b) Inkrementelles Einlesen (siehe incremental.py)
 # -------------------------
-# Format: Fixed-width, 30 Header-Zeilen mit #, dann: YYYY MM DD hh.h hh._m days days_m Kp ap D
-cols_kp = ["year","month","day","hour_start","hour_mid","days","days_mid","kp","ap","definitive"]
-
-kp_raw = pd.read_csv(
-    "data/raw/Kp_ap_since_1932.txt",
-    sep=r"\s+",  # whitespace-separated
-    comment="#",
-    header=None,
-    names=cols_kp,
-    skiprows=30  # 30 Header-Zeilen überspringen
-)
-
-# Datum aus Jahr/Monat/Tag erstellen
-kp_raw["date"] = pd.to_datetime(kp_raw[["year","month","day"]], errors="coerce")
-
-# Missing values: -1.000 für Kp, -1 für ap
-kp_raw["kp"] = pd.to_numeric(kp_raw["kp"], errors="coerce")
-kp_raw["ap"] = pd.to_numeric(kp_raw["ap"], errors="coerce")
-kp_raw.loc[kp_raw["kp"] == -1.000, "kp"] = pd.NA
-kp_raw.loc[kp_raw["ap"] == -1, "ap"] = pd.NA
-
-# Nur definitive Werte (D=1) und gültige Daten behalten
-mask_kp = (
-    (kp_raw["definitive"] == 1) &
-    (kp_raw["date"].notna()) &
-    (kp_raw["kp"].notna()) &
-    (kp_raw["ap"].notna())
-)
-
-kp_clean = (
-    kp_raw.loc[mask_kp, ["date","kp","ap"]]
-        .sort_values("date")
-        .reset_index(drop=True)
-)
-
-# Auf Tagesebene aggregieren (Mittelwert der 3-stündlichen Werte)
-kp_clean["date_str"] = kp_clean["date"].dt.date.astype(str)  # YYYY-MM-DD
-
-kp_daily = (
-    kp_clean.groupby(["date","date_str"], as_index=False)[["kp","ap"]]
-        .mean(numeric_only=True)
-        .sort_values("date")
-        .reset_index(drop=True)
-)
+def _row_keys(buffer, sep, date_cols, flag_col=None):
+    """(YYYYMMDD, definitiv?) pro Datenzeile; ohne Flag-Spalte gilt jede Zeile als definitiv."""
+    usecols = list(date_cols) + ([flag_col] if flag_col is not None else [])
+    rows = pd.read_csv(buffer, sep=sep, comment="#", header=None, usecols=usecols)
+    if len(date_cols) == 1:
+        ymd = rows[date_cols[0]].to_numpy()
+    else:
+        y, m, d = (rows[c].to_numpy() for c in date_cols)
+        ymd = y * 10000 + m * 100 + d
+    stable = rows[flag_col].to_numpy() == 1 if flag_col is not None else np.ones(len(rows), bool)
+    return ymd, stable
+
+
+INCREMENTAL_SOURCES = {
+    "sunspots": incremental.Source(
+        header_lines=lambda path: 0,
+        row_keys=lambda buf: _row_keys(buf, ";", [0, 1, 2], 7),
+        load_tail=load_sunspots,
+    ),
+    "f107": incremental.Source(
+        header_lines=f107_header_lines,
+        row_keys=lambda buf: _row_keys(buf, r"\s+", [0]),
+        load_tail=load_f107_daily,
+    ),
+    "kp": incremental.Source(
+        header_lines=lambda path: KP_HEADER_LINES,
+        row_keys=lambda buf: _row_keys(buf, r"\s+", [0, 1, 2], 9),
+        load_tail=lambda buf: load_kp_daily(buf, header_lines=0),
+    ),
+}
+
 
 # -------------------------
 # 4) Merge: Sunspots × F10.7 auf Datum
 # -------------------------
-merged = sn_clean.merge(
-    f107_daily,
-    on=["date","date_str"],
-    how="inner"  # nur Tage, die beide haben; ggf. "left" wenn alle Sunspot-Tage behalten werden sollen
-)
+def align_on_date(left, right, how="inner"):
+    """
+    Verknüpft zwei nach ``date`` sortierte DataFrames über ihren DatetimeIndex.
 
-# -------------------------
-# 5) Auf monatliche Frequenz resamplen
-# -------------------------
-# Setze date als Index für Resampling
-sn_monthly = (
-    sn_clean.set_index("date")
-        [["sn","sn_std","n_obs"]]
-        .resample("MS")  # MS = Month Start
-        .agg({
-            "sn": "mean",
-            "sn_std": "mean",
-            "n_obs": "sum"  # Summe der Beobachtungen pro Monat
-        })
-        .reset_index()
-)
-sn_monthly["date_str"] = sn_monthly["date"].dt.date.astype(str)
-
-f107_monthly = (
-    f107_daily.set_index("date")
-        [["fluxobsflux","fluxadjflux","fluxursi"]]
-        .resample("MS")
-        .mean()
-        .reset_index()
-)
-f107_monthly["date_str"] = f107_monthly["date"].dt.date.astype(str)
-
-kp_monthly = (
-    kp_daily.set_index("date")
-        [["kp","ap"]]
-        .resample("MS")
-        .mean()
-        .reset_index()
-)
-kp_monthly["date_str"] = kp_monthly["date"].dt.date.astype(str)
+    Einziger Schlüssel ist das Datum (datetime64). Bei sortierten, eindeutigen
+    Indizes nutzt pandas einen linearen Merge-Join statt einer Hash-Tabelle.
+    """
+    return (
+        left.set_index("date")
+            .join(right.set_index("date"), how=how)
+            .reset_index()
+    )
 
-# -------------------------
-# 6) Speichern (tägliche Daten)
-# -------------------------
-sn_clean[["date_str","sn","sn_std","n_obs"]].rename(columns={"date_str":"date"}) \
-    .to_csv("data/processed/sunspots_daily_clean.csv", index=False)
 
-f107_daily[["date_str","fluxobsflux","fluxadjflux","fluxursi"]].rename(columns={"date_str":"date"}) \
-    .to_csv("data/processed/f107_daily_clean.csv", index=False)
+def calendar_frame(frames, freq):
+    """
+    Legt mehrere DataFrames (mit Spalte ``date``) auf ein lückenloses Zeitraster.
 
-kp_daily[["date_str","kp","ap"]].rename(columns={"date_str":"date"}) \
-    .to_csv("data/processed/kp_daily_clean.csv", index=False)
+    Outer-Join über das Datum, danach ``asfreq(freq)``: jede Zeile ist ein
+    Zeitschritt, fehlende Werte sind NaN. Index ist das Datum.
+    """
+    aligned = pd.concat([f.set_index("date") for f in frames], axis=1, join="outer")
+    return aligned.sort_index().asfreq(freq)
+
+
+@instrumentation.measure("merge_daily")
+def merge_daily(sn_clean, f107_daily):
+    """Verknüpft Sunspots und F10.7 auf Tagesebene."""
+    # nur Tage, die beide haben; ggf. "left" wenn alle Sunspot-Tage behalten werden sollen
+    return align_on_date(sn_clean, f107_daily, how="inner")
 
-merged[["date_str","sn","sn_std","n_obs","fluxadjflux","fluxursi"]].rename(columns={"date_str":"date"}) \
-    .to_csv("data/processed/sunspots_f107_merged.csv", index=False)
 
 # -------------------------
-# 7) Speichern (monatliche Daten)
+# 5) Aggregation: Monat und weitere Auflösungen (siehe aggregation.py)
 # -------------------------
-sn_monthly[["date_str","sn","sn_std","n_obs"]].rename(columns={"date_str":"date"}) \
-    .to_csv("data/processed/sunspots_monthly_clean.csv", index=False)
+@instrumentation.measure("resample")
+def build_pyramids(sources, resolutions=aggregation.RESOLUTIONS, carrington=None):
+    """
+    Aggregations-Pyramide pro Quelle.
+
+    ``sources`` ist ein dict ``{name: Tages-Frame}``. Gibt
+    ``{name: {auflösung: Frame}}`` zurück; Carrington-Rotationen werden über
+    ``carrington`` (siehe ``aggregation.carrington_model``) eingeteilt.
+    """
+    return {
+        name: aggregation.build_pyramid([daily], resolutions, carrington=carrington)
+        for name, daily in sources.items()
+    }
+
 
-f107_monthly[["date_str","fluxobsflux","fluxadjflux","fluxursi"]].rename(columns={"date_str":"date"}) \
-    .to_csv("data/processed/f107_monthly_clean.csv", index=False)
+def combine_pyramids(pyramids):
+    """Legt die Pyramiden aller Quellen pro Auflösung in einen gemeinsamen Frame."""
+    combined = {}
+    resolutions = next(iter(pyramids.values())).keys()
+    for resolution in resolutions:
+        keys = ["date", "rotation"] if resolution == "carrington" else ["date"]
+        combined[resolution] = (
+            pd.concat([p[resolution].set_index(keys) for p in pyramids.values()],
+                      axis=1, join="outer")
+              .sort_index()
+              .reset_index()
+        )
+    return combined
 
-kp_monthly[["date_str","kp","ap"]].rename(columns={"date_str":"date"}) \
-    .to_csv("data/processed/kp_monthly_clean.csv", index=False)
 
 # -------------------------
 # 8) Master-Dataset (monatlich): Alle drei Datensätze zusammenführen
 # -------------------------
-# Schrittweise mergen: Sunspots × F10.7, dann × Kp/ap
-merged_monthly = sn_monthly.merge(
-    f107_monthly,
-    on=["date","date_str"],
-    how="inner"
-)
-
-merged_monthly = merged_monthly.merge(
-    kp_monthly,
-    on=["date","date_str"],
-    how="inner"
-)
+@instrumentation.measure("merge_monthly")
+def build_master_monthly(sn_monthly, f107_monthly, kp_monthly, how="inner"):
+    """Schrittweise mergen: Sunspots × F10.7, dann × Kp/ap."""
+    merged_monthly = align_on_date(sn_monthly, f107_monthly, how=how)
+    return align_on_date(merged_monthly, kp_monthly, how=how)
+
 
 # -------------------------
 # 9) Lag-Features hinzufügen
 # -------------------------
-# Lag-Variablen für Sunspots und F10.7 (1, 3, 6 Monate)
-# Diese können verwendet werden, um zu untersuchen, ob Sonnenaktivität
-# mit Verzögerung auf Kp-Index wirkt
-lag_months = [1, 3, 6]
-
-# Sortiere nach Datum für korrekte Lag-Berechnung
-merged_monthly = merged_monthly.sort_values("date").reset_index(drop=True)
-
-# Lag-Features für Sunspots
-for lag in lag_months:
-    merged_monthly[f"sn_lag_{lag}m"] = merged_monthly["sn"].shift(lag)
-
-# Lag-Features für F10.7 (fluxadjflux)
-for lag in lag_months:
-    merged_monthly[f"f107_lag_{lag}m"] = merged_monthly["fluxadjflux"].shift(lag)
-
-# Speichern des Master-Datasets (mit Lag-Features)
-# Wähle relevante Spalten für die Ausgabe
-output_cols = [
-    "date_str", "sn", "sn_std", "n_obs",
-    "fluxadjflux", "fluxursi",
-    "kp", "ap",
-    "sn_lag_1m", "sn_lag_3m", "sn_lag_6m",
-    "f107_lag_1m", "f107_lag_3m", "f107_lag_6m"
-]
-
-merged_monthly[output_cols] \
-    .rename(columns={"date_str":"date"}) \
-    .to_csv("data/processed/master_monthly_merged.csv", index=False)
+@instrumentation.measure("lags")
+def add_lag_features(merged_monthly, lags=LAG_MONTHS, flux_column="fluxadjflux"):
+    """
+    Ergänzt Lag-Variablen für Sunspots und F10.7 (``flux_column``).
+
+    Diese können verwendet werden, um zu untersuchen, ob Sonnenaktivität
+    mit Verzögerung auf Kp-Index wirkt.
+    """
+    # Sortiere nach Datum für korrekte Lag-Berechnung
+    merged_monthly = merged_monthly.sort_values("date").reset_index(drop=True)
+
+    for lag in lags:
+        merged_monthly[f"sn_lag_{lag}m"] = merged_monthly["sn"].shift(lag)
+    for lag in lags:
+        merged_monthly[f"f107_lag_{lag}m"] = merged_monthly[flux_column].shift(lag)
+    return merged_monthly
+
+
+# -------------------------
+# 9b) Master-Dataset (täglich) mit Lag-Features
+# -------------------------
+MASTER_DAILY_COLUMNS = ["sn", "sn_std", "n_obs", "fluxadjflux", "fluxursi", "kp", "ap"]
+MASTER_DAILY_LAGGED = {"sn": "sn", "fluxadjflux": "f107"}  # Spalte -> Präfix der Lag-Spalten
+
+
+@instrumentation.measure("master_daily")
+def build_master_daily(sn_clean, f107_daily, kp_daily, lags=LAG_DAYS):
+    """
+    Tägliches Master-Dataset Sunspots × F10.7 × Kp/ap mit Lag-Features in Tagen.
+
+    Alle Quellen werden per Tagesnummer in ein vorab alloziertes Array auf einem
+    gemeinsamen Kalender geschrieben (vorne um max(lags) Tage mit NaN aufgefüllt).
+    Die Lags beziehen sich auf Kalendertage; ``sn_lag_{k}d`` ist ein verschobener
+    Slice (View) derselben Spalte, kein ``shift()``-Kopie. Behalten werden nur
+    Tage, an denen alle drei Quellen Werte haben (wie beim monatlichen Master).
+    """
+    frames = [sn_clean, f107_daily, kp_daily]
+    days = [aggregation.day_numbers(f["date"].to_numpy()) for f in frames]
+    if any(len(d) == 0 for d in days):
+        return pd.DataFrame(columns=["date"] + master_output_columns(lags, "d")[1:])
+
+    pad = max(lags, default=0)
+    first = min(d.min() for d in days)
+    n_days = int(max(d.max() for d in days) - first + 1)
+
+    grid = np.full((len(MASTER_DAILY_COLUMNS), pad + n_days), np.nan)
+    for frame, d in zip(frames, days):
+        pos = pad + (d - first)
+        for i, col in enumerate(MASTER_DAILY_COLUMNS):
+            if col in frame:
+                grid[i, pos] = frame[col].to_numpy(dtype=float, na_value=np.nan)
+
+    current = grid[:, pad:]  # View: Werte am jeweiligen Tag
+    required = [MASTER_DAILY_COLUMNS.index(c) for c in ("sn", "fluxadjflux", "kp")]
+    keep = ~np.isnan(current[required]).any(axis=0)
+
+    data = {"date": (first + np.flatnonzero(keep)).astype("datetime64[D]").astype("datetime64[ns]")}
+    for i, col in enumerate(MASTER_DAILY_COLUMNS):
+        data[col] = current[i, keep]
+    for col, prefix in MASTER_DAILY_LAGGED.items():
+        row = grid[MASTER_DAILY_COLUMNS.index(col)]
+        for lag in lags:
+            data[f"{prefix}_lag_{lag}d"] = row[pad - lag:pad - lag + n_days][keep]
+
+    master_daily = pd.DataFrame(data)
+    return master_daily.astype({"n_obs": sn_clean["n_obs"].dtype})
+
+
+def master_output_columns(lags=LAG_MONTHS, unit="m"):
+    """Spalten des Master-Datasets in der Reihenfolge der CSV-Ausgabe."""
+    return (
+        ["date", "sn", "sn_std", "n_obs", "fluxadjflux", "fluxursi", "kp", "ap"]
+        + [f"sn_lag_{lag}{unit}" for lag in lags]
+        + [f"f107_lag_{lag}{unit}" for lag in lags]
+    )
+
 
 # -------------------------
 # 10) Korrelationsanalyse
 # -------------------------
-# Pearson-Korrelationen zwischen den Variablen
-print("\n" + "="*60)
-print("KORRELATIONSANALYSE")
-print("="*60)
+def lag_correlations(merged_monthly, target, lags=LAG_MONTHS, with_significance=True):
+    """
+    Pearson-Korrelation der Lag-Features mit ``target`` (absteigend sortiert).
 
-# Hauptvariablen für Korrelationen
-corr_vars = ["sn", "fluxadjflux", "kp", "ap"]
-corr_data = merged_monthly[corr_vars].dropna()
-
-if len(corr_data) > 0:
-    corr_matrix = corr_data.corr()
-    print("\n=== Pearson-Korrelationen (Hauptvariablen) ===")
-    print(corr_matrix.round(3))
-    
-    # Speichern der Korrelationsmatrix
-    corr_matrix.to_csv("data/results/correlation_matrix_main.csv")
-    
-    # Spezifische Korrelationen ausgeben
-    print("\n=== Wichtige Korrelationen ===")
-    print(f"Sunspots ↔ Kp:        {corr_matrix.loc['sn', 'kp']:.3f}")
-    print(f"Sunspots ↔ F10.7:      {corr_matrix.loc['sn', 'fluxadjflux']:.3f}")
-    print(f"F10.7 ↔ Kp:           {corr_matrix.loc['fluxadjflux', 'kp']:.3f}")
-    print(f"F10.7 ↔ Ap:           {corr_matrix.loc['fluxadjflux', 'ap']:.3f}")
-    
-    # Korrelationen mit Lag-Features
-    print("\n=== Korrelationen mit Lag-Features (Kp) ===")
-    lag_vars = ["kp"] + [f"sn_lag_{lag}m" for lag in lag_months] + [f"f107_lag_{lag}m" for lag in lag_months]
-    lag_corr_data = merged_monthly[lag_vars].dropna()
-    
-    if len(lag_corr_data) > 0:
-        lag_corr = lag_corr_data.corr()["kp"].drop("kp").sort_values(ascending=False)
-        print(lag_corr.round(3))
-        lag_corr.to_csv("data/results/correlation_lags_kp.csv", header=["correlation"])
-        
-        print("\n=== Korrelationen mit Lag-Features (Ap) ===")
-        lag_vars_ap = ["ap"] + [f"sn_lag_{lag}m" for lag in lag_months] + [f"f107_lag_{lag}m" for lag in lag_months]
-        lag_corr_data_ap = merged_monthly[lag_vars_ap].dropna()
-        
-        if len(lag_corr_data_ap) > 0:
-            lag_corr_ap = lag_corr_data_ap.corr()["ap"].drop("ap").sort_values(ascending=False)
-            print(lag_corr_ap.round(3))
-            lag_corr_ap.to_csv("data/results/correlation_lags_ap.csv", header=["correlation"])
-else:
-    print("Warnung: Keine Daten für Korrelationsanalyse verfügbar")
-
-# Kurzer Check
-print("\n=== TÄGLICHE DATEN ===")
-print("\n=== Sunspots (daily) ===")
-print(sn_clean.head())
-print(f"\n=== F10.7 (daily) ===")
-print(f107_daily.head())
-print(f"\n=== Kp/ap (daily) ===")
-print(kp_daily.head())
-print(f"\n=== Merged (Sunspots × F10.7, daily) ===")
-print(merged.head())
-
-print("\n=== MONATLICHE DATEN ===")
-print("\n=== Sunspots (monthly) ===")
-print(sn_monthly.head())
-print(f"\n=== F10.7 (monthly) ===")
-print(f107_monthly.head())
-print(f"\n=== Kp/ap (monthly) ===")
-print(kp_monthly.head())
-
-print(f"\n=== Master-Dataset (monthly) ===")
-print(merged_monthly.head())
-
-print(f"\n=== Row counts ===")
-print(f"Sunspots daily: {len(sn_clean)} | monthly: {len(sn_monthly)}")
-print(f"F10.7 daily: {len(f107_daily)} | monthly: {len(f107_monthly)}")
-print(f"Kp/ap daily: {len(kp_daily)} | monthly: {len(kp_monthly)}")
-print(f"Merged (Sunspots × F10.7, daily): {len(merged)}")
-print(f"Master (Sunspots × F10.7 × Kp/ap, monthly): {len(merged_monthly)}")
\ No newline at end of file
+    Spalten: ``correlation``, ``ci_low``/``ci_high`` (Block-Bootstrap) und
+    ``p_surrogate`` (phasenrandomisierte Surrogate, siehe significance.py;
+    mit ``with_significance=False`` NaN).
+    """
+    features = [f"sn_lag_{lag}m" for lag in lags] + [f"f107_lag_{lag}m" for lag in lags]
+    lag_corr_data = merged_monthly[[target] + features].dropna()
+    if len(lag_corr_data) == 0:
+        return None
+    table = significance.series_significance(lag_corr_data, target, features, resample=with_significance)
+    table.insert(0, "correlation", lag_corr_data.corr()[target].drop(target))
+    return table.sort_values("correlation", ascending=False)
+
+
+@instrumentation.measure("lag_spectra")
+def lag_spectra(daily, monthly,
+                max_lag_days=lag_correlation.MAX_LAG_DAYS,
+                max_lag_months=lag_correlation.MAX_LAG_MONTHS,
+                with_significance=True):
+    """
+    Lag-Spektren (Treiber → Ziel, alle Lags) auf Tages- und Monatsebene.
+
+    ``daily`` und ``monthly`` sind Frames aus ``calendar_frame``. Gibt
+    (lag_spectrum_daily, lag_spectrum_monthly) als tidy-Tabellen zurück,
+    ergänzt um Konfidenzintervalle und Surrogat-p-Werte pro Lag (mit
+    ``with_significance=False`` NaN).
+    """
+    spectra = []
+    for df, max_lag, freq in ((daily, max_lag_days, "D"), (monthly, max_lag_months, "MS")):
+        spectrum = lag_correlation.lag_spectrum(df, LAG_DRIVERS, LAG_TARGETS, max_lag)
+        spectra.append(significance.spectrum_significance(df, spectrum, LAG_DRIVERS, LAG_TARGETS,
+                                                          max_lag, freq, resample=with_significance))
+    return tuple(spectra)
+
+
+@instrumentation.measure("superposed_epoch")
+def storm_epochs(daily_grid):
+    """
+    Überlagerte Epochenanalyse um Sturmbeginne (siehe superposed_epoch.py).
+
+    ``daily_grid`` ist das tägliche Raster aus ``calendar_frame``. Gibt
+    (storm_events, epoch_curves) zurück.
+    """
+    return superposed_epoch.superposed_epoch(daily_grid)
+
+
+@instrumentation.measure("recurrence")
+def recurrence_analysis(daily_grid, carrington=None):
+    """
+    27-Tage-Wiederkehr (siehe recurrence.py): Auto-/Kreuzkorrelationen bis
+    sechs Rotationen und Bartels-Matrix.
+
+    Gibt (recurrence_spectrum, bartels_matrix) zurück.
+    """
+    return recurrence.recurrence(daily_grid, carrington)
+
+
+@instrumentation.measure("spectral")
+def spectral_analysis(daily, monthly):
+    """
+    Welch-Spektren, Kohärenz und Phase zwischen Sunspots/F10.7 und Kp/ap
+    (siehe spectral.py).
+
+    ``daily`` und ``monthly`` sind die Raster aus ``calendar_frame``. Gibt
+    (coherence_daily, coherence_monthly) als tidy-Tabellen zurück.
+    """
+    return spectral.spectral_analysis(daily, monthly)
+
+
+@instrumentation.measure("forecast")
+def forecast_analysis(monthly_grid):
+    """
+    Walk-forward-Vorhersage von Kp und ap aus verzögerten Treibern (siehe
+    forecasting.py).
+
+    ``monthly_grid`` ist das monatliche Raster aus ``calendar_frame``. Gibt
+    die Skill-Tabelle pro Zielgröße, Horizont und Konfiguration zurück.
+    """
+    return forecasting.forecast_skill(monthly_grid)
+
+
+@instrumentation.measure("correlation")
+def correlation_analysis(merged_monthly, lags=LAG_MONTHS, with_significance=True):
+    """
+    Pearson-Korrelationen zwischen den Hauptvariablen und mit den Lag-Features.
+
+    Gibt ein dict mit ``corr_matrix``, ``lag_corr_kp`` und ``lag_corr_ap`` zurück
+    (jeweils None, wenn keine Daten vorhanden sind). ``corr_matrix`` enthält
+    neben der Matrix pro Variable die Spalten ``<var>_ci_low``,
+    ``<var>_ci_high`` und ``<var>_p`` (siehe significance.py). Mit
+    ``with_significance=False`` entfallen Bootstrap und Surrogate; diese Spalten bleiben NaN.
+    """
+    result = {"corr_matrix": None, "lag_corr_kp": None, "lag_corr_ap": None}
+    corr_data = merged_monthly[CORR_VARS].dropna()
+    if len(corr_data) == 0:
+        return result
+
+    result["corr_matrix"] = pd.concat(
+        [corr_data.corr(), significance.matrix_significance(corr_data, resample=with_significance)],
+        axis=1)
+    result["lag_corr_kp"] = lag_correlations(merged_monthly, "kp", lags, with_significance)
+    if result["lag_corr_kp"] is not None:
+        result["lag_corr_ap"] = lag_correlations(merged_monthly, "ap", lags, with_significance)
+    return result
+
+
+# -------------------------
+# Pipeline
+# -------------------------
+def load_source(name, path, loader, use_cache, rebuild_cache, incremental_mode=False):
+    """
+    Lädt eine Quelle (ggf. über den Cache) und misst die Wall-Time.
+
+    Mit ``incremental_mode`` wird nur der seit dem letzten Lauf angehängte Teil
+    der Rohdatei geparst (siehe incremental.py).
+    """
+    start = time.perf_counter()
+    with instrumentation.stage(f"load_{name}"):
+        if incremental_mode:
+            df, info = incremental.ingest(name, path, INCREMENTAL_SOURCES[name], loader,
+                                          rebuild=rebuild_cache)
+            print(f"Einlesen {name:<9} {info}")
+        elif use_cache:
+            df = cache.cached(name, path, loader, rebuild=rebuild_cache)
+        else:
+            df = loader(path)
+        instrumentation.note(rows_out=len(df))
+    return df, time.perf_counter() - start
+
+
+def load_sources(sn_path=SN_PATH, f107_path=F107_PATH, kp_path=KP_PATH,
+                 use_cache=True, rebuild_cache=False, parallel=True, incremental_mode=False):
+    """
+    Lädt die drei bereinigten Tages-DataFrames (sn_clean, f107_daily, kp_daily).
+
+    Mit ``use_cache`` werden unveränderte Rohdateien aus data/cache/ gelesen
+    (siehe cache.py); ``rebuild_cache`` erzwingt das Neu-Parsen. Mit
+    ``incremental_mode`` wird pro Rohdatei nur der neu angehängte Teil geparst
+    (siehe incremental.py). Quellen, die
+    geparst werden müssen, laufen mit ``parallel`` gleichzeitig in einem
+    Prozesspool (höchstens ein Prozess pro CPU), da sie bis zum Merge keine
+    Daten teilen.
+
+    Gibt (sn_clean, f107_daily, kp_daily, load_times) zurück; ``load_times``
+    enthält die Wall-Time pro Quelle in Sekunden.
+    """
+    sources = {
+        "sunspots": (sn_path, load_sunspots),
+        "f107": (f107_path, load_f107_daily),
+        "kp": (kp_path, load_kp_daily),
+    }
+    to_parse = [
+        name for name, (path, _) in sources.items()
+        if incremental_mode or not use_cache or rebuild_cache or not cache.is_cached(name, path)
+    ]
+
+    frames, load_times = {}, {}
+    workers = min(len(to_parse), os.cpu_count() or 1)
+    if parallel and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                name: pool.submit(load_source, name, *sources[name], use_cache, rebuild_cache,
+                                   incremental_mode)
+                for name in to_parse
+            }
+            for name, future in futures.items():
+                frames[name], load_times[name] = future.result()
+
+    for name, (path, loader) in sources.items():
+        if name not in frames:
+            frames[name], load_times[name] = load_source(name, path, loader, use_cache, rebuild_cache,
+                                                                incremental_mode)
+
+    for name in sources:
+        origin = "inkrementell" if incremental_mode else "geparst" if name in to_parse else "Cache"
+        print(f"Ladezeit {name:<9} {load_times[name]:6.3f} s ({origin})")
+
+    return frames["sunspots"], frames["f107"], frames["kp"], load_times
+
+
+def run(sn_path=SN_PATH, f107_path=F107_PATH, kp_path=KP_PATH,
+        use_cache=True, rebuild_cache=False, parallel=True, incremental_mode=False,
+        with_significance=True):
+    """
+    Führt Import, Bereinigung, Resampling, Merge, Lags und Korrelationen aus.
+
+    Schreibt nichts nach data/processed; alle Ergebnisse werden als dict von
+    DataFrames zurückgegeben (siehe ``write_outputs`` für die CSV-Ausgabe).
+    Mit ``with_significance=False`` entfallen Block-Bootstrap und Surrogate
+    (Konfidenzintervalle und p-Werte bleiben NaN).
+    """
+    sn_clean, f107_daily, kp_daily, load_times = load_sources(
+        sn_path, f107_path, kp_path,
+        use_cache=use_cache, rebuild_cache=rebuild_cache, parallel=parallel,
+        incremental_mode=incremental_mode
+    )
+
+    merged = merge_daily(sn_clean, f107_daily)
+
+    # Alle Auflösungen pro Quelle aus einer Aggregationsstufe; Monat daraus
+    carrington = aggregation.carrington_model(f107_daily)
+    pyramids = build_pyramids(
+        {"sunspots": sn_clean, "f107": f107_daily, "kp": kp_daily},
+        carrington=carrington,
+    )
+    sn_m = pyramids["sunspots"]["monthly"]
+    f107_m = pyramids["f107"]["monthly"]
+    kp_m = pyramids["kp"]["monthly"]
+
+    merged_monthly = add_lag_features(build_master_monthly(sn_m, f107_m, kp_m))
+    merged_daily = build_master_daily(sn_clean, f107_daily, kp_daily)
+
+    daily_grid = calendar_frame([sn_clean, f107_daily, kp_daily], "D")
+    monthly_grid = calendar_frame([sn_m, f107_m, kp_m], "MS")
+    lag_spectrum_daily, lag_spectrum_monthly = lag_spectra(
+        daily_grid, monthly_grid, with_significance=with_significance)
+    storm_events, epoch_curves = storm_epochs(daily_grid)
+    recurrence_spectrum, bartels_matrix = recurrence_analysis(daily_grid, carrington)
+    coherence_daily, coherence_monthly = spectral_analysis(daily_grid, monthly_grid)
+    forecast_skill = forecast_analysis(monthly_grid)
+
+    return {
+        "sn_clean": sn_clean,
+        "f107_daily": f107_daily,
+        "kp_daily": kp_daily,
+        "merged": merged,
+        "sn_monthly": sn_m,
+        "f107_monthly": f107_m,
+        "kp_monthly": kp_m,
+        "merged_monthly": merged_monthly,
+        "merged_daily": merged_daily,
+        "pyramid": combine_pyramids(pyramids),
+        **correlation_analysis(merged_monthly, with_significance=with_significance),
+        "lag_spectrum_daily": lag_spectrum_daily,
+        "lag_spectrum_monthly": lag_spectrum_monthly,
+        "storm_events": storm_events,
+        "epoch_curves": epoch_curves,
+        "recurrence_spectrum": recurrence_spectrum,
+        "bartels_matrix": bartels_matrix,
+        "coherence_daily": coherence_daily,
+        "coherence_monthly": coherence_monthly,
+        "forecast_skill": forecast_skill,
+        "rolling_corr_daily": rolling_correlation.rolling_correlations(
+            daily_grid, windows=rolling_correlation.ROLLING_WINDOWS_DAILY, unit="d"),
+        "rolling_corr_monthly": rolling_correlation.rolling_correlations(
+            monthly_grid, windows=rolling_correlation.ROLLING_WINDOWS_MONTHLY, unit="m"),
+        "load_times": load_times,
+    }
+
+
+def _to_csv(df, cols, path):
+    # ISO-Datum (YYYY-MM-DD) wird erst hier beim Schreiben erzeugt
+    df[cols].to_csv(path, index=False, date_format="%Y-%m-%d")
+
+
+# Ausgabedateien pro Ergebnis von ``run()``: (Verzeichnis, Dateinamen)
+OUTPUT_FILES = {
+    # Tägliche Daten
+    "sn_clean": ("processed", ["sunspots_daily_clean.csv"]),
+    "f107_daily": ("processed", ["f107_daily_clean.csv"]),
+    "kp_daily": ("processed", ["kp_daily_clean.csv"]),
+    "merged": ("processed", ["sunspots_f107_merged.csv"]),
+    # Monatliche Daten
+    "sn_monthly": ("processed", ["sunspots_monthly_clean.csv"]),
+    "f107_monthly": ("processed", ["f107_monthly_clean.csv"]),
+    "kp_monthly": ("processed", ["kp_monthly_clean.csv"]),
+    # Tägliches Master-Dataset (binär, spaltenweise; Laden mit cache.load_frame)
+    "merged_daily": ("processed", ["master_daily_merged.npz"]),
+    # Aggregations-Pyramide: eine Datei pro Auflösung mit allen Quellen
+    "pyramid": ("processed", [f"pyramid_{r}.csv" for r in aggregation.RESOLUTIONS]),
+    # Master-Dataset (mit Lag-Features)
+    "merged_monthly": ("processed", ["master_monthly_merged.csv"]),
+    # Korrelationen
+    "corr_matrix": ("results", ["correlation_matrix_main.csv"]),
+    "lag_corr_kp": ("results", ["correlation_lags_kp.csv"]),
+    "lag_corr_ap": ("results", ["correlation_lags_ap.csv"]),
+    # Lag-Spektren (alle Lags, tidy: driver, target, lag, r, n)
+    "lag_spectrum_daily": ("results", ["lag_spectrum_daily.csv"]),
+    "lag_spectrum_monthly": ("results", ["lag_spectrum_monthly.csv"]),
+    # Rollende Korrelationen (eine Spalte pro Paar und Fenster)
+    "rolling_corr_daily": ("results", ["rolling_correlation_daily.csv"]),
+    "rolling_corr_monthly": ("results", ["rolling_correlation_monthly.csv"]),
+    # Überlagerte Epochenanalyse: Sturmbeginne und Kurven (variable, day, n, mean, median, Quantile)
+    "storm_events": ("results", ["storm_events.csv"]),
+    "epoch_curves": ("results", ["superposed_epoch_daily.csv"]),
+    # 27-Tage-Wiederkehr: Auto-/Kreuzkorrelationen (tidy wie Lag-Spektren) und Bartels-Matrix
+    "recurrence_spectrum": ("results", ["recurrence_daily.csv"]),
+    "bartels_matrix": ("results", ["bartels_rotations.csv"]),
+    # Spektrale Kohärenz (tidy: driver, target, frequency, period, PSD, Kohärenz, Phase, Lag)
+    "coherence_daily": ("results", ["coherence_daily.csv"]),
+    "coherence_monthly": ("results", ["coherence_monthly.csv"]),
+    # Walk-forward-Vorhersage: Skill pro Zielgröße, Horizont und Konfiguration
+    "forecast_skill": ("results", ["forecast_skill_monthly.csv"]),
+}
+
+# Spaltenauswahl der CSV-Ausgabe (sonst alle Spalten)
+OUTPUT_COLUMNS = {
+    "sn_clean": ["date","sn","sn_std","n_obs"],
+    "f107_daily": ["date","fluxobsflux","fluxadjflux","fluxursi"],
+    "kp_daily": ["date","kp","ap"],
+    "merged": ["date","sn","sn_std","n_obs","fluxadjflux","fluxursi"],
+    "sn_monthly": ["date","sn","sn_std","n_obs"],
+    "f107_monthly": ["date","fluxobsflux","fluxadjflux","fluxursi"],
+    "kp_monthly": ["date","kp","ap"],
+    "merged_monthly": master_output_columns(),
+}
+
+
+# Zusätzlich als memory-mappbare Binärreihe (siehe series_store.py): Name, Frequenz
+SERIES_OUTPUTS = {
+    "sn_clean": ("sunspots_daily", "D"),
+    "f107_daily": ("f107_daily", "D"),
+    "kp_daily": ("kp_daily", "D"),
+    "sn_monthly": ("sunspots_monthly", "MS"),
+    "f107_monthly": ("f107_monthly", "MS"),
+    "kp_monthly": ("kp_monthly", "MS"),
+    "merged_daily": ("master_daily", "D"),
+    "merged_monthly": ("master_monthly", "MS"),
+}
+
+
+def output_paths(keys, processed_dir=PROCESSED_DIR, results_dir=RESULTS_DIR):
+    """Pfade der Dateien, die ``write_outputs`` für die Ergebnisse ``keys`` schreibt."""
+    paths = []
+    for key in keys:
+        folder, names = OUTPUT_FILES[key]
+        base = processed_dir if folder == "processed" else results_dir
+        paths += [f"{base}/{name}" for name in names]
+        if key in SERIES_OUTPUTS:
+            paths.append(str(series_store.header_path(SERIES_OUTPUTS[key][0],
+                                                      f"{processed_dir}/series")))
+    return paths
+
+
+def write_outputs(results, processed_dir=PROCESSED_DIR, results_dir=RESULTS_DIR):
+    """
+    Schreibt die Ergebnisse von ``run()`` als CSV-Dateien (siehe ``OUTPUT_FILES``),
+    die Tages-, Monats- und Master-Daten zusätzlich als Binärreihen (``SERIES_OUTPUTS``).
+
+    ``results`` darf auch nur einen Teil der Ergebnisse enthalten; Einträge
+    ohne Ausgabedatei oder mit Wert None werden übersprungen.
+    """
+    for key, value in results.items():
+        if key not in OUTPUT_FILES or value is None:
+            continue
+        paths = output_paths([key], processed_dir, results_dir)
+        if key == "pyramid":
+            for resolution, frame in value.items():
+                _to_csv(frame, list(frame.columns), f"{processed_dir}/pyramid_{resolution}.csv")
+        elif key == "merged_daily":
+            cache.save_frame(value, paths[0])
+        elif key == "corr_matrix":
+            value.to_csv(paths[0])
+        elif key in ("lag_corr_kp", "lag_corr_ap"):
+            value.to_csv(paths[0])
+        elif key in ("lag_spectrum_daily", "lag_spectrum_monthly"):
+            value.to_csv(paths[0], index=False)
+        else:
+            _to_csv(value, OUTPUT_COLUMNS.get(key, list(value.columns)), paths[0])
+
+        if key in SERIES_OUTPUTS and len(value):
+            name, freq = SERIES_OUTPUTS[key]
+            series_store.write_series(value, name, freq, OUTPUT_COLUMNS.get(key),
+                                      f"{processed_dir}/series")
+
+
+def print_summary(results):
+    """
+    Gibt Korrelationen, Kopfzeilen und Zeilenzahlen auf der Konsole aus.
+
+    Abschnitte, deren Ergebnisse in ``results`` fehlen (z.B. nach
+    ``run_pipeline.py --only``), werden übersprungen.
+    """
+    print("\n" + "="*60)
+    print("KORRELATIONSANALYSE")
+    print("="*60)
+
+    if "corr_matrix" in results:
+        corr_matrix = results["corr_matrix"]
+        if corr_matrix is not None:
+            print("\n=== Pearson-Korrelationen (Hauptvariablen) ===")
+            print(corr_matrix[CORR_VARS].round(3))
+
+            # Spezifische Korrelationen ausgeben
+            print("\n=== Wichtige Korrelationen ===")
+            print(f"Sunspots ↔ Kp:        {corr_matrix.loc['sn', 'kp']:.3f}")
+            print(f"Sunspots ↔ F10.7:      {corr_matrix.loc['sn', 'fluxadjflux']:.3f}")
+            print(f"F10.7 ↔ Kp:           {corr_matrix.loc['fluxadjflux', 'kp']:.3f}")
+            print(f"F10.7 ↔ Ap:           {corr_matrix.loc['fluxadjflux', 'ap']:.3f}")
+
+            if results.get("lag_corr_kp") is not None:
+                print("\n=== Korrelationen mit Lag-Features (Kp) ===")
+                print(results["lag_corr_kp"].round(3))
+            if results.get("lag_corr_ap") is not None:
+                print("\n=== Korrelationen mit Lag-Features (Ap) ===")
+                print(results["lag_corr_ap"].round(3))
+        else:
+            print("Warnung: Keine Daten für Korrelationsanalyse verfügbar")
+
+    for label, key, unit in [("monatlich", "lag_spectrum_monthly", "m"), ("täglich", "lag_spectrum_daily", "d")]:
+        if key not in results:
+            continue
+        spectrum = results[key].dropna(subset=["r"])
+        if len(spectrum) == 0:
+            continue
+        print(f"\n=== Lag-Spektrum ({label}): stärkste Korrelation je Paar ===")
+        best = spectrum.loc[spectrum["r"].abs().groupby([spectrum["driver"], spectrum["target"]]).idxmax()]
+        for row in best.itertuples():
+            print(f"{row.driver} → {row.target}: r = {row.r:.3f} bei Lag {row.lag}{unit} (n = {row.n})")
+
+    if "recurrence_spectrum" in results:
+        spectrum = results["recurrence_spectrum"].set_index(["driver", "target", "lag"])["r"]
+        rotation = recurrence.BARTELS_DAYS
+        print("\n=== 27-Tage-Wiederkehr (Autokorrelation) ===")
+        for var in ("kp", "ap"):
+            if (var, var, rotation) in spectrum.index:
+                lags = [rotation // 2] + [k * rotation for k in (1, 2, 3)]
+                print(f"{var}: " + ", ".join(f"r({lag}d) = {spectrum[(var, var, lag)]:.3f}" for lag in lags))
+
+    for label, key, unit, periods in [("täglich", "coherence_daily", "d", (27, 182.6, 365.25)),
+                                      ("monatlich", "coherence_monthly", "m", (6, 12, 128))]:
+        table = results.get(key)
+        if table is None or len(table) == 0:
+            continue
+        print(f"\n=== Kohärenz ({label}) bei ausgewählten Perioden ===")
+        for (driver, target), pair in table.groupby(["driver", "target"], sort=False):
+            n_segments = pair["n_segments"].iloc[0]
+            if pair["coherence"].isna().all():
+                print(f"{driver} → {target}: zu wenige vollständige Segmente ({n_segments})")
+                continue
+            nearest = [pair.iloc[(pair["period"] - p).abs().argmin()] for p in periods]
+            print(f"{driver} → {target}: " + ", ".join(
+                f"{row.period:.0f}{unit}: {row.coherence:.2f}" for row in nearest)
+                  + f" (95 %-Schwelle {pair['coherence_95'].iloc[0]:.2f}, Segmente: {n_segments})")
+
+    skill = results.get("forecast_skill")
+    if skill is not None and "skill_climatology" in skill:
+        skill = skill.dropna(subset=["skill_climatology"])
+    if skill is not None and len(skill):
+        print("\n=== Walk-forward-Vorhersage: bestes Modell je Horizont (Skill gegen Klimatologie) ===")
+        best = skill.loc[skill.groupby(["target", "horizon"])["skill_climatology"].idxmax()]
+        for row in best.itertuples():
+            print(f"{row.target} +{row.horizon:>2}m: {row.drivers} Lags {row.lags}, alpha {row.alpha:g}: "
+                  f"Skill {row.skill_climatology:.3f} (Persistenz {row.skill_persistence:.3f}, n = {row.n})")
+
+    events = results.get("storm_events")
+    if events is not None and len(events) and "epoch_curves" in results:
+        curves = results["epoch_curves"].set_index(["variable", "day"])
+        print(f"\n=== Überlagerte Epochen: {len(events)} Stürme "
+              f"({superposed_epoch.STORM_COLUMN} ≥ {superposed_epoch.STORM_THRESHOLD:g}) ===")
+        for var in ("sn", "fluxadjflux", "ap"):
+            if var in curves.index.get_level_values(0):
+                before, onset = curves.loc[(var, -superposed_epoch.EPOCH_DAYS), "mean"], curves.loc[(var, 0), "mean"]
+                print(f"{var}: Mittel {before:.1f} am Tag -{superposed_epoch.EPOCH_DAYS}, {onset:.1f} am Sturmbeginn")
+
+    # Kurzer Check
+    sections = [
+        ("TÄGLICHE DATEN", [
+            ("Sunspots (daily)", "sn_clean"),
+            ("F10.7 (daily)", "f107_daily"),
+            ("Kp/ap (daily)", "kp_daily"),
+            ("Merged (Sunspots × F10.7, daily)", "merged"),
+        ]),
+        ("MONATLICHE DATEN", [
+            ("Sunspots (monthly)", "sn_monthly"),
+            ("F10.7 (monthly)", "f107_monthly"),
+            ("Kp/ap (monthly)", "kp_monthly"),
+            ("Master-Dataset (monthly)", "merged_monthly"),
+        ]),
+    ]
+    for heading, frames in sections:
+        frames = [(title, key) for title, key in frames if key in results]
+        if frames:
+            print(f"\n=== {heading} ===")
+        for title, key in frames:
+            print(f"\n=== {title} ===")
+            print(results[key].head())
+
+    lines = []
+    for label, daily, monthly in [("Sunspots", "sn_clean", "sn_monthly"),
+                                  ("F10.7", "f107_daily", "f107_monthly"),
+                                  ("Kp/ap", "kp_daily", "kp_monthly")]:
+        parts = [f"{unit}: {len(results[key])}" for unit, key in (("daily", daily), ("monthly", monthly))
+                 if key in results]
+        if parts:
+            lines.append(f"{label} " + " | ".join(parts))
+    for label, key in [("Merged (Sunspots × F10.7, daily)", "merged"),
+                       ("Master (Sunspots × F10.7 × Kp/ap, monthly)", "merged_monthly"),
+                       ("Master (Sunspots × F10.7 × Kp/ap, daily)", "merged_daily")]:
+        if key in results:
+            lines.append(f"{label}: {len(results[key])}")
+    if lines:
+        print(f"\n=== Row counts ===")
+        print("\n".join(lines))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import, Bereinigung und Transformation der Rohdaten")
+    parser.add_argument("--no-csv", action="store_true",
+                        help="Ergebnisse nicht als CSV nach data/processed und data/results schreiben")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Rohdaten immer neu parsen, data/cache nicht verwenden")
+    parser.add_argument("--rebuild-cache", action="store_true",
+                        help="Cache-Einträge verwerfen und aus den Rohdaten neu aufbauen")
+    parser.add_argument("--serial", action="store_true",
+                        help="Quellen nacheinander statt parallel einlesen")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Nur seit dem letzten Lauf angehängte Rohdaten parsen (Wasserzeichen)")
+    parser.add_argument("--no-significance", action="store_true",
+                        help="Keine Konfidenzintervalle und p-Werte (Block-Bootstrap, Surrogate)")
+    parser.add_argument("--profile", action="store_true",
+                        help="cProfile-Dump pro Stufe nach data/results/profiles/ schreiben")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Speicherspitze pro Stufe mit tracemalloc messen (langsamer)")
+    args = parser.parse_args(argv)
+
+    run_info = instrumentation.start_run(profile=args.profile, trace_memory=args.trace_memory)
+    try:
+        results = run(use_cache=not args.no_cache, rebuild_cache=args.rebuild_cache,
+                      parallel=not args.serial, incremental_mode=args.incremental,
+                      with_significance=not args.no_significance)
+        if not args.no_csv:
+            write_outputs(results)
+    finally:
+        report = instrumentation.finish_run(run_info, argv)
+    print_summary(results)
+    instrumentation.print_report(report)
+    return results
+
+
+if __name__ == "__main__":
+    main()
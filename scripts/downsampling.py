@@ -0,0 +1,123 @@
+"""
+Ausdünnen langer Zeitreihen vor dem Plotten
+
+Eine Achse mit w Pixeln Breite kann höchstens w Spalten zeichnen; 70 000
+Tageswerte in einer 4 000 Pixel breiten Abbildung kosten nur Renderzeit. Beide
+Verfahren teilen die Reihe nach Position in gleich große Eimer (ein Eimer pro
+Pixelspalte) und wählen daraus wenige Punkte aus:
+
+- ``minmax_indices``: Minimum und Maximum jedes Eimers (Hüllkurve). Die
+  gezeichnete Linie deckt pro Pixelspalte denselben Wertebereich ab wie die
+  vollständige Reihe; Sturmspitzen bleiben damit exakt erhalten.
+- ``lttb_indices``: Largest-Triangle-Three-Buckets (Steinarsson 2013). Pro
+  Eimer der Punkt, der mit dem zuvor gewählten Punkt und dem Mittelwert des
+  nächsten Eimers das größte Dreieck bildet; ein Punkt pro Eimer, gut für
+  glatte Kurven.
+
+Die Eimer liegen als NaN-aufgefüllte Matrix (Eimer × Eimerlänge) vor, alle
+Operationen pro Punkt sind vektorisiert; der Aufwand hängt damit linear von
+der Anzahl der Punkte ab, die Anzahl der gezeichneten Punkte nur von der
+Breite in Pixeln. Eimer ohne gültigen Wert liefern einen NaN-Punkt, damit
+Datenlücken in der Linie sichtbar bleiben.
+"""
+
+import numpy as np
+
+
+def _buckets(values, n_buckets, fill=np.nan):
+    """Teilt ``values`` in höchstens ``n_buckets`` gleich lange Eimer (Matrix, aufgefüllt mit ``fill``)."""
+    size = -(-len(values) // n_buckets)
+    rows = -(-len(values) // size)
+    padded = np.full(rows * size, fill, dtype=float)
+    padded[:len(values)] = values
+    return padded.reshape(rows, size), size
+
+
+def minmax_indices(y, n_buckets):
+    """
+    Positionen von Minimum und Maximum jedes Eimers, zeitlich sortiert.
+
+    Gibt höchstens ``2 * n_buckets`` Positionen zurück (alle, wenn die Reihe
+    nicht länger ist). Für Eimer ohne gültigen Wert wird der Eimeranfang
+    geliefert (dort ist ``y`` NaN).
+    """
+    y = np.asarray(y, dtype=float)
+    if len(y) <= 2 * n_buckets:
+        return np.arange(len(y))
+    matrix, size = _buckets(y, n_buckets)
+    missing = np.isnan(matrix)
+    lo = np.where(missing, np.inf, matrix).argmin(axis=1)
+    hi = np.where(missing, -np.inf, matrix).argmax(axis=1)
+    # leere Eimer: argmin/argmax liefern 0, also den Eimeranfang
+    offset = np.arange(len(matrix)) * size
+    pairs = np.sort(np.column_stack([lo, hi]), axis=1) + offset[:, None]
+    return np.minimum(pairs.ravel(), len(y) - 1)
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Positionen der von Largest-Triangle-Three-Buckets gewählten Punkte.
+
+    ``x`` ist numerisch oder datetime64 und aufsteigend. Erster und letzter
+    gültiger Punkt bleiben immer erhalten; dazwischen wird pro Eimer ein Punkt
+    gewählt (``n_out - 2`` Eimer).
+    """
+    y = np.asarray(y, dtype=float)
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype("datetime64[ns]").astype(np.int64)
+    valid = np.flatnonzero(~np.isnan(y))
+    if len(y) <= n_out or len(valid) < 3 or n_out < 3:
+        return np.arange(len(y))
+    first, last = valid[0], valid[-1]
+    x = (x - x[first]).astype(float)
+
+    inner = np.arange(first + 1, last)
+    pos, size = _buckets(inner, n_out - 2, fill=-1)
+    pos = pos.astype(np.int64)
+    bx = np.where(pos >= 0, x[pos], np.nan)
+    by = np.where(pos >= 0, y[pos], np.nan)
+    bx[np.isnan(by)] = np.nan
+    count = (~np.isnan(by)).sum(axis=1)
+
+    # Schwerpunkt jedes Eimers; der des nächsten Eimers ist der dritte Eckpunkt
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cx = np.nansum(bx, axis=1) / count
+        cy = np.nansum(by, axis=1) / count
+    cx = np.append(cx[1:], x[last])
+    cy = np.append(cy[1:], y[last])
+    # leerer Folgeeimer: Schwerpunkt des eigenen Eimers
+    own = np.isnan(cy)
+    cx[own] = np.nansum(bx[own], axis=1) / np.maximum(count[own], 1)
+    cy[own] = np.nansum(by[own], axis=1) / np.maximum(count[own], 1)
+
+    chosen = np.empty(len(pos), dtype=np.int64)
+    ax, ay = x[first], y[first]
+    for i in range(len(pos)):
+        if count[i] == 0:
+            chosen[i] = pos[i, 0]
+            continue
+        # doppelte Dreiecksfläche (A, B, C) für alle Punkte B des Eimers
+        area = np.abs((ax - cx[i]) * (by[i] - ay) - (ax - bx[i]) * (cy[i] - ay))
+        j = np.nanargmax(area)
+        chosen[i] = pos[i, j]
+        ax, ay = bx[i, j], by[i, j]
+    return np.concatenate([[first], chosen, [last]])
+
+
+def downsample(x, y, n_px, method="minmax"):
+    """
+    Ausgedünnte Reihe (x, y) für eine Achse mit ``n_px`` Pixeln Breite.
+
+    ``method`` ist ``"minmax"`` (zwei Punkte pro Pixel, Spitzen exakt) oder
+    ``"lttb"`` (ein Punkt pro Pixel).
+    """
+    x, y = np.asarray(x), np.asarray(y, dtype=float)
+    n_px = max(int(n_px), 3)
+    if method == "minmax":
+        idx = minmax_indices(y, n_px)
+    elif method == "lttb":
+        idx = lttb_indices(x, y, n_px)
+    else:
+        raise ValueError(f"Unbekanntes Verfahren: {method}")
+    return x[idx], y[idx]
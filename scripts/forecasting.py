@@ -0,0 +1,233 @@
+"""
+Walk-forward-Vorhersage von Kp und ap aus verzögerten Treibern
+
+Die Lag-Features ``sn_lag_*m`` / ``f107_lag_*m`` werden im Master-Dataset nur
+mit Kp korreliert. Hier werden daraus lineare Modelle (ohne und mit
+Ridge-Strafterm) für Kp und ap, die auf dem monatlichen Kalenderraster
+(``cleaning.calendar_frame``) über den gesamten Zeitraum Schritt für Schritt
+vorwärts getestet werden:
+
+- Zum Ausgabezeitpunkt t sind alle Werte bis einschließlich t bekannt. Ein
+  Modell mit Horizont h sagt y[t + h] aus ``treiber[t - l]`` für alle Lags l
+  seiner Lag-Menge vorher (l = 0 ist der letzte bekannte Monat). Für h = 1
+  entsprechen die Lags 0, 2, 5 den Features ``*_lag_1m``, ``*_lag_3m`` und
+  ``*_lag_6m``. Treiber ``"self"`` steht für die Zielgröße selbst
+  (autoregressiv).
+- Sobald y[t] bekannt ist, wird das Paar (x[t - h], y[t]) mit einer
+  Rang-1-Aktualisierung (rekursive kleinste Quadrate) ins Modell übernommen;
+  ein Neuanpassen in jedem Schritt entfällt. Mit Startkovarianz
+  P0 = diag(1/alpha) ist das Ergebnis nach jedem Schritt exakt die
+  Ridge-Lösung über alle bisherigen Paare; ausgeschlossene Features haben
+  Startvarianz 0 und bleiben damit bei 0.
+- Alle Konfigurationen (Treiber × Lag-Menge × alpha) einer Zielgröße und eines
+  Horizonts teilen eine Designmatrix über die Vereinigung aller Features und
+  laufen als ein Stapel (Konfigurationen × Features × Features) durch die
+  Zeitschleife. Die Stapel pro (Zielgröße, Horizont) werden in einem
+  Prozesspool berechnet.
+
+Bewertet wird erst nach ``MIN_TRAIN`` Aktualisierungen. Die Skill-Scores
+vergleichen den mittleren quadratischen Fehler mit zwei Referenzen auf
+denselben Monaten: Klimatologie (Mittelwert der letzten ``CLIMATOLOGY_MONTHS``
+bis t bekannten Werte, ein Sonnenzyklus; ein Mittel über den ganzen Zeitraum
+wäre durch den langfristigen Trend von Kp verzerrt) und Persistenz (y[t]).
+Positive Werte bedeuten, dass das Modell besser ist.
+"""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+
+import batching
+
+FORECAST_TARGETS = ["kp", "ap"]
+HORIZONS = [1, 3, 6, 12]  # Monate
+
+# Name -> Spalten des Rasters ("self" = Zielgröße)
+DRIVER_SETS = {
+    "sn": ["sn"],
+    "f107": ["fluxadjflux"],
+    "sn_f107": ["sn", "fluxadjflux"],
+    "self": ["self"],
+    "sn_self": ["sn", "self"],
+}
+# Name -> Lags relativ zum Ausgabezeitpunkt (Monate)
+LAG_SETS = {
+    "0": [0],
+    "0-1-2": [0, 1, 2],
+    "0-2-5": [0, 2, 5],
+    "0-11": list(range(12)),
+}
+# Ridge-Strafterm auf den standardisierten Features (0 = kleinste Quadrate)
+ALPHAS = [0.0, 10.0]
+
+# Referenz-Klimatologie: gleitendes Mittel über einen Sonnenzyklus
+CLIMATOLOGY_MONTHS = 132
+# Aktualisierungen vor der ersten bewerteten Vorhersage
+MIN_TRAIN = 60
+# Startvarianz für den Achsenabschnitt und für alpha = 0 (praktisch keine Strafe)
+PRIOR_VARIANCE = 1e8
+
+
+def forecast_configs(driver_sets=DRIVER_SETS, lag_sets=LAG_SETS, alphas=ALPHAS):
+    """Alle Kombinationen als Liste von (drivers, lags, alpha)."""
+    return list(itertools.product(driver_sets, lag_sets, alphas))
+
+
+def design_matrix(grid, target, configs, driver_sets=DRIVER_SETS, lag_sets=LAG_SETS,
+                  min_train=MIN_TRAIN):
+    """
+    Gemeinsame Designmatrix aller Konfigurationen.
+
+    Gibt (X, mask) zurück: ``X`` hat die Form (Monate, 1 + Features) mit dem
+    Achsenabschnitt in Spalte 0 und NaN für fehlende Werte, ``mask`` die Form
+    (Konfigurationen, 1 + Features) und markiert die Spalten jeder
+    Konfiguration. Jede Spalte wird durch die Standardabweichung ihrer ersten
+    ``min_train`` gültigen Werte geteilt; die Skalierung verwendet damit nur
+    Werte, die vor der ersten bewerteten Vorhersage bekannt sind.
+    """
+    features = sorted({(col, lag) for drivers, lags, _ in configs
+                       for col in driver_sets[drivers] for lag in lag_sets[lags]})
+    n = len(grid)
+    X = np.ones((n, 1 + len(features)))
+    for j, (col, lag) in enumerate(features, start=1):
+        values = grid[target if col == "self" else col].to_numpy(dtype=float)
+        shifted = np.full(n, np.nan)
+        shifted[lag:] = values[:n - lag]
+        head = shifted[~np.isnan(shifted)][:min_train]
+        scale = head.std() if len(head) > 1 and head.std() > 0 else 1.0
+        X[:, j] = shifted / scale
+
+    mask = np.zeros((len(configs), 1 + len(features)), dtype=bool)
+    mask[:, 0] = True
+    for b, (drivers, lags, _) in enumerate(configs):
+        for j, (col, lag) in enumerate(features, start=1):
+            mask[b, j] = col in driver_sets[drivers] and lag in lag_sets[lags]
+    return X, mask
+
+
+def rls_walk_forward(X, mask, y, alphas, horizon, min_train=MIN_TRAIN):
+    """
+    Rekursive kleinste Quadrate für einen Stapel von Konfigurationen.
+
+    ``X`` (Monate, Features) und ``mask`` (Konfigurationen, Features) wie in
+    ``design_matrix``, ``y`` die Zielgröße (Monate), ``alphas`` der
+    Ridge-Strafterm pro Konfiguration. Gibt (pred, weights) zurück: ``pred``
+    (Monate, Konfigurationen) enthält an Position t die zum Zeitpunkt
+    t - ``horizon`` ausgegebene Vorhersage (NaN vor ``min_train``
+    Aktualisierungen oder bei fehlenden Features), ``weights`` die Gewichte
+    nach dem letzten Schritt.
+    """
+    n, p = X.shape
+    batch = len(mask)
+    # Gültig pro Monat und Konfiguration: alle Features der Konfiguration vorhanden
+    valid = ~(np.isnan(X)[:, None, :] & mask[None, :, :]).any(axis=2)
+    X0 = np.nan_to_num(X)
+    y = np.asarray(y, dtype=float)
+
+    alphas = np.asarray(alphas, dtype=float)
+    with np.errstate(divide="ignore"):
+        prior = np.where(alphas > 0, 1.0 / alphas, PRIOR_VARIANCE)
+    P = np.zeros((batch, p, p))
+    diag = np.where(mask, prior[:, None], 0.0)
+    diag[:, 0] = PRIOR_VARIANCE
+    P[:, np.arange(p), np.arange(p)] = diag
+    w = np.zeros((batch, p))
+    updates = np.zeros(batch, dtype=np.int64)
+    pred = np.full((n, batch), np.nan)
+
+    for t in range(n):
+        s = t - horizon
+        if s >= 0 and not np.isnan(y[t]):
+            active = valid[s]
+            if active.any():
+                x = np.where(mask, X0[s], 0.0)
+                Px = np.einsum("bij,bj->bi", P, x)
+                gain = Px / (1.0 + (x * Px).sum(axis=1))[:, None]
+                gain[~active] = 0.0
+                error = y[t] - (w * x).sum(axis=1)
+                w += gain * error[:, None]
+                P -= gain[:, :, None] * Px[:, None, :]
+                updates += active
+        if t + horizon < n:
+            ready = valid[t] & (updates >= min_train)
+            if ready.any():
+                pred[t + horizon] = np.where(ready, w @ X0[t], np.nan)
+    return pred, w
+
+
+def skill_scores(pred, y, horizon, dates, window=CLIMATOLOGY_MONTHS):
+    """
+    Fehlermaße und Skill-Scores pro Konfiguration (Spalte von ``pred``).
+
+    Referenzen für y[t] sind die Klimatologie (Mittel der ``window`` Monate
+    bis t - ``horizon``) und die Persistenz (y[t - horizon]); verglichen wird
+    nur auf Monaten, in denen Vorhersage, Wert und beide Referenzen
+    existieren. ``start``/``end`` sind der erste und letzte bewertete Monat.
+    """
+    y = np.asarray(y, dtype=float)
+    known = ~np.isnan(y)
+    count = np.cumsum(np.concatenate(([0], known)))
+    total = np.cumsum(np.concatenate(([0.0], np.where(known, y, 0.0))))
+    lo = np.maximum(np.arange(1, len(y) + 1) - window, 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        running = (total[1:] - total[lo]) / (count[1:] - count[lo])
+    climatology = np.full(len(y), np.nan)
+    persistence = np.full(len(y), np.nan)
+    climatology[horizon:] = running[:-horizon]
+    persistence[horizon:] = y[:-horizon]
+
+    rows = []
+    for b in range(pred.shape[1]):
+        ok = ~np.isnan(pred[:, b]) & known & ~np.isnan(climatology) & ~np.isnan(persistence)
+        n = int(ok.sum())
+        if n < 2:
+            rows.append({"n": n, "start": pd.NaT, "end": pd.NaT, "rmse": np.nan, "mae": np.nan, "r": np.nan,
+                         "skill_climatology": np.nan, "skill_persistence": np.nan})
+            continue
+        error = pred[ok, b] - y[ok]
+        mse = np.mean(error ** 2)
+        rows.append({
+            "n": n,
+            "start": dates[ok][0],
+            "end": dates[ok][-1],
+            "rmse": np.sqrt(mse),
+            "mae": np.mean(np.abs(error)),
+            "r": np.corrcoef(pred[ok, b], y[ok])[0, 1],
+            "skill_climatology": 1.0 - mse / np.mean((climatology[ok] - y[ok]) ** 2),
+            "skill_persistence": 1.0 - mse / np.mean((persistence[ok] - y[ok]) ** 2),
+        })
+    return pd.DataFrame(rows)
+
+
+def _evaluate(grid, target, horizon, configs, min_train):
+    """Ein Stapel: alle Konfigurationen für eine Zielgröße und einen Horizont."""
+    X, mask = design_matrix(grid, target, configs, min_train=min_train)
+    y = grid[target].to_numpy(dtype=float)
+    pred, _ = rls_walk_forward(X, mask, y, [alpha for *_, alpha in configs], horizon, min_train)
+    table = pd.DataFrame({
+        "target": target,
+        "horizon": horizon,
+        "drivers": [drivers for drivers, _, _ in configs],
+        "lags": [lags for _, lags, _ in configs],
+        "alpha": [alpha for *_, alpha in configs],
+    })
+    return pd.concat([table, skill_scores(pred, y, horizon, grid.index)], axis=1)
+
+
+def forecast_skill(monthly_grid, targets=FORECAST_TARGETS, horizons=HORIZONS,
+                   configs=None, min_train=MIN_TRAIN, parallel=True):
+    """
+    Walk-forward-Skill aller Konfigurationen für alle Zielgrößen und Horizonte.
+
+    ``monthly_grid`` ist das monatliche Raster aus ``calendar_frame``.
+    Gibt eine Tabelle mit target, horizon (Monate), drivers, lags, alpha, n
+    (bewertete Monate), start, end, rmse, mae, r, skill_climatology und skill_persistence
+    zurück.
+    """
+    configs = configs or forecast_configs()
+    targets = [t for t in targets if t in monthly_grid]
+    jobs = [(monthly_grid, target, h, configs, min_train) for target in targets for h in horizons]
+    if not jobs:
+        return pd.DataFrame()
+    return pd.concat(batching.run_jobs(_evaluate, jobs, parallel), ignore_index=True)
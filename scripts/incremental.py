@@ -0,0 +1,211 @@
+"""
+Inkrementelles Einlesen der Rohdaten (append-only mit Wasserzeichen)
+
+Alle drei Rohdateien wachsen fast nur am Ende: SILSO hängt Tage an, die
+fluxtable drei Zeilen pro Tag, die Kp-Datei acht. Vorläufige Werte am Ende
+werden später durch definitive ersetzt (Flag kippt).
+
+Pro Rohdatei wird deshalb ein Wasserzeichen gespeichert: der Byte-Offset des
+ersten Tages, der noch nicht endgültig ist (erste nicht-definitive Zeile bzw.
+letzter, evtl. unvollständiger Tag), und das Datum dieses Tages. Alle Tage
+davor gelten als stabil; ihr Tages-Frame liegt in ``<name>-incremental.npz``.
+Beim nächsten Lauf wird nur der Rest ab dem Offset gelesen und geparst
+(O(neue Zeilen)), an den stabilen Teil angehängt und das Wasserzeichen
+weitergeschoben.
+
+Umgeschriebene Historie wird erkannt, wenn die Datei kürzer als der Offset
+ist oder sich der Dateianfang bzw. der Block direkt vor dem Offset geändert
+hat (je ``CHECK_BYTES``; dort kippen die Flags). Dann, bei neuer
+``cache.CACHE_VERSION`` oder ``rebuild=True`` wird die Datei vollständig mit
+dem normalen Loader neu eingelesen. Änderungen mitten in der stabilen
+Historie, die keinen der beiden Blöcke berühren, erkennt erst ein Neuaufbau
+(``--rebuild-cache``).
+"""
+
+import hashlib
+import io
+import json
+import os
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import cache
+
+# Größe der Prüfblöcke am Dateianfang und vor dem Wasserzeichen
+CHECK_BYTES = 1 << 16
+
+# Beschreibung einer Rohdatei für das inkrementelle Einlesen:
+#   header_lines(path) -> Anzahl Kopfzeilen am Dateianfang
+#   row_keys(buffer)   -> (ymd, stable) pro Datenzeile (YYYYMMDD, endgültig?)
+#   load_tail(buffer)  -> Tages-Frame aus Datenzeilen ohne Kopfzeilen
+Source = namedtuple("Source", ["header_lines", "row_keys", "load_tail"])
+
+
+def _paths(name, cache_dir):
+    base = Path(cache_dir)
+    return base / f"{name}-incremental.npz", base / f"{name}-watermark.json"
+
+
+def _block_hash(fh, start, stop):
+    fh.seek(start)
+    return hashlib.sha256(fh.read(max(stop - start, 0))).hexdigest()
+
+
+def _checks(fh, data_start, offset):
+    """Hashes des Dateianfangs und des Blocks vor ``offset``."""
+    return {
+        "head_sha256": _block_hash(fh, 0, min(CHECK_BYTES, offset)),
+        "edge_sha256": _block_hash(fh, max(data_start, offset - CHECK_BYTES), offset),
+    }
+
+
+def _header_end(path, lines):
+    """Byte-Offset nach den ersten ``lines`` Zeilen."""
+    with open(path, "rb") as fh:
+        for _ in range(lines):
+            fh.readline()
+        return fh.tell()
+
+
+def _line_starts(data):
+    """Start-Offsets (relativ zu ``data``) aller Datenzeilen (nicht leer, kein Kommentar)."""
+    starts, pos = [], 0
+    for line in data.split(b"\n"):
+        stripped = line.strip()
+        if stripped and not stripped.startswith(b"#"):
+            starts.append(pos)
+        pos += len(line) + 1
+    return np.asarray(starts, dtype=np.int64)
+
+
+def _ymd_to_date(ymd):
+    return pd.Timestamp(f"{ymd // 10000:04d}-{ymd // 100 % 100:02d}-{ymd % 100:02d}")
+
+
+def find_watermark(data, source):
+    """
+    Wasserzeichen innerhalb von ``data`` (Datenzeilen ohne Kopf).
+
+    Gibt (offset, datum) zurück: Start der ersten Zeile des ersten nicht
+    endgültigen Tages (bzw. des letzten Tages) und dessen Datum. Ohne
+    Datenzeilen ist das Ergebnis (0, None).
+    """
+    starts = _line_starts(data)
+    if len(starts) == 0:
+        return 0, None
+    ymd, stable = source.row_keys(io.BytesIO(data))
+    if len(ymd) != len(starts):
+        raise ValueError("Zeilen und geparste Datensätze passen nicht zusammen")
+
+    unstable = np.flatnonzero(~stable)
+    i = unstable[0] if len(unstable) else len(ymd) - 1
+    while i > 0 and ymd[i - 1] == ymd[i]:
+        i -= 1
+    return int(starts[i]), _ymd_to_date(int(ymd[i]))
+
+
+def _scan_watermark(path, data_start, source):
+    """Sucht das Wasserzeichen vom Dateiende aus mit wachsendem Fenster."""
+    size = os.path.getsize(path)
+    window = CHECK_BYTES
+    with open(path, "rb") as fh:
+        while True:
+            begin = max(data_start, size - window)
+            fh.seek(begin)
+            data = fh.read()
+            if begin > data_start:
+                cut = data.find(b"\n") + 1  # angeschnittene erste Zeile verwerfen
+                begin, data = begin + cut, data[cut:]
+            offset, boundary = find_watermark(data, source)
+            # Wasserzeichen am Fensteranfang: der Tag könnte davor beginnen
+            if offset > 0 or begin == data_start:
+                return begin + offset, boundary
+            window *= 2
+
+
+def _append_only(path, state, data_start):
+    """True, wenn ``path`` seit ``state`` nur am Ende gewachsen ist."""
+    if state.get("version") != cache.CACHE_VERSION or state.get("data_start") != data_start:
+        return False
+    offset = state["offset"]
+    if os.path.getsize(path) < offset:
+        return False
+    with open(path, "rb") as fh:
+        return _checks(fh, data_start, offset) == {
+            "head_sha256": state["head_sha256"], "edge_sha256": state["edge_sha256"]
+        }
+
+
+def _concat(stable, tail):
+    if stable is None or len(stable) == 0:
+        return tail.reset_index(drop=True)
+    if len(tail) == 0:
+        return stable
+    return pd.concat([stable, tail], ignore_index=True)
+
+
+def ingest(name, path, source, loader, rebuild=False, cache_dir=cache.CACHE_DIR):
+    """
+    Tages-Frame von ``path``; unveränderte Historie wird nicht erneut geparst.
+
+    ``loader(path)`` liest die ganze Datei (für den ersten Lauf und nach
+    umgeschriebener Historie); ``source`` beschreibt Kopf, Zeilenschlüssel und
+    das Parsen des Rests (siehe ``Source``). Gibt (Frame, Info) zurück; Info
+    beschreibt, was gelesen wurde.
+    """
+    store, sidecar = _paths(name, cache_dir)
+    data_start = _header_end(path, source.header_lines(path))
+    state = json.loads(sidecar.read_text()) if sidecar.exists() else None
+
+    stable, reason = None, None
+    if state is None:
+        reason = "erster Lauf"
+    elif rebuild:
+        reason = "Neuaufbau erzwungen"
+    elif not store.exists() or not _append_only(path, state, data_start):
+        reason = "Historie geändert"
+    else:
+        stable = cache.load_frame(store)
+        start = state["offset"]
+        with open(path, "rb") as fh:
+            fh.seek(start)
+            data = fh.read()
+        tail = source.load_tail(io.BytesIO(data))
+        if len(stable) and len(tail) and tail["date"].iloc[0] <= stable["date"].iloc[-1]:
+            stable, reason = None, "nicht chronologisch angehängt"
+        else:
+            offset, boundary = find_watermark(data, source)
+            offset += start
+            info = f"inkrementell, {len(data)} Bytes ab Offset {start}"
+
+    if stable is None:
+        full = loader(path)
+        offset, boundary = _scan_watermark(path, data_start, source)
+        stable, tail = full.iloc[:0], full
+        info = f"vollständig ({reason})"
+
+    # Tage vor dem Wasserzeichen sind endgültig und wandern in den stabilen Teil
+    if boundary is None:
+        settled = tail.iloc[:0]
+    else:
+        settled = tail[tail["date"] < boundary]
+    result = _concat(stable, tail)
+    stable = _concat(stable, settled)
+
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    cache.save_frame(stable, store)
+    with open(path, "rb") as fh:
+        checks = _checks(fh, data_start, offset)
+    state = {
+        "version": cache.CACHE_VERSION,
+        "path": str(path),
+        "data_start": data_start,
+        "offset": offset,
+        "watermark_date": None if boundary is None else boundary.strftime("%Y-%m-%d"),
+        **checks,
+    }
+    cache._atomic_write(sidecar, lambda tmp: tmp.write_text(json.dumps(state, indent=2)))
+    return result, info
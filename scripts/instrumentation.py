@@ -0,0 +1,241 @@
+"""
+Instrumentierung der Pipeline: Zeiten, Speicher und Zeilenfluss pro Stufe
+
+Funktionen werden mit ``@measure("name")`` markiert (oder Codeblöcke mit
+``with stage("name")``). Pro Aufruf werden erfasst:
+
+- Wall-Time und CPU-Zeit (``time.perf_counter`` / ``time.process_time``)
+- Peak-RSS des Prozesses (``resource.getrusage``) und, mit ``trace_memory``,
+  der Spitzenzuwachs laut ``tracemalloc`` während der Stufe
+- Zeilen hinein (DataFrame-Argumente), heraus (DataFrame-Ergebnis) und die von
+  einzelnen Masken verworfenen Zeilen (``note(dropped=...)`` im Code der Stufe)
+
+Ohne ``start_run()`` ist die Instrumentierung abgeschaltet (kein Overhead).
+Die Konfiguration eines Laufs steht in Umgebungsvariablen, damit auch Stufen
+in Worker-Prozessen (Prozesspools) erfasst werden; jeder Prozess hängt seine
+Einträge als JSON-Zeile an eine gemeinsame Spool-Datei an. ``finish_run()``
+fasst sie zu ``data/results/run_report.json`` zusammen und hängt eine
+Kurzfassung an ``data/results/run_history.jsonl`` an (Vergleich über Läufe).
+Mit ``profile`` wird pro äußerster Stufe eines Prozesses ein cProfile-Dump
+unter ``data/results/profiles/<lauf>/`` geschrieben.
+"""
+
+import cProfile
+import functools
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+RESULTS_DIR = "data/results"
+REPORT_NAME = "run_report.json"
+HISTORY_NAME = "run_history.jsonl"
+
+ENV_SPOOL = "SOLAR_RUN_SPOOL"
+ENV_PROFILE_DIR = "SOLAR_PROFILE_DIR"
+ENV_TRACE_MEMORY = "SOLAR_TRACE_MEMORY"
+
+# Offene Stufen im aktuellen Prozess (für verschachtelte Stufen und note())
+_active = []
+
+
+def enabled():
+    return ENV_SPOOL in os.environ
+
+
+def _rows(obj):
+    """Zeilenzahl aller DataFrames in ``obj`` (auch in Tupeln, Listen und dicts)."""
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return len(obj)
+    if isinstance(obj, dict):
+        obj = obj.values()
+    elif not isinstance(obj, (tuple, list)):
+        return None
+    counts = [n for n in map(_rows, obj) if n is not None]
+    return sum(counts) if counts else None
+
+
+def _peak_rss_mb():
+    # VmHWM gehört zum aktuellen Adressraum; ru_maxrss übernimmt unter Linux
+    # nach fork/exec den Höchstwert des Elternprozesses
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss: KiB unter Linux, Bytes unter macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20
+
+
+def note(rows_in=None, rows_out=None, dropped=None):
+    """
+    Ergänzt Zeilenzahlen der innersten laufenden Stufe.
+
+    ``dropped`` ist ein dict ``{maske: anzahl}``; Werte werden addiert (z.B.
+    über mehrere Blöcke eines Loaders).
+    """
+    if not _active:
+        return
+    record = _active[-1]
+    if rows_in is not None:
+        record["rows_in"] = rows_in
+    if rows_out is not None:
+        record["rows_out"] = rows_out
+    for mask, count in (dropped or {}).items():
+        record["dropped"][mask] = record["dropped"].get(mask, 0) + int(count)
+
+
+def _append(record):
+    line = json.dumps(record, default=str) + "\n"
+    with open(os.environ[ENV_SPOOL], "a") as fh:
+        fh.write(line)
+
+
+@contextmanager
+def stage(name, rows_in=None):
+    """Misst den Block als Stufe ``name`` (ohne laufenden Lauf: kein Effekt)."""
+    if not enabled():
+        yield None
+        return
+
+    trace = os.environ.get(ENV_TRACE_MEMORY) == "1"
+    if trace and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    profile_dir = os.environ.get(ENV_PROFILE_DIR)
+
+    record = {
+        "stage": name,
+        "parent": _active[-1]["stage"] if _active else None,
+        "pid": os.getpid(),
+        "started": time.time(),
+        "rows_in": rows_in,
+        "rows_out": None,
+        "dropped": {},
+    }
+    if trace:
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        record["_peak"] = base
+    # cProfile nur für die äußerste Stufe im Prozess (Profiler lassen sich nicht schachteln)
+    profiler = cProfile.Profile() if profile_dir and not _active else None
+    _active.append(record)
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    if profiler:
+        profiler.enable()
+    try:
+        yield record
+    finally:
+        if profiler:
+            profiler.disable()
+        record["wall_s"] = time.perf_counter() - wall
+        record["cpu_s"] = time.process_time() - cpu
+        record["peak_rss_mb"] = _peak_rss_mb()
+        _active.pop()
+        if trace:
+            peak = max(tracemalloc.get_traced_memory()[1], record.pop("_peak"))
+            record["tracemalloc_peak_mb"] = (peak - base) / 2**20
+            if _active:  # Spitze an die äußere Stufe weitergeben
+                _active[-1]["_peak"] = max(_active[-1]["_peak"], peak)
+        if record["rows_in"] is not None and record["rows_out"] is not None:
+            record["rows_dropped"] = record["rows_in"] - record["rows_out"]
+        if profiler:
+            path = Path(profile_dir) / f"{name}-{os.getpid()}.prof"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(path)
+            record["profile"] = str(path)
+        _append(record)
+
+
+def measure(name):
+    """
+    Dekorator: misst jeden Aufruf als Stufe ``name``.
+
+    Zeilen hinein/heraus werden aus den DataFrame-Argumenten bzw. dem Ergebnis
+    gezählt, sofern die Funktion sie nicht selbst per ``note()`` setzt.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled():
+                return func(*args, **kwargs)
+            with stage(name, _rows(list(args) + list(kwargs.values()))) as record:
+                result = func(*args, **kwargs)
+                if record["rows_out"] is None:
+                    record["rows_out"] = _rows(result)
+                return result
+        return wrapper
+    return decorator
+
+
+def start_run(results_dir=RESULTS_DIR, profile=False, trace_memory=False):
+    """Schaltet die Instrumentierung für diesen Prozess und seine Worker ein."""
+    run_id = datetime.now().strftime("%Y%m%d-%H%M%S")
+    Path(results_dir).mkdir(parents=True, exist_ok=True)
+    spool = Path(results_dir) / f".run_{run_id}_{os.getpid()}.jsonl"
+    spool.write_text("")
+    os.environ[ENV_SPOOL] = str(spool)
+    if profile:
+        os.environ[ENV_PROFILE_DIR] = str(Path(results_dir) / "profiles" / run_id)
+    if trace_memory:
+        os.environ[ENV_TRACE_MEMORY] = "1"
+    return {"run_id": run_id, "started": datetime.now().isoformat(timespec="seconds"),
+            "start": time.perf_counter(), "results_dir": results_dir}
+
+
+def finish_run(run, argv=None):
+    """
+    Schreibt den Laufbericht (JSON) und hängt eine Kurzfassung an die Historie an.
+
+    Gibt den Bericht als dict zurück.
+    """
+    spool = Path(os.environ.pop(ENV_SPOOL))
+    os.environ.pop(ENV_PROFILE_DIR, None)
+    os.environ.pop(ENV_TRACE_MEMORY, None)
+    records = [json.loads(line) for line in spool.read_text().splitlines() if line]
+    records.sort(key=lambda r: r["started"])
+    spool.unlink()
+
+    report = {
+        "run_id": run["run_id"],
+        "started": run["started"],
+        "wall_s": time.perf_counter() - run["start"],
+        "argv": list(sys.argv if argv is None else argv),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "cpu_count": os.cpu_count(),
+        "stages": records,
+    }
+    results_dir = Path(run["results_dir"])
+    (results_dir / REPORT_NAME).write_text(json.dumps(report, indent=2))
+
+    totals = {}
+    for r in records:
+        totals[r["stage"]] = totals.get(r["stage"], 0.0) + r["wall_s"]
+    summary = {"run_id": report["run_id"], "wall_s": round(report["wall_s"], 4),
+               "stages": {k: round(v, 4) for k, v in totals.items()}}
+    with open(results_dir / HISTORY_NAME, "a") as fh:
+        fh.write(json.dumps(summary) + "\n")
+    return report
+
+
+def print_report(report):
+    """Tabelle der Stufen (Wall, CPU, Peak-RSS, Zeilen) auf der Konsole."""
+    print(f"\n{'Stufe':<28} {'Wall':>8} {'CPU':>8} {'RSS MB':>8} {'rein':>9} {'raus':>9} {'verworfen':>9}")
+    for r in report["stages"]:
+        name = r["stage"] if r["parent"] is None else f"  {r['stage']}"
+        cells = [r.get(k) for k in ("rows_in", "rows_out", "rows_dropped")]
+        rows = " ".join(f"{'' if c is None else c:>9}" for c in cells)
+        print(f"{name:<28} {r['wall_s']:7.3f}s {r['cpu_s']:7.3f}s {r['peak_rss_mb']:8.1f} {rows}")
+    print(f"Gesamt: {report['wall_s']:.2f} s – Bericht: {RESULTS_DIR}/{REPORT_NAME}")
@@ -0,0 +1,124 @@
+"""
+Lag-Korrelationen über beliebige Lag-Bereiche per FFT-Kreuzkorrelation
+
+Für jedes Paar (Treiber x, Ziel y) wird die Pearson-Korrelation
+
+    r(k) = corr(x[t - k], y[t]),  k = 0 .. max_lag
+
+berechnet, d.h. der Treiber läuft dem Ziel um k Zeitschritte voraus (wie
+``sn_lag_{k}m`` im Master-Dataset). Statt pro Lag eine ``shift()``-Spalte
+anzulegen, werden alle benötigten Summen (Anzahl, Σx, Σy, Σx², Σy², Σxy über
+die jeweils gültigen Paare) als Kreuzkorrelationen von maskierten Reihen in
+einem Durchgang per FFT berechnet. Fehlende Werte (NaN) werden über die Masken
+korrekt ausgeschlossen; das Ergebnis entspricht paarweisem ``dropna()``.
+
+Die Reihen müssen auf einem lückenlosen Zeitraster liegen (fehlende Zeitpunkte
+als NaN), siehe ``cleaning.calendar_frame``.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Standard-Lagbereiche
+MAX_LAG_MONTHS = 60
+MAX_LAG_DAYS = 400
+
+# Mindestanzahl gültiger Paare für einen Korrelationswert
+MIN_PERIODS = 3
+
+
+def _fft_length(n):
+    """Kleinste Zweierpotenz >= n."""
+    return 1 << max(int(n) - 1, 0).bit_length()
+
+
+def _center(a, valid):
+    """Zieht den Mittelwert der gültigen Werte ab und setzt ungültige auf 0."""
+    a = np.where(valid, a, 0.0)
+    mean = a.sum(axis=1, keepdims=True) / np.maximum(valid.sum(axis=1, keepdims=True), 1)
+    return np.where(valid, a - mean, 0.0)
+
+
+def lagged_moments(x, y, max_lag):
+    """
+    Summen über gültige Paare (x[t - k], y[t]) für alle Lags k = 0 .. max_lag.
+
+    ``x`` hat die Form (p, n), ``y`` die Form (q, n). Zurückgegeben wird ein dict
+    mit den Arrays ``n``, ``sx``, ``sy``, ``sxx``, ``syy``, ``sxy`` der Form
+    (p, q, max_lag + 1). Die Reihen werden vorher um ihren Mittelwert zentriert
+    (numerisch stabiler, Pearson-r ist davon unabhängig).
+    """
+    x = np.atleast_2d(np.asarray(x, dtype=float))
+    y = np.atleast_2d(np.asarray(y, dtype=float))
+    n = x.shape[1]
+    if y.shape[1] != n:
+        raise ValueError("x und y müssen dieselbe Länge haben")
+    max_lag = min(int(max_lag), n - 1)
+
+    mx, my = ~np.isnan(x), ~np.isnan(y)
+    x0 = _center(x, mx)
+    y0 = _center(y, my)
+
+    nfft = _fft_length(n + max_lag)
+
+    def spectrum(a):
+        return np.fft.rfft(a, nfft, axis=-1)
+
+    fx = [spectrum(mx.astype(float)), spectrum(x0), spectrum(x0 * x0)]
+    fy = [spectrum(my.astype(float)), spectrum(y0), spectrum(y0 * y0)]
+
+    def xcorr(a, b):
+        # sum_s a[s] * b[s + k] für k = 0 .. max_lag, alle Paare gleichzeitig
+        prod = np.conj(a)[:, None, :] * b[None, :, :]
+        return np.fft.irfft(prod, nfft, axis=-1)[..., :max_lag + 1]
+
+    return {
+        "n": np.rint(xcorr(fx[0], fy[0])),
+        "sx": xcorr(fx[1], fy[0]),
+        "sy": xcorr(fx[0], fy[1]),
+        "sxx": xcorr(fx[2], fy[0]),
+        "syy": xcorr(fx[0], fy[2]),
+        "sxy": xcorr(fx[1], fy[1]),
+    }
+
+
+def lag_correlation(x, y, max_lag, min_periods=MIN_PERIODS):
+    """
+    Pearson-r für alle Lags 0 .. max_lag und alle Paare aus ``x`` (p, n) × ``y`` (q, n).
+
+    Gibt (r, n) zurück, beide mit der Form (p, q, max_lag + 1). Lags mit weniger
+    als ``min_periods`` gültigen Paaren oder ohne Varianz ergeben NaN.
+    """
+    m = lagged_moments(x, y, max_lag)
+    n = m["n"]
+    cov = n * m["sxy"] - m["sx"] * m["sy"]
+    var_x = n * m["sxx"] - m["sx"] ** 2
+    var_y = n * m["syy"] - m["sy"] ** 2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r = cov / np.sqrt(var_x * var_y)
+    r[(n < min_periods) | (var_x <= 0) | (var_y <= 0)] = np.nan
+    return np.clip(r, -1.0, 1.0), n.astype(int)
+
+
+def lag_spectrum(df, drivers, targets, max_lag, min_periods=MIN_PERIODS):
+    """
+    Lag-Spektrum als tidy-Tabelle mit den Spalten driver, target, lag, r, n.
+
+    ``df`` muss auf einem lückenlosen Zeitraster liegen (eine Zeile pro
+    Zeitschritt, fehlende Werte als NaN).
+    """
+    x = df[drivers].to_numpy(dtype=float).T
+    y = df[targets].to_numpy(dtype=float).T
+    r, n = lag_correlation(x, y, max_lag, min_periods)
+
+    lags = np.arange(r.shape[2])
+    d_idx, t_idx, l_idx = np.meshgrid(
+        np.arange(len(drivers)), np.arange(len(targets)), lags, indexing="ij"
+    )
+    return pd.DataFrame({
+        "driver": np.asarray(drivers)[d_idx.ravel()],
+        "target": np.asarray(targets)[t_idx.ravel()],
+        "lag": l_idx.ravel(),
+        "r": r.ravel(),
+        "n": n.ravel(),
+    })
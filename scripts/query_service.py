@@ -0,0 +1,302 @@
+"""
+Lokaler Abfragedienst (HTTP/JSON) über die verarbeiteten Reihen
+
+Statt die CSV-Dateien in ``data/processed/`` bei jeder Abfrage neu zu parsen,
+öffnet der Dienst die Binärreihen aus ``data/processed/series/`` (siehe
+``series_store.py``) einmal memory-mapped und beantwortet Abfragen direkt aus
+den Arrays. Eine Reihe ``<quelle>_<auflösung>`` (z.B. ``kp_daily``,
+``master_monthly``) wird über Quelle und Auflösung angesprochen.
+
+Endpunkte (alle GET, Antworten als JSON, fehlende Werte als ``null``):
+
+- ``/sources``: verfügbare Quellen, Auflösungen, Spalten und Zeiträume
+- ``/series?source=kp&column=ap&resolution=daily&start=2003-10-01&end=2003-11-30&lag=0``:
+  Werte im Bereich [start, end]; mit ``lag=k`` der Wert k Zeitschritte vorher
+  (wie ``sn_lag_{k}m`` im Master-Dataset)
+- ``/correlation?source=master&x=sn&y=kp&resolution=monthly&start=…&end=…&lag=3``:
+  Pearson-r und Anzahl gültiger Paare von x[t - lag] und y[t] im Bereich
+
+Der Bereich wird per Binärsuche (``np.searchsorted``) auf den Datumsarrays
+bestimmt. Jede Antwort wird fertig kodiert in einem LRU-Cache
+(``functools.lru_cache``, ``--cache-size`` Einträge) abgelegt; wiederholte
+Abfragen kosten nur noch den Cache-Zugriff.
+
+Alle Daten und der Cache gehören zu einem unveränderlichen ``Snapshot``. Ein
+Hintergrund-Thread prüft regelmäßig die ``header.json``-Dateien der Reihen;
+hat ``run_pipeline.py`` neue Ausgaben geschrieben, wird ein neuer Snapshot
+vollständig aufgebaut und danach mit einer einzigen Zuweisung ausgetauscht.
+Laufende Abfragen arbeiten mit dem Snapshot weiter, den sie zu Beginn gelesen
+haben; Leser warten nie auf eine Sperre. Jeder Client wird in einem eigenen
+Thread bedient (``ThreadingHTTPServer``).
+
+Ausführung (vom Hauptverzeichnis):
+    python scripts/query_service.py                 # http://127.0.0.1:8050
+    python scripts/query_service.py --port 9000 --cache-size 4096
+"""
+
+import argparse
+import functools
+import json
+import os
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+import series_store
+
+HOST = "127.0.0.1"
+PORT = 8050
+CACHE_SIZE = 1024
+RELOAD_INTERVAL_S = 2.0
+
+RESOLUTIONS = {"daily": "D", "monthly": "MS"}
+
+
+class QueryError(ValueError):
+    """Ungültige Abfrage (Antwort 400)."""
+
+
+def _signature(store_dir):
+    """(Name, mtime, Größe) aller ``header.json``; ändert sich bei jedem neuen Stand."""
+    signature = []
+    for path in sorted(Path(store_dir).glob("*/header.json")):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        signature.append((path.parent.name, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def _json(payload):
+    return json.dumps(payload, separators=(",", ":"), allow_nan=False).encode()
+
+
+def _values(array):
+    """Liste für JSON; NaN wird zu None."""
+    return [None if v != v else v for v in array.tolist()]
+
+
+class Snapshot:
+    """
+    Ein geladener Stand aller Reihen mit eigenem LRU-Cache.
+
+    Wird nach dem Aufbau nicht mehr verändert; ``query`` ist threadsicher.
+    """
+
+    def __init__(self, store_dir, cache_size=CACHE_SIZE):
+        self.signature = _signature(store_dir)
+        self.loaded = datetime.now().isoformat(timespec="seconds")
+        self.series = {}
+        for name, _, _ in self.signature:
+            source, _, resolution = name.rpartition("_")
+            if resolution not in RESOLUTIONS:
+                continue
+            header, arrays = series_store.load_arrays(name, store_dir=store_dir)
+            dates = series_store.dates(header).astype("datetime64[D]")
+            self.series[(source, resolution)] = (header, dates, arrays)
+        self.query = functools.lru_cache(maxsize=cache_size)(self._query)
+
+    def _series(self, source, resolution):
+        try:
+            return self.series[(source, resolution)]
+        except KeyError:
+            raise QueryError(f"Unbekannte Reihe: source={source}, resolution={resolution}") from None
+
+    @staticmethod
+    def _column(arrays, column):
+        try:
+            return arrays[column]
+        except KeyError:
+            raise QueryError(f"Unbekannte Spalte: {column}") from None
+
+    @staticmethod
+    def _range(dates, start, end):
+        """Positionen [lo, hi) der Zeilen mit start <= Datum <= end (Binärsuche)."""
+        try:
+            lo = 0 if start is None else np.searchsorted(dates, np.datetime64(start, "D"), "left")
+            hi = len(dates) if end is None else np.searchsorted(dates, np.datetime64(end, "D"), "right")
+        except ValueError:
+            raise QueryError(f"Ungültiges Datum: start={start}, end={end}") from None
+        return int(lo), int(max(hi, lo))
+
+    @staticmethod
+    def _lagged(values, lo, hi, lag):
+        """values[t - lag] für t in [lo, hi); Positionen vor dem Anfang sind NaN."""
+        first = lo - lag
+        out = np.full(hi - lo, np.nan)
+        src = values[max(first, 0):max(hi - lag, 0)]
+        out[len(out) - len(src):] = src
+        return out
+
+    def _query(self, kind, source, resolution, start, end, lag, columns):
+        """Kodierte JSON-Antwort (bytes) für eine normalisierte Abfrage."""
+        header, dates, arrays = self._series(source, resolution)
+        lo, hi = self._range(dates, start, end)
+        if kind == "series":
+            (column,) = columns
+            values = self._lagged(self._column(arrays, column), lo, hi, lag)
+            return _json({
+                "source": source, "resolution": resolution, "column": column, "lag": lag,
+                "dates": np.datetime_as_string(dates[lo:hi]).tolist(),
+                "values": _values(values),
+            })
+
+        x_col, y_col = columns
+        x = self._lagged(self._column(arrays, x_col), lo, hi, lag)
+        y = np.asarray(self._column(arrays, y_col)[lo:hi], dtype=float)
+        valid = ~np.isnan(x) & ~np.isnan(y)
+        n = int(valid.sum())
+        r = None
+        if n >= 3:
+            xv, yv = x[valid] - x[valid].mean(), y[valid] - y[valid].mean()
+            denom = np.sqrt((xv * xv).sum() * (yv * yv).sum())
+            r = float((xv * yv).sum() / denom) if denom > 0 else None
+        return _json({
+            "source": source, "resolution": resolution, "x": x_col, "y": y_col, "lag": lag,
+            "start": np.datetime_as_string(dates[lo]).item() if hi > lo else None,
+            "end": np.datetime_as_string(dates[hi - 1]).item() if hi > lo else None,
+            "r": r, "n": n,
+        })
+
+    def sources(self):
+        listing = [
+            {
+                "source": source, "resolution": resolution,
+                "columns": list(arrays),
+                "start": np.datetime_as_string(dates[0]).item(),
+                "end": np.datetime_as_string(dates[-1]).item(),
+                "length": len(dates), "generation": header["generation"],
+            }
+            for (source, resolution), (header, dates, arrays) in sorted(self.series.items())
+        ]
+        return _json({"loaded": self.loaded, "series": listing})
+
+
+class QueryService:
+    """Hält den aktuellen Snapshot und tauscht ihn bei neuen Ausgaben aus."""
+
+    def __init__(self, store_dir=series_store.SERIES_DIR, cache_size=CACHE_SIZE,
+                 reload_interval=RELOAD_INTERVAL_S):
+        self.store_dir = store_dir
+        self.cache_size = cache_size
+        self.reload_interval = reload_interval
+        self.snapshot = Snapshot(store_dir, cache_size)
+        self._stop = threading.Event()
+
+    def reload_if_changed(self):
+        """Lädt einen neuen Snapshot, falls sich eine Reihe geändert hat; True bei Austausch."""
+        if _signature(self.store_dir) == self.snapshot.signature:
+            return False
+        try:
+            snapshot = Snapshot(self.store_dir, self.cache_size)
+        except (OSError, ValueError, KeyError) as exc:
+            # z.B. Reihe wird gerade geschrieben: alten Stand behalten, später erneut versuchen
+            print(f"Neuladen fehlgeschlagen ({exc}); alter Stand bleibt aktiv")
+            return False
+        self.snapshot = snapshot  # atomarer Austausch (eine Referenzzuweisung)
+        print(f"Neu geladen: {len(snapshot.series)} Reihen ({snapshot.loaded})")
+        return True
+
+    def _watch(self):
+        while not self._stop.wait(self.reload_interval):
+            self.reload_if_changed()
+
+    def start_watcher(self):
+        threading.Thread(target=self._watch, name="reload", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def handle(self, path, params):
+        """Beantwortet eine Abfrage; gibt (Status, JSON-bytes) zurück."""
+        snapshot = self.snapshot  # ein Stand für die ganze Abfrage
+
+        def param(name, default=None):
+            return params.get(name, [default])[0]
+
+        try:
+            if path == "/sources":
+                return 200, snapshot.sources()
+            if path not in ("/series", "/correlation"):
+                return 404, _json({"error": f"Unbekannter Endpunkt: {path}"})
+            resolution = param("resolution", "daily")
+            try:
+                lag = int(param("lag", 0))
+            except ValueError:
+                raise QueryError(f"Ungültiger Lag: {param('lag')}") from None
+            if lag < 0:
+                raise QueryError("Lag muss >= 0 sein")
+            if path == "/series":
+                kind, columns = "series", (param("column"),)
+            else:
+                kind, columns = "correlation", (param("x"), param("y"))
+            if None in columns or param("source") is None:
+                raise QueryError("Parameter source und column bzw. x und y sind erforderlich")
+            body = snapshot.query(kind, param("source"), resolution, param("start"), param("end"),
+                                  lag, columns)
+            return 200, body
+        except QueryError as exc:
+            return 400, _json({"error": str(exc)})
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-Alive: eine Verbindung pro Client
+        # Kopf und Inhalt gehen getrennt raus; ohne TCP_NODELAY warten beide auf das verzögerte ACK (~40 ms)
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            status, body = service.handle(url.path, parse_qs(url.query))
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # keine Zeile pro Abfrage auf der Konsole
+
+    return Handler
+
+
+def serve(host=HOST, port=PORT, store_dir=series_store.SERIES_DIR, cache_size=CACHE_SIZE,
+          reload_interval=RELOAD_INTERVAL_S):
+    """Startet den Dienst (blockiert bis Strg+C)."""
+    service = QueryService(store_dir, cache_size, reload_interval)
+    service.start_watcher()
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    server.daemon_threads = True
+    print(f"Abfragedienst auf http://{host}:{port} ({len(service.snapshot.series)} Reihen aus {store_dir})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lokaler HTTP/JSON-Abfragedienst über die verarbeiteten Reihen")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--series-dir", default=series_store.SERIES_DIR,
+                        help="Verzeichnis der Binärreihen (Standard: data/processed/series)")
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE,
+                        help="Anzahl zwischengespeicherter Antworten (LRU)")
+    parser.add_argument("--reload-interval", type=float, default=RELOAD_INTERVAL_S,
+                        help="Sekunden zwischen zwei Prüfungen auf neue Ausgaben")
+    args = parser.parse_args(argv)
+    if not os.path.isdir(args.series_dir):
+        parser.error(f"{args.series_dir} fehlt – zuerst run_pipeline.py ausführen")
+    serve(args.host, args.port, args.series_dir, args.cache_size, args.reload_interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+27-Tage-Wiederkehr (Sonnenrotation) in den Tagesreihen
+
+Zwei Auswertungen auf dem täglichen Kalenderraster (siehe
+``cleaning.calendar_frame``):
+
+- Auto- und Kreuzkorrelationen von Kp, ap, Sunspots und F10.7 für alle Lags
+  bis ``ROTATIONS`` Sonnenrotationen. Die Summen über gültige Paare kommen aus
+  ``lag_correlation.lag_spectrum`` (FFT-Kreuzkorrelation maskierter Reihen),
+  Lücken sind damit korrekt ausgeschlossen. Jedes Paar steht in beiden
+  Richtungen in der Tabelle; (kp, kp) ist die Autokorrelation von Kp.
+- Bartels-Matrix: die Reihen werden an Bartels-Rotationen zu genau 27 Tagen
+  ausgerichtet (Rotation 1 begann am 1832-02-08), mit NaN auf ein Vielfaches
+  von 27 Tagen aufgefüllt und per ``reshape`` zu Rotation × Tag der Rotation
+  umgeformt. Jede Zeile erhält die Carrington-Rotation an ihrem ersten Tag
+  (aus ``fluxcarrington``, siehe ``aggregation.carrington_model``) und die
+  Korrelation mit der vorherigen Zeile als Maß für die Wiederkehr in dieser
+  Rotation.
+"""
+
+import numpy as np
+import pandas as pd
+
+import aggregation
+import lag_correlation
+
+BARTELS_DAYS = 27
+BARTELS_EPOCH = "1832-02-08"  # Beginn von Bartels-Rotation 1
+ROTATIONS = 6                 # Lags bis 6 × 27 = 162 Tage
+
+RECURRENCE_VARS = ["kp", "ap", "sn", "fluxadjflux"]
+# Mindestanzahl gemeinsamer Tage für die Korrelation zweier Rotationen
+MIN_ROTATION_DAYS = 10
+
+
+def recurrence_spectrum(daily_grid, variables=RECURRENCE_VARS, rotations=ROTATIONS):
+    """
+    Auto- und Kreuzkorrelationen aller ``variables`` für Lags 0 .. rotations × 27 Tage.
+
+    Tidy-Tabelle wie ``lag_correlation.lag_spectrum`` (driver, target, lag, r,
+    n); ``driver`` läuft ``target`` um ``lag`` Tage voraus.
+    """
+    variables = [v for v in variables if v in daily_grid]
+    return lag_correlation.lag_spectrum(daily_grid, variables, variables, rotations * BARTELS_DAYS)
+
+
+def bartels_matrix(values, first_day):
+    """
+    Formt Tagesreihen zu Rotation × Tag der Rotation um.
+
+    ``values`` hat die Form (Variablen, Tage), ``first_day`` ist die
+    Tagesnummer (seit 1970-01-01) der ersten Spalte. Gibt (rotation, matrix)
+    zurück: Bartels-Nummer jeder Zeile und ein Array der Form
+    (Variablen, Rotationen, 27).
+    """
+    values = np.asarray(values, dtype=float)
+    epoch = aggregation.day_numbers([BARTELS_EPOCH])[0]
+    lead = (first_day - epoch) % BARTELS_DAYS
+    rows = -(-(lead + values.shape[1]) // BARTELS_DAYS)
+    padded = np.full((values.shape[0], rows * BARTELS_DAYS), np.nan)
+    padded[:, lead:lead + values.shape[1]] = values
+    first_rotation = (first_day - lead - epoch) // BARTELS_DAYS + 1
+    return first_rotation + np.arange(rows), padded.reshape(values.shape[0], rows, BARTELS_DAYS)
+
+
+def rotation_recurrence(matrix, min_periods=MIN_ROTATION_DAYS):
+    """
+    Pearson-r jeder Rotation mit der vorherigen (gleicher Tag der Rotation).
+
+    ``matrix`` hat die Form (Variablen, Rotationen, 27); die erste Rotation
+    und Paare mit weniger als ``min_periods`` gemeinsamen Tagen ergeben NaN.
+    """
+    x, y = matrix[:, :-1], matrix[:, 1:]
+    valid = ~np.isnan(x) & ~np.isnan(y)
+    n = valid.sum(axis=2)
+    x0 = np.where(valid, x, 0.0)
+    y0 = np.where(valid, y, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x0 = np.where(valid, x0 - x0.sum(axis=2, keepdims=True) / n[..., None], 0.0)
+        y0 = np.where(valid, y0 - y0.sum(axis=2, keepdims=True) / n[..., None], 0.0)
+        r = (x0 * y0).sum(axis=2) / np.sqrt((x0 ** 2).sum(axis=2) * (y0 ** 2).sum(axis=2))
+    r[n < min_periods] = np.nan
+    first = np.full((matrix.shape[0], 1), np.nan)
+    return np.concatenate([first, r], axis=1)
+
+
+def bartels_table(daily_grid, variables=RECURRENCE_VARS, carrington=None):
+    """
+    Bartels-Matrix als Tabelle: eine Zeile pro Variable und Rotation.
+
+    Spalten: variable, rotation (Bartels-Nummer), start, carrington
+    (Carrington-Rotation am ersten Tag), recurrence_r (Korrelation mit der
+    vorherigen Rotation) und ``day_01`` … ``day_27``. Rotationen ohne einen
+    einzigen Wert der Variable werden weggelassen.
+    """
+    variables = [v for v in variables if v in daily_grid]
+    first_day = aggregation.day_numbers(daily_grid.index[:1])[0]
+    values = daily_grid[variables].to_numpy(dtype=float).T
+    rotation, matrix = bartels_matrix(values, first_day)
+
+    epoch = aggregation.day_numbers([BARTELS_EPOCH])[0]
+    start_day = epoch + (rotation - 1) * BARTELS_DAYS
+    intercept, slope = carrington or aggregation.carrington_model()
+
+    n_vars, n_rot, _ = matrix.shape
+    table = pd.DataFrame({
+        "variable": np.repeat(variables, n_rot),
+        "rotation": np.tile(rotation, n_vars),
+        "start": np.tile(start_day.astype("datetime64[D]").astype("datetime64[ns]"), n_vars),
+        "carrington": np.tile(intercept + slope * start_day, n_vars),
+        "recurrence_r": rotation_recurrence(matrix).ravel(),
+    })
+    days = pd.DataFrame(matrix.reshape(n_vars * n_rot, BARTELS_DAYS),
+                        columns=[f"day_{d:02d}" for d in range(1, BARTELS_DAYS + 1)])
+    table = pd.concat([table, days], axis=1)
+    return table[~np.isnan(matrix).all(axis=2).ravel()].reset_index(drop=True)
+
+
+def recurrence(daily_grid, carrington=None):
+    """Gibt (recurrence_spectrum, bartels_table) für das tägliche Raster zurück."""
+    return recurrence_spectrum(daily_grid), bartels_table(daily_grid, carrington=carrington)
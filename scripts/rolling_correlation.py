@@ -0,0 +1,100 @@
+"""
+Gleitende (rollende) Pearson-Korrelation mit linearem Aufwand
+
+Die Fenster-Summen (Anzahl, Σx, Σy, Σx², Σy², Σxy über Zeitpunkte, an denen
+beide Reihen gültig sind) werden aus kumulierten Summen als Differenz
+``cs[t] - cs[t - w]`` gebildet. Der Aufwand ist damit O(n) pro Reihe und
+Fenster, unabhängig von der Fenstergröße.
+
+Die Reihen müssen auf einem lückenlosen Zeitraster liegen (siehe
+``cleaning.calendar_frame``); das Fenster endet jeweils am Zeitstempel der Zeile.
+"""
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+
+# Standardfenster (in Zeitschritten des jeweiligen Rasters)
+CARRINGTON_DAYS = 27
+SOLAR_CYCLE_DAYS = 4018    # ~11 Jahre
+SOLAR_CYCLE_MONTHS = 132   # ~11 Jahre
+
+ROLLING_WINDOWS_DAILY = [CARRINGTON_DAYS, 365, SOLAR_CYCLE_DAYS]
+ROLLING_WINDOWS_MONTHLY = [12, SOLAR_CYCLE_MONTHS]
+
+# Standardpaare (x, y)
+ROLLING_PAIRS = [
+    ("sn", "kp"),
+    ("sn", "ap"),
+    ("fluxadjflux", "kp"),
+    ("fluxadjflux", "ap"),
+    ("sn", "fluxadjflux"),
+]
+
+
+def _window_sums(a, window):
+    """Summe über die letzten ``window`` Werte für jede Position (O(n))."""
+    cs = np.concatenate(([0.0], np.cumsum(a)))
+    out = cs[1:].copy()
+    out[window:] -= cs[1:-window]
+    return out
+
+
+def rolling_corr(x, y, window, min_periods=None):
+    """
+    Rollende Pearson-Korrelation zweier gleich langer Arrays (NaN = fehlend).
+
+    Gibt (r, n) zurück; ``n`` ist die Anzahl gültiger Paare im Fenster. Fenster
+    mit weniger als ``min_periods`` Paaren (Standard: halbe Fensterlänge,
+    mindestens 3) ergeben NaN.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if min_periods is None:
+        min_periods = max(3, window // 2)
+
+    valid = ~np.isnan(x) & ~np.isnan(y)
+    # Zentrieren hält die kumulierten Summen klein (weniger Auslöschung)
+    x0 = np.where(valid, x - (x[valid].mean() if valid.any() else 0.0), 0.0)
+    y0 = np.where(valid, y - (y[valid].mean() if valid.any() else 0.0), 0.0)
+
+    n = _window_sums(valid.astype(float), window)
+    sx = _window_sums(x0, window)
+    sy = _window_sums(y0, window)
+    sxx = _window_sums(x0 * x0, window)
+    syy = _window_sums(y0 * y0, window)
+    sxy = _window_sums(x0 * y0, window)
+
+    cov = n * sxy - sx * sy
+    var_x = n * sxx - sx ** 2
+    var_y = n * syy - sy ** 2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r = cov / np.sqrt(var_x * var_y)
+    n = np.rint(n).astype(int)
+    # relative Schwelle gegen Rundungsreste aus den kumulierten Summen
+    eps = 1e-10 * n * np.maximum(sxx, syy)
+    r[(n < min_periods) | (var_x <= eps) | (var_y <= eps)] = np.nan
+    return np.clip(r, -1.0, 1.0), n
+
+
+@instrumentation.measure("rolling_correlation")
+def rolling_correlations(df, pairs=ROLLING_PAIRS, windows=ROLLING_WINDOWS_MONTHLY,
+                         unit="m", min_periods=None):
+    """
+    Rollende Korrelationen für alle Paare × Fenster eines Frames aus ``calendar_frame``.
+
+    Gibt einen DataFrame mit Spalte ``date`` und einer Spalte
+    ``<x>_<y>_<window><unit>`` pro Paar und Fenster zurück (z.B. ``sn_kp_132m``).
+    Zeilen, in denen kein Wert definiert ist, werden weggelassen.
+    """
+    out = {"date": df.index}
+    for x, y in pairs:
+        for window in windows:
+            r, _ = rolling_corr(df[x].to_numpy(dtype=float, na_value=np.nan),
+                                df[y].to_numpy(dtype=float, na_value=np.nan),
+                                window, min_periods)
+            out[f"{x}_{y}_{window}{unit}"] = r
+    result = pd.DataFrame(out)
+    value_cols = result.columns[1:]
+    return result.dropna(subset=value_cols, how="all").reset_index(drop=True)
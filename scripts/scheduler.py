@@ -0,0 +1,195 @@
+"""
+Make-artiger Scheduler für die Pipeline-Stufen
+
+Jede Stufe deklariert ihre Eingabe- und Ausgabedateien (``Stage``). Daraus
+ergibt sich der Abhängigkeitsgraph: Stufe B hängt von Stufe A ab, wenn eine
+Eingabe von B eine Ausgabe von A ist.
+
+Eine Stufe wird nur ausgeführt, wenn
+- eine ihrer Ausgaben fehlt,
+- sie noch nie (mit denselben Ausgaben) gelaufen ist,
+- sich der Inhalt einer Eingabe seit dem letzten Lauf geändert hat, oder
+- sie erzwungen wird (``force``).
+
+Der letzte Stand (Größe, mtime, SHA-256 jeder Eingabe) wird pro Stufe in
+``data/cache/pipeline_state.json`` gemerkt. Ist eine Eingabe neuer als beim
+letzten Lauf (mtime/Größe geändert), wird ihr Inhalt neu gehasht; nur ein
+geänderter Hash löst die Stufe aus. Unveränderte Eingaben werden nicht gelesen.
+
+Stufen, deren Vorgänger fertig sind, laufen gleichzeitig in einem Prozesspool
+(höchstens ein Prozess pro CPU).
+"""
+
+import json
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import cache
+
+STATE_PATH = "data/cache/pipeline_state.json"
+
+# func wird ohne Argumente aufgerufen (ggf. functools.partial) und muss picklebar sein
+Stage = namedtuple("Stage", ["name", "func", "inputs", "outputs"])
+
+
+def dependencies(stages):
+    """``{stufe: {vorgänger}}`` aus den deklarierten Ein- und Ausgaben."""
+    producer = {out: s.name for s in stages for out in s.outputs}
+    return {
+        s.name: {producer[i] for i in s.inputs if i in producer and producer[i] != s.name}
+        for s in stages
+    }
+
+
+def select(stages, only=None):
+    """Namen der Stufen aus ``only`` samt aller Vorgänger (Standard: alle Stufen)."""
+    if not only:
+        return {s.name for s in stages}
+    deps = dependencies(stages)
+    selected, todo = set(), list(only)
+    while todo:
+        name = todo.pop()
+        if name not in selected:
+            selected.add(name)
+            todo.extend(deps[name])
+    return selected
+
+
+def _read_state(path):
+    try:
+        return json.loads(Path(path).read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _write_state(path, state):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    cache._atomic_write(Path(path), lambda tmp: tmp.write_text(json.dumps(state, indent=2, sort_keys=True)))
+
+
+def _signature(path, known=None):
+    """Größe, mtime und SHA-256 von ``path``; der Hash wird bei gleicher Größe/mtime übernommen."""
+    stat = os.stat(path)
+    if known and known.get("size") == stat.st_size and known.get("mtime_ns") == stat.st_mtime_ns:
+        digest = known["sha256"]
+    else:
+        digest = cache.file_hash(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}
+
+
+def outdated(stage, record):
+    """
+    Grund, warum ``stage`` laufen muss, oder None, wenn sie aktuell ist.
+
+    ``record`` ist der gespeicherte Stand des letzten erfolgreichen Laufs.
+    Gibt zusätzlich die aktuellen Signaturen der Eingaben zurück.
+    """
+    known = (record or {}).get("inputs", {})
+    signatures = {path: _signature(path, known.get(path)) for path in stage.inputs}
+    if record is None or sorted(record.get("outputs", [])) != sorted(stage.outputs):
+        return "noch nicht gelaufen", signatures
+    missing = [out for out in stage.outputs if not os.path.exists(out)]
+    if missing:
+        return f"Ausgabe fehlt: {missing[0]}", signatures
+    for path, sig in signatures.items():
+        if known.get(path, {}).get("sha256") != sig["sha256"]:
+            return f"Eingabe geändert: {path}", signatures
+    return None, signatures
+
+
+def _timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def run_stages(stages, only=None, force=None, parallel=True, state_path=STATE_PATH):
+    """
+    Führt die veralteten Stufen aus ``stages`` in Abhängigkeitsreihenfolge aus.
+
+    ``only`` beschränkt den Lauf auf diese Stufen und ihre Vorgänger (die nur
+    laufen, wenn sie veraltet sind). ``force`` ist eine Menge von Stufennamen,
+    die unabhängig von ihrem Stand ausgeführt werden. Schlägt eine Stufe fehl,
+    werden keine weiteren gestartet und die Ausnahme wird weitergereicht.
+
+    Gibt ``{stufe: (status, sekunden)}`` in Ausführungsreihenfolge zurück.
+    """
+    by_name = {s.name: s for s in stages}
+    selected = select(stages, only)
+    deps = dependencies(stages)
+    force = set(force or ())
+    state = _read_state(state_path)
+
+    pending = [s.name for s in stages if s.name in selected]
+    done, report, running = set(), {}, {}
+
+    workers = min(len(pending), os.cpu_count() or 1)
+    pool = ProcessPoolExecutor(max_workers=workers) if parallel and workers > 1 else None
+    error = None
+    try:
+        while pending or running:
+            ready = [n for n in pending if deps[n] & selected <= done] if error is None else []
+            for name in ready:
+                pending.remove(name)
+                stage = by_name[name]
+                reason, signatures = outdated(stage, state.get(name))
+                if name in force:
+                    reason = "erzwungen"
+                if reason is None:
+                    print(f"[{name}] aktuell, übersprungen")
+                    report[name] = ("aktuell", 0.0)
+                    done.add(name)
+                    continue
+                print(f"[{name}] wird ausgeführt ({reason})")
+                if pool is None:
+                    running[name] = (None, signatures)
+                    try:
+                        seconds = _timed(stage.func)
+                    except Exception as e:
+                        error = error or e
+                        running.pop(name)
+                        report[name] = ("fehlgeschlagen", 0.0)
+                        continue
+                    running[name] = (seconds, signatures)
+                else:
+                    running[name] = (pool.submit(_timed, stage.func), signatures)
+
+            if not running:
+                if error is not None or not pending:
+                    break
+                if not ready:
+                    raise ValueError(f"Zyklische Abhängigkeit zwischen: {', '.join(pending)}")
+                continue
+
+            if pool is None:
+                finished = list(running)
+            else:
+                futures = {f: n for n, (f, _) in running.items()}
+                completed, _ = wait(futures, return_when=FIRST_COMPLETED)
+                finished = [futures[f] for f in completed]
+
+            for name in finished:
+                outcome, signatures = running.pop(name)
+                if pool is not None:
+                    try:
+                        outcome = outcome.result()
+                    except Exception as e:
+                        error = error or e
+                        report[name] = ("fehlgeschlagen", 0.0)
+                        continue
+                state[name] = {"inputs": signatures, "outputs": sorted(by_name[name].outputs)}
+                _write_state(state_path, state)
+                report[name] = ("ausgeführt", outcome)
+                done.add(name)
+            if error is not None and not running:
+                break
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    if error is not None:
+        raise error
+    return report
@@ -0,0 +1,135 @@
+"""
+Binärer Zeitreihen-Speicher mit Memory-Mapping (ohne Kopie)
+
+Jede verarbeitete Reihe (z.B. das monatliche Master-Dataset) liegt unter
+``data/processed/series/<name>/`` als
+
+- ``header.json``: Startdatum, Frequenz (``D`` oder ``MS``), Länge,
+  Spaltennamen/-dateien, dtype und NaN-Konvention
+- eine Datei pro Spalte mit rohen Werten (``<f8``, little-endian, ohne Kopf)
+
+Die Reihe liegt auf einem lückenlosen Kalenderraster ab dem Startdatum; das
+Datum jeder Zeile ergibt sich aus Start + Position und wird nicht gespeichert.
+Fehlende Werte (auch ganze fehlende Tage/Monate) sind NaN; ganzzahlige
+Spalten wie ``n_obs`` werden dafür als float64 abgelegt.
+
+``load_arrays`` und ``load_frame`` öffnen die Spaltendateien per ``np.memmap``
+(lesend bzw. Copy-on-Write). Mehrere Prozesse teilen sich damit dieselben Seiten im
+Page-Cache, statt jeweils CSV-Text zu parsen. Neue Stände werden mit einer
+neuen Generationsnummer in den Dateinamen geschrieben und erst danach per
+atomarem Austausch von ``header.json`` sichtbar; Leser, die gerade die
+vorherige Generation geöffnet haben, sind davon nicht betroffen.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import cache
+
+SERIES_DIR = "data/processed/series"
+SERIES_VERSION = 1
+SERIES_DTYPE = "<f8"
+
+
+def header_path(name, store_dir=SERIES_DIR):
+    return Path(store_dir) / name / "header.json"
+
+
+def read_header(name, store_dir=SERIES_DIR):
+    """Liest ``header.json`` der Reihe ``name``."""
+    return json.loads(header_path(name, store_dir).read_text())
+
+
+def dates(header):
+    """Datum jeder Zeile als datetime64[ns] (aus Start, Frequenz und Länge)."""
+    return pd.date_range(header["start"], periods=header["length"], freq=header["freq"]).to_numpy()
+
+
+def write_series(df, name, freq, columns=None, store_dir=SERIES_DIR):
+    """
+    Schreibt einen Frame mit Spalte ``date`` als Reihe ``name``.
+
+    Die Zeilen werden auf das Kalenderraster ``freq`` (``D`` oder ``MS``)
+    gelegt, Lücken als NaN aufgefüllt. ``columns`` wählt die Wertespalten aus
+    (Standard: alle außer ``date``).
+    """
+    columns = [c for c in (columns or df.columns) if c != "date"]
+    grid = df.set_index("date")[columns].sort_index().asfreq(freq)
+    if len(grid) == 0:
+        raise ValueError(f"Reihe {name} ist leer")
+
+    folder = Path(store_dir) / name
+    folder.mkdir(parents=True, exist_ok=True)
+    try:
+        previous = read_header(name, store_dir)
+        generation = previous["generation"] + 1
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        previous, generation = None, 1
+
+    meta = []
+    for col in columns:
+        values = grid[col].to_numpy(dtype=SERIES_DTYPE, na_value=np.nan)
+        filename = f"{col}.{generation}.f8"
+        cache._atomic_write(folder / filename, values.tofile)
+        meta.append({"name": col, "file": filename})
+
+    header = {
+        "version": SERIES_VERSION,
+        "generation": generation,
+        "start": grid.index[0].strftime("%Y-%m-%d"),
+        "freq": freq,
+        "length": len(grid),
+        "dtype": SERIES_DTYPE,
+        "na": "NaN",
+        "columns": meta,
+    }
+    cache._atomic_write(header_path(name, store_dir),
+                        lambda tmp: tmp.write_text(json.dumps(header, indent=2)))
+
+    # Nur die aktuelle und die vorherige Generation behalten
+    keep = {c["file"] for c in meta} | {c["file"] for c in (previous or {}).get("columns", [])}
+    for old in folder.glob("*.f8"):
+        if old.name not in keep:
+            old.unlink(missing_ok=True)
+
+
+def load_arrays(name, columns=None, store_dir=SERIES_DIR, mode="r"):
+    """
+    Öffnet die Spalten der Reihe ``name`` als ``np.memmap``.
+
+    Gibt (header, {spalte: memmap}) zurück; es werden keine Daten kopiert.
+    ``mode="r"`` ist schreibgeschützt, ``mode="c"`` erlaubt Änderungen im
+    Speicher (Copy-on-Write pro Seite, die Datei bleibt unverändert).
+    """
+    header = read_header(name, store_dir)
+    if header.get("version") != SERIES_VERSION:
+        raise ValueError(f"Unbekannte Version der Reihe {name}: {header.get('version')}")
+    folder = Path(store_dir) / name
+    wanted = columns or [c["name"] for c in header["columns"]]
+    files = {c["name"]: c["file"] for c in header["columns"]}
+    arrays = {
+        col: np.memmap(folder / files[col], dtype=header["dtype"], mode=mode,
+                       shape=(header["length"],))
+        for col in wanted
+    }
+    return header, arrays
+
+
+def load_frame(name, columns=None, store_dir=SERIES_DIR):
+    """
+    DataFrame der Reihe ``name`` mit Spalte ``date`` und den memory-mapped Spalten.
+
+    Die Wertespalten verweisen direkt auf die Dateien (keine Kopie). Sie sind
+    im Copy-on-Write-Modus geöffnet: Änderungen am Frame kopieren nur die
+    betroffenen Seiten und landen nie in der Datei.
+    """
+    header, arrays = load_arrays(name, columns, store_dir, mode="c")
+    return pd.DataFrame({"date": dates(header), **arrays}, copy=False)
+
+
+def exists(name, store_dir=SERIES_DIR):
+    return os.path.exists(header_path(name, store_dir))
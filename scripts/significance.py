@@ -0,0 +1,345 @@
+"""
+Konfidenzintervalle und Signifikanz für Korrelationen (autokorrelierte Reihen)
+
+Sonnenfleckenzahl, F10.7 und Kp sind stark autokorreliert (27-Tage-Rotation,
+Jahreszeiten, 11-Jahres-Zyklus); klassische p-Werte für Pearson-r setzen
+unabhängige Beobachtungen voraus und sind hier bedeutungslos. Für jedes
+berichtete Paar und jeden Lag werden deshalb berechnet:
+
+- ein Konfidenzintervall per Block-Bootstrap: die Zeitachse (Zielzeitpunkt t
+  des Paares x[t - k], y[t]) wird in Blöcke von ``BLOCK_LENGTH`` Zeitschritten
+  (ein Jahr) geteilt, Blöcke werden mit Zurücklegen gezogen. Abhängigkeiten
+  innerhalb eines Jahres bleiben erhalten.
+- ein p-Wert gegen phasenrandomisierte Surrogate: der Treiber wird durch
+  Reihen mit gleichem Leistungsspektrum (gleicher Autokorrelation, auch des
+  Sonnenzyklus) und zufälligen Phasen ersetzt; p ist der Anteil der Surrogate
+  mit mindestens so großem |r| wie beobachtet. Lücken werden für die
+  Fourier-Transformation mit dem Mittelwert gefüllt und danach wieder als
+  NaN gesetzt, damit die Surrogate dieselben gültigen Paare haben.
+
+Beide Verfahren sind als Matrixoperationen über viele Ziehungen gebündelt:
+Die Momente (Anzahl, Σx, Σy, Σx², Σy², Σxy) werden einmal pro Block und Lag
+per FFT-Kreuzkorrelation berechnet; eine Bootstrap-Ziehung ist dann nur ein
+Vektor von Blockhäufigkeiten, tausende Ziehungen ein Matrixprodukt. Surrogate
+werden stapelweise per FFT erzeugt und korreliert; die Spektren der Ziele
+werden dabei pro Stapel nur einmal berechnet.
+
+Die Ziehungen werden in Stapel zu ``BATCH_SIZE`` aufgeteilt und in einem
+Prozesspool berechnet (höchstens ein Prozess pro CPU). Jeder Stapel hat einen
+eigenen, aus ``seed`` abgeleiteten Zufallsgenerator; die Ergebnisse sind
+damit unabhängig von der Anzahl der Prozesse reproduzierbar.
+"""
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import fft
+
+import batching
+from lag_correlation import MIN_PERIODS, _center
+
+N_RESAMPLES = 10_000
+# Surrogate auf Tagesebene sind teurer (lange FFTs pro Ziehung)
+N_SURROGATES = {"MS": 10_000, "D": 1_000}
+CI_LEVEL = 0.95
+SEED = 20251001
+BATCH_SIZE = 1_000
+# Obergrenze für Surrogat-Stapel: Zeitreihenwerte (Stapelgröße × FFT-Länge × Reihen)
+SURROGATE_BATCH_VALUES = 20_000_000
+# Bis zu dieser Anzahl Lags sind Matrixprodukte schneller als FFTs
+MATMUL_MAX_LAGS = 128
+
+# Blocklänge des Bootstraps: ein Jahr im jeweiligen Zeitraster
+BLOCK_LENGTH = {"MS": 12, "D": 365}
+
+
+# -------------------------
+# Stapel
+# -------------------------
+def _batches(total, seed, batch_size=BATCH_SIZE):
+    """(Stapelgröße, SeedSequence) pro Stapel; unabhängig von der Prozesszahl."""
+    sizes = [min(batch_size, total - start) for start in range(0, total, batch_size)]
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return list(zip(sizes, seed.spawn(len(sizes))))
+
+
+# -------------------------
+# Momente und Pearson-r
+# -------------------------
+def _pearson(n, sx, sy, sxx, syy, sxy, min_periods=MIN_PERIODS):
+    cov = n * sxy - sx * sy
+    var_x = n * sxx - sx ** 2
+    var_y = n * syy - sy ** 2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r = cov / np.sqrt(var_x * var_y)
+    r[(n < min_periods) | (var_x <= 0) | (var_y <= 0)] = np.nan
+    return np.clip(r, -1.0, 1.0)
+
+
+def block_moments(x, y, max_lag, block_length):
+    """
+    Momente der Paare (x[t - k], y[t]) pro Block von t und Lag k.
+
+    ``x`` hat die Form (p, n), ``y`` die Form (q, n); beide lückenlos gerastert
+    (NaN = fehlend). Gibt ein Array der Form (6, Blöcke, p, q, max_lag + 1)
+    mit Anzahl, Σx, Σy, Σx², Σy², Σxy zurück. Die Summe über alle Blöcke
+    entspricht ``lag_correlation.lagged_moments``.
+    """
+    x = np.atleast_2d(np.asarray(x, dtype=float))
+    y = np.atleast_2d(np.asarray(y, dtype=float))
+    n = x.shape[1]
+    mx, my = ~np.isnan(x), ~np.isnan(y)
+    x0, y0 = _center(x, mx), _center(y, my)
+
+    blocks = -(-n // block_length)
+    padded = blocks * block_length
+
+    def target_blocks(a):
+        # (q, n) -> (Blöcke, q, L)
+        out = np.zeros((a.shape[0], padded))
+        out[:, :n] = a
+        return out.reshape(a.shape[0], blocks, block_length).transpose(1, 0, 2)
+
+    def driver_segments(a):
+        # (p, n) -> (Blöcke, p, max_lag + L): Treiberwerte von max_lag vor dem Block bis Blockende
+        out = np.zeros((a.shape[0], max_lag + padded))
+        out[:, max_lag:max_lag + n] = a
+        starts = np.arange(blocks) * block_length
+        idx = starts[:, None] + np.arange(max_lag + block_length)
+        return out[:, idx].transpose(1, 0, 2)
+
+    nfft = fft.next_fast_len(max_lag + 2 * block_length, real=True)
+    fx = [fft.rfft(driver_segments(a), nfft) for a in (mx.astype(float), x0, x0 * x0)]
+    fy = [fft.rfft(target_blocks(a), nfft) for a in (my.astype(float), y0, y0 * y0)]
+
+    def xcorr(a, b):
+        # c[m] = Σ_j b[j] a[j + m]; Lag k entspricht m = max_lag - k
+        c = fft.irfft(a[:, :, None, :] * np.conj(b)[:, None, :, :], nfft)
+        return c[..., max_lag::-1]
+
+    return np.stack([
+        np.rint(xcorr(fx[0], fy[0])),
+        xcorr(fx[1], fy[0]),
+        xcorr(fx[0], fy[1]),
+        xcorr(fx[2], fy[0]),
+        xcorr(fx[0], fy[2]),
+        xcorr(fx[1], fy[1]),
+    ])
+
+
+def _bootstrap_batch(moments, size, seed_seq):
+    """Pearson-r für ``size`` Block-Bootstrap-Ziehungen, Form (size, p, q, Lags)."""
+    rng = np.random.default_rng(seed_seq)
+    blocks = moments.shape[1]
+    counts = rng.multinomial(blocks, np.full(blocks, 1.0 / blocks), size=size).astype(float)
+    sums = counts @ moments.reshape(6, blocks, -1)  # (6, size, p*q*Lags)
+    return _pearson(*sums).reshape(size, *moments.shape[2:])
+
+
+def bootstrap_ci(x, y, max_lag, block_length, n_resamples=N_RESAMPLES, level=CI_LEVEL,
+                 seed=SEED, parallel=True):
+    """
+    Block-Bootstrap-Konfidenzintervall für r(k) aller Paare x × y und Lags 0 .. max_lag.
+
+    Gibt (untere, obere) Grenze zurück, jeweils Form (p, q, max_lag + 1)
+    (Perzentil-Intervall).
+    """
+    moments = block_moments(x, y, max_lag, block_length)
+    jobs = [(moments, size, seq) for size, seq in _batches(n_resamples, seed)]
+    r = np.concatenate(batching.run_jobs(_bootstrap_batch, jobs, parallel))
+    alpha = (1 - level) / 2
+    return batching.quantiles(r, [alpha, 1 - alpha])
+
+
+# -------------------------
+# Phasenrandomisierte Surrogate
+# -------------------------
+def phase_surrogates(x, size, rng):
+    """
+    ``size`` Surrogate der Reihe ``x`` (1-D) mit gleichem Amplitudenspektrum.
+
+    Lücken werden mit dem Mittelwert gefüllt und im Ergebnis wieder NaN.
+    """
+    valid = ~np.isnan(x)
+    filled = np.where(valid, x - x[valid].mean(), 0.0)
+    amplitude = np.abs(fft.rfft(filled))
+    phases = rng.uniform(0, 2 * np.pi, (size, len(amplitude)))
+    phases[:, 0] = 0.0
+    if len(x) % 2 == 0:
+        phases[:, -1] = 0.0  # Nyquist-Komponente bleibt reell
+    surrogates = fft.irfft(amplitude * np.exp(1j * phases), len(x))
+    surrogates[:, ~valid] = np.nan
+    return surrogates
+
+
+def _lagged_sums(a, b, max_lag):
+    """
+    Σ_t a[i, t - k] · b[j, t] für k = 0 .. max_lag, Form (len(a), len(b), max_lag + 1).
+
+    Für kurze Lag-Bereiche als Matrixprodukt mit der Hankel-Matrix von ``b``,
+    sonst per FFT-Kreuzkorrelation.
+    """
+    lags = max_lag + 1
+    n = a.shape[1]
+    if lags <= MATMUL_MAX_LAGS:
+        padded = np.concatenate([b, np.zeros((len(b), max_lag))], axis=1)
+        hankel = sliding_window_view(padded, lags, axis=1)  # (q, n, Lags): b[j, u + k]
+        sums = a @ hankel.transpose(1, 0, 2).reshape(n, -1)
+        return sums.reshape(len(a), len(b), lags)
+    nfft = fft.next_fast_len(n + max_lag, real=True)
+    fa, fb = fft.rfft(a, nfft), fft.rfft(b, nfft)
+    return fft.irfft(np.conj(fa)[:, None, :] * fb[None, :, :], nfft)[..., :lags]
+
+
+def _surrogate_batch(x, y, max_lag, r_obs, size, seed_seq):
+    """Anzahl Surrogate mit |r| >= |r_obs|, Form (q, max_lag + 1)."""
+    rng = np.random.default_rng(seed_seq)
+    mx, my = ~np.isnan(x), ~np.isnan(y)
+    # r ist unabhängig von einer Verschiebung der Werte: Surrogate nicht zentrieren
+    s = np.where(mx, phase_surrogates(x, size, rng), 0.0)
+    y0 = _center(y, my)
+    my = my.astype(float)
+
+    # Anzahl, Σy und Σy² hängen nur von den Masken ab (für alle Surrogate gleich)
+    fixed = _lagged_sums(mx[None].astype(float), np.concatenate([my, y0, y0 * y0]), max_lag)
+    n, sy, syy = np.split(fixed[0], 3)
+    sx_sxy = _lagged_sums(s, np.concatenate([my, y0]), max_lag)
+    sx, sxy = np.split(sx_sxy, 2, axis=1)
+    sxx = _lagged_sums(s * s, my, max_lag)
+
+    r = _pearson(np.rint(n), sx, sy, sxx, syy, sxy)
+    with np.errstate(invalid="ignore"):
+        return (np.abs(r) >= np.abs(r_obs)).sum(axis=0)
+
+
+def surrogate_p(x, y, max_lag, r_obs, n_surrogates=N_SURROGATES["MS"], seed=SEED, parallel=True):
+    """
+    p-Wert von r(k) gegen phasenrandomisierte Surrogate des Treibers.
+
+    ``x`` (p, n) und ``y`` (q, n) wie in ``bootstrap_ci``, ``r_obs`` die
+    beobachteten r der Form (p, q, max_lag + 1). Gibt p in derselben Form
+    zurück: (1 + Anzahl |r_surrogat| >= |r|) / (1 + Surrogate). Jeder
+    Treiber wird vorher auf seinen gültigen Bereich zugeschnitten.
+    """
+    x = np.atleast_2d(np.asarray(x, dtype=float))
+    y = np.atleast_2d(np.asarray(y, dtype=float))
+    seeds = np.random.SeedSequence(seed).spawn(len(x))
+    jobs, owner = [], []
+    for i, (row, driver_seed) in enumerate(zip(x, seeds)):
+        row, targets = _trim(row[None], y, max_lag)
+        if row.shape[1] <= max_lag:
+            continue
+        nfft = fft.next_fast_len(row.shape[1] + max_lag, real=True)
+        batch_size = int(np.clip(SURROGATE_BATCH_VALUES // (nfft * (len(y) + 3)), 1, BATCH_SIZE))
+        for size, seq in _batches(n_surrogates, driver_seed, batch_size):
+            jobs.append((row[0], targets, max_lag, r_obs[i], size, seq))
+            owner.append(i)
+    counts = np.zeros(r_obs.shape)
+    for i, c in zip(owner, batching.run_jobs(_surrogate_batch, jobs, parallel)):
+        counts[i] += c
+    p = (1 + counts) / (1 + n_surrogates)
+    p[np.isnan(r_obs)] = np.nan
+    p[[i for i in range(len(x)) if i not in owner]] = np.nan
+    return p
+
+
+# -------------------------
+# Tabellen der Pipeline
+# -------------------------
+def _trim(x, y, max_lag):
+    """Beschränkt die Reihen auf den Bereich, in dem gültige Paare möglich sind."""
+    valid_y = np.flatnonzero((~np.isnan(y)).any(axis=0))
+    valid_x = np.flatnonzero((~np.isnan(x)).any(axis=0))
+    if len(valid_x) == 0 or len(valid_y) == 0:
+        return x[:, :0], y[:, :0]
+    start = max(valid_y[0], valid_x[0])
+    stop = min(valid_y[-1], valid_x[-1] + max_lag) + 1
+    first = max(start - max_lag, 0)
+    return x[:, first:stop], y[:, first:stop]
+
+
+def matrix_significance(data, freq="MS", n_resamples=N_RESAMPLES, seed=SEED, parallel=True,
+                        resample=True):
+    """
+    Intervalle und p-Werte für die Korrelationsmatrix der Spalten von ``data``.
+
+    ``data`` sind zeitlich geordnete, vollständige Zeilen (wie für
+    ``corr()``). Gibt einen DataFrame mit dem Index der Matrix und den Spalten
+    ``<var>_ci_low``, ``<var>_ci_high`` und ``<var>_p`` zurück. Mit
+    ``resample=False`` entfallen Bootstrap und Surrogate; die Spalten bleiben
+    außerhalb der Diagonale NaN.
+    """
+    values = data.to_numpy(dtype=float).T
+    if resample:
+        low, high = bootstrap_ci(values, values, 0, BLOCK_LENGTH[freq], n_resamples, seed=seed,
+                                 parallel=parallel)
+        r_obs = np.corrcoef(values)[:, :, None]
+        p = surrogate_p(values, values, 0, r_obs, N_SURROGATES[freq], seed, parallel)
+    else:
+        low = high = p = np.full((len(values), len(values), 1), np.nan)
+    columns = {}
+    for j, var in enumerate(data.columns):
+        columns[f"{var}_ci_low"] = low[:, j, 0]
+        columns[f"{var}_ci_high"] = high[:, j, 0]
+        columns[f"{var}_p"] = p[:, j, 0]
+    table = pd.DataFrame(columns, index=data.columns)
+    # Diagonale: r = 1 per Definition
+    for var in data.columns:
+        table.loc[var, [f"{var}_ci_low", f"{var}_ci_high"]] = 1.0
+        table.loc[var, f"{var}_p"] = np.nan
+    return table
+
+
+def series_significance(data, target, features, freq="MS", n_resamples=N_RESAMPLES,
+                        seed=SEED, parallel=True, resample=True):
+    """
+    Intervalle und p-Werte für corr(feature, target) aller ``features``.
+
+    Gibt einen DataFrame mit Index ``features`` und den Spalten ``ci_low``,
+    ``ci_high`` und ``p_surrogate`` zurück. Surrogate ersetzen das Ziel, damit
+    die Lag-Struktur zwischen den Features erhalten bleibt. Mit
+    ``resample=False`` bleiben die Spalten NaN.
+    """
+    if not resample:
+        return pd.DataFrame(np.nan, index=features, columns=["ci_low", "ci_high", "p_surrogate"])
+    x = data[features].to_numpy(dtype=float).T
+    y = data[[target]].to_numpy(dtype=float).T
+    low, high = bootstrap_ci(x, y, 0, BLOCK_LENGTH[freq], n_resamples, seed=seed, parallel=parallel)
+    r_obs = np.array([[np.corrcoef(x[i], y[0])[0, 1]] for i in range(len(features))])[:, :, None]
+    p = surrogate_p(y, x, 0, r_obs.transpose(1, 0, 2), N_SURROGATES[freq], seed, parallel)
+    return pd.DataFrame({
+        "ci_low": low[:, 0, 0],
+        "ci_high": high[:, 0, 0],
+        "p_surrogate": p[0, :, 0],
+    }, index=features)
+
+
+def spectrum_significance(df, spectrum, drivers, targets, max_lag, freq,
+                          n_resamples=N_RESAMPLES, seed=SEED, parallel=True, resample=True):
+    """
+    Ergänzt ein Lag-Spektrum (``lag_correlation.lag_spectrum``) um
+    ``ci_low``, ``ci_high`` und ``p_surrogate`` für jeden Treiber, jedes Ziel und jeden Lag
+    (mit ``resample=False`` ohne Ziehungen, alle NaN).
+    """
+    x = df[drivers].to_numpy(dtype=float).T
+    y = df[targets].to_numpy(dtype=float).T
+    x, y = _trim(x, y, max_lag)
+    r_all = spectrum["r"].to_numpy().reshape(len(drivers), len(targets), -1)
+    out = spectrum.copy()
+    for name in ("ci_low", "ci_high", "p_surrogate"):
+        out[name] = np.nan
+    if not resample or x.shape[1] < MIN_PERIODS:
+        return out
+
+    # Lags, für die nach dem Zuschneiden noch Paare möglich sind
+    lags = min(r_all.shape[2], x.shape[1])
+    r_obs = r_all[..., :lags]
+    low, high = bootstrap_ci(x, y, lags - 1, BLOCK_LENGTH[freq], n_resamples, seed=seed,
+                             parallel=parallel)
+    p = surrogate_p(x, y, lags - 1, r_obs, N_SURROGATES[freq], seed, parallel)
+    for name, values in (("ci_low", low), ("ci_high", high), ("p_surrogate", p)):
+        full = np.full(r_all.shape, np.nan)
+        full[..., :lags] = values
+        out[name] = full.ravel()
+    return out
@@ -0,0 +1,163 @@
+"""
+Spektrale Kohärenz zwischen Sonnen-Treibern und geomagnetischen Indizes
+
+Pearson-r über die Monatswerte vermischt den 11-Jahres-Zyklus, die jährliche
+und halbjährliche Variation der geomagnetischen Aktivität und die
+27-Tage-Rotation in einer Zahl. Hier werden die Reihen auf dem lückenlosen
+Kalenderraster (``cleaning.calendar_frame``, täglich und monatlich) nach
+Frequenzen zerlegt (Welch-Verfahren):
+
+- Die Reihen werden in überlappende Segmente der Länge ``NPERSEG`` zerlegt
+  (50 % Überlappung), jedes Segment vom Mittelwert befreit, mit einem
+  Hann-Fenster gewichtet und per FFT transformiert.
+- Leistungsspektren (Dichte), Kreuzspektren, Betragsquadrat-Kohärenz (MSC)
+  und Phase entstehen als Mittel über die Segmente.
+
+Lücken: Kurze Lücken im Inneren einer Reihe (höchstens ``MAX_GAP``
+Zeitschritte) werden linear überbrückt. Segmente, die danach noch fehlende
+Werte enthalten, werden maskiert; für ein Paar zählen nur Segmente, die in
+beiden Reihen vollständig sind (``n_segments``). Unter ``MIN_SEGMENTS``
+Segmenten bleiben Kohärenz, Phase und Lag NaN. ``coherence_95`` ist die
+Schwelle, die die MSC zweier unabhängiger Reihen nur mit 5 %
+Wahrscheinlichkeit überschreitet (1 - 0,05^(1/(n - 1)); Näherung, die die
+Überlappung der Segmente vernachlässigt).
+
+Alle Segmente aller Reihen werden in einem Aufruf transformiert
+(``scipy.fft.rfft`` über ein Array Reihen × Segmente × Segmentlänge); die
+Kreuzspektren aller Paare Treiber × Ziel entstehen danach aus einem
+``einsum`` über die Segmente mit den Masken als Gewichten.
+
+Phase und Lag: Das Kreuzspektrum ist wie bei ``scipy.signal.csd`` als
+conj(X) · Y definiert (X Treiber, Y Ziel). ``lag`` = -Phase / (2π f) ist die
+Verzögerung des Ziels in Zeitschritten (positiv: Treiber läuft voraus);
+sie ist nur bis auf Vielfache der Periode bestimmt.
+"""
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import fft, signal
+
+SPECTRAL_DRIVERS = ["sn", "fluxadjflux"]
+SPECTRAL_TARGETS = ["kp", "ap"]
+
+# Segmentlänge pro Raster: 1024 Tage (~2,8 Jahre, trennt 27 Tage, ein halbes
+# und ein ganzes Jahr), 128 Monate (~10,7 Jahre, ein Sonnenzyklus)
+NPERSEG = {"D": 1024, "MS": 128}
+OVERLAP = 0.5
+WINDOW = "hann"
+# Längste Lücke (Zeitschritte), die linear überbrückt wird
+MAX_GAP = {"D": 3, "MS": 1}
+# Mindestanzahl Segmente für Kohärenz und Phase (bei einem Segment ist die MSC immer 1)
+MIN_SEGMENTS = 3
+CONFIDENCE = 0.95
+
+
+def fill_short_gaps(values, max_gap):
+    """
+    Überbrückt innere Lücken von höchstens ``max_gap`` Werten linear.
+
+    ``values`` hat die Form (Reihen, Zeitschritte); längere Lücken und
+    Lücken am Anfang oder Ende bleiben NaN.
+    """
+    values = np.array(values, dtype=float)
+    position = np.arange(values.shape[1])
+    for row in values:
+        missing = np.isnan(row)
+        valid = np.flatnonzero(~missing)
+        if len(valid) < 2 or not missing.any():
+            continue
+        # Länge des NaN-Laufs an jeder Position
+        start = missing & ~np.concatenate(([False], missing[:-1]))
+        run = np.cumsum(start) * missing
+        length = np.bincount(run)[run]
+        fill = missing & (length <= max_gap) & (position > valid[0]) & (position < valid[-1])
+        row[fill] = np.interp(position[fill], valid, row[valid])
+    return values
+
+
+def segment_spectra(values, nperseg, noverlap, window=WINDOW):
+    """
+    FFT aller Segmente aller Reihen in einem Aufruf.
+
+    Gibt (freqs, spectra, valid, scale) zurück: ``spectra`` hat die Form
+    (Reihen, Segmente, Frequenzen), ``valid`` (Reihen, Segmente) markiert
+    vollständige Segmente, ``scale`` (Frequenzen) rechnet |X|² in eine
+    einseitige Leistungsdichte pro Zeitschritt um (wie ``scipy.signal.welch``).
+    """
+    segments = sliding_window_view(values, nperseg, axis=-1)[:, ::nperseg - noverlap]
+    valid = ~np.isnan(segments).any(axis=-1)
+    segments = signal.detrend(np.where(valid[..., None], segments, 0.0), type="constant", axis=-1)
+    taper = signal.get_window(window, nperseg)
+    spectra = fft.rfft(segments * taper, axis=-1)
+
+    freqs = fft.rfftfreq(nperseg)
+    scale = np.full(len(freqs), 2.0 / (taper ** 2).sum())
+    scale[0] /= 2
+    if nperseg % 2 == 0:
+        scale[-1] /= 2
+    return freqs, spectra, valid, scale
+
+
+def coherence(grid, freq, drivers=SPECTRAL_DRIVERS, targets=SPECTRAL_TARGETS):
+    """
+    Welch-Spektren, Kohärenz und Phase aller Paare Treiber × Ziel.
+
+    ``grid`` ist ein Kalenderraster (Index = Datum, Frequenz ``freq``).
+    Tidy-Tabelle mit driver, target, frequency (Zyklen pro Zeitschritt),
+    period (Zeitschritte), psd_driver, psd_target, coherence, coherence_95,
+    phase (Grad), lag (Zeitschritte) und n_segments; ohne die Frequenz 0.
+    """
+    drivers = [v for v in drivers if v in grid]
+    targets = [v for v in targets if v in grid]
+    columns = drivers + targets
+    nperseg = NPERSEG[freq]
+    if len(grid) < nperseg or not drivers or not targets:
+        return pd.DataFrame(columns=["driver", "target", "frequency", "period", "psd_driver",
+                                     "psd_target", "coherence", "coherence_95", "phase", "lag",
+                                     "n_segments"])
+
+    values = fill_short_gaps(grid[columns].to_numpy(dtype=float).T, MAX_GAP[freq])
+    freqs, spectra, valid, scale = segment_spectra(values, nperseg, int(nperseg * OVERLAP))
+    d, t = len(drivers), len(targets)
+    X, Y = spectra[:d], spectra[d:]
+    mx, my = valid[:d].astype(float), valid[d:].astype(float)
+
+    # Mittel über die in beiden Reihen vollständigen Segmente, alle Paare auf einmal
+    n = mx @ my.T
+    power_x = np.abs(X) ** 2
+    power_y = np.abs(Y) ** 2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sxy = np.einsum("dsf,tsf,ds,ts->dtf", X.conj(), Y, mx, my) / n[..., None]
+        sxx = np.einsum("dsf,ds,ts->dtf", power_x, mx, my) / n[..., None]
+        syy = np.einsum("tsf,ds,ts->dtf", power_y, mx, my) / n[..., None]
+        msc = np.abs(sxy) ** 2 / (sxx * syy)
+        phase = np.angle(sxy)
+        lag = -phase / (2 * np.pi * freqs)
+        threshold = 1.0 - (1.0 - CONFIDENCE) ** (1.0 / (n - 1))
+    few = n < MIN_SEGMENTS
+    for array in (msc, phase, lag):
+        array[few] = np.nan
+    threshold[few] = np.nan
+
+    keep = slice(1, None)  # ohne Frequenz 0 (Mittelwert)
+    n_freq = len(freqs) - 1
+    shape = (d, t, n_freq)
+    return pd.DataFrame({
+        "driver": np.repeat(drivers, t * n_freq),
+        "target": np.tile(np.repeat(targets, n_freq), d),
+        "frequency": np.tile(freqs[keep], d * t),
+        "period": np.tile(1.0 / freqs[keep], d * t),
+        "psd_driver": (sxx[..., keep] * scale[keep]).ravel(),
+        "psd_target": (syy[..., keep] * scale[keep]).ravel(),
+        "coherence": msc[..., keep].ravel(),
+        "coherence_95": np.broadcast_to(threshold[..., None], shape).ravel(),
+        "phase": np.degrees(phase[..., keep]).ravel(),
+        "lag": lag[..., keep].ravel(),
+        "n_segments": np.broadcast_to(n[..., None], shape).ravel().astype(np.int64),
+    })
+
+
+def spectral_analysis(daily_grid, monthly_grid):
+    """Gibt (coherence_daily, coherence_monthly) für die beiden Kalenderraster zurück."""
+    return coherence(daily_grid, "D"), coherence(monthly_grid, "MS")
@@ -0,0 +1,298 @@
+"""
+Pipeline-Stufen für run_pipeline.py (siehe scheduler.py)
+
+Die Pipeline ist in Stufen zerlegt, die über Dateien miteinander verbunden
+sind:
+
+    Rohdaten → Tagesdaten → Monatsdaten/Pyramide → Master → Korrelationen → Plots
+
+Jede Stufe liest ihre Eingaben aus Zwischenergebnissen unter
+data/cache/stages/ (binär, spaltenweise wie der Rohdaten-Cache, d.h. ohne
+Typverluste durch CSV) und schreibt ihre Ergebnisse dorthin sowie, außer bei
+``write_csv=False``, als CSV nach data/processed bzw. data/results. Die
+Skripte, deren Code eine Stufe ausführt, zählen ebenfalls als Eingaben: eine
+Codeänderung macht die betroffenen Stufen veraltet.
+"""
+
+import functools
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+
+import aggregation
+import cache
+import cleaning
+import rolling_correlation
+import scheduler
+import visualization
+
+STAGE_DIR = "data/cache/stages"
+
+# Einstellungen, die Ergebnisse ändern, als Eingabedatei der betroffenen Stufen
+SIGNIFICANCE_SETTING = f"{STAGE_DIR}/setting_significance.json"
+
+# Ergebnisse, die nur als Ausgabedatei existieren (keine Zwischenergebnisse)
+NO_ARTIFACT = {"pyramid"}
+
+# Ergebnisse mit Index (Korrelationsmatrix bzw. Series)
+INDEXED = {"corr_matrix", "lag_corr_kp", "lag_corr_ap"}
+
+# Quelle -> (Ergebnis, Rohdatei, Loader)
+SOURCES = {
+    "sunspots": ("sn_clean", cleaning.SN_PATH, cleaning.load_sunspots),
+    "f107": ("f107_daily", cleaning.F107_PATH, cleaning.load_f107_daily),
+    "kp": ("kp_daily", cleaning.KP_PATH, cleaning.load_kp_daily),
+}
+
+DAILY = ["sn_clean", "f107_daily", "kp_daily"]
+MONTHLY = ["sn_monthly", "f107_monthly", "kp_monthly"]
+
+# Code der Loader: Parsen, Rohdaten-Cache, inkrementelles Einlesen, Messung
+LOAD_CODE = ["cleaning", "cache", "incremental", "instrumentation"]
+
+
+def _code(*modules):
+    return [f"scripts/{m}.py" for m in modules]
+
+
+# -------------------------
+# Zwischenergebnisse
+# -------------------------
+def artifact_path(key):
+    return f"{STAGE_DIR}/{key}.npz"
+
+
+def save_result(key, value):
+    """Speichert ein Ergebnis als Zwischenergebnis (None als leerer Frame)."""
+    if value is None:
+        frame = pd.DataFrame()
+    elif key in INDEXED:
+        frame = value.to_frame() if isinstance(value, pd.Series) else value
+        frame = frame.reset_index()
+    else:
+        frame = value
+    cache.save_frame(frame, artifact_path(key))
+
+
+def load_result(key):
+    """Lädt ein mit ``save_result`` gespeichertes Ergebnis."""
+    frame = cache.load_frame(artifact_path(key))
+    if key not in INDEXED:
+        return frame
+    if frame.empty:
+        return None
+    return frame.set_index(frame.columns[0]).rename_axis(None)
+
+
+def load_results(keys):
+    return {key: load_result(key) for key in keys}
+
+
+# -------------------------
+# Stufen
+# -------------------------
+def load_source(source, options):
+    key, path, loader = SOURCES[source]
+    df, seconds = cleaning.load_source(source, path, loader,
+                                       options["use_cache"], options["rebuild_cache"],
+                                       options["incremental"])
+    print(f"Ladezeit {source:<9} {seconds:6.3f} s")
+    return {key: df}
+
+
+def merge_daily(options):
+    inputs = load_results(["sn_clean", "f107_daily"])
+    return {"merged": cleaning.merge_daily(inputs["sn_clean"], inputs["f107_daily"])}
+
+
+def monthly(options):
+    sn, f107, kp = load_results(DAILY).values()
+    pyramids = cleaning.build_pyramids(
+        {"sunspots": sn, "f107": f107, "kp": kp},
+        carrington=aggregation.carrington_model(f107),
+    )
+    return {
+        "sn_monthly": pyramids["sunspots"]["monthly"],
+        "f107_monthly": pyramids["f107"]["monthly"],
+        "kp_monthly": pyramids["kp"]["monthly"],
+        "pyramid": cleaning.combine_pyramids(pyramids),
+    }
+
+
+def master_daily(options):
+    return {"merged_daily": cleaning.build_master_daily(*load_results(DAILY).values())}
+
+
+def master_monthly(options):
+    master = cleaning.build_master_monthly(*load_results(MONTHLY).values())
+    return {"merged_monthly": cleaning.add_lag_features(master)}
+
+
+def correlations(options):
+    return cleaning.correlation_analysis(load_result("merged_monthly"),
+                                         with_significance=options["significance"])
+
+
+def _grids():
+    daily_grid = cleaning.calendar_frame(list(load_results(DAILY).values()), "D")
+    monthly_grid = cleaning.calendar_frame(list(load_results(MONTHLY).values()), "MS")
+    return daily_grid, monthly_grid
+
+
+def lag_spectra(options):
+    daily, monthly = cleaning.lag_spectra(*_grids(), with_significance=options["significance"])
+    return {"lag_spectrum_daily": daily, "lag_spectrum_monthly": monthly}
+
+
+def storm_epochs(options):
+    daily_grid = cleaning.calendar_frame(list(load_results(DAILY).values()), "D")
+    storm_events, epoch_curves = cleaning.storm_epochs(daily_grid)
+    return {"storm_events": storm_events, "epoch_curves": epoch_curves}
+
+
+def recurrence(options):
+    inputs = load_results(DAILY)
+    daily_grid = cleaning.calendar_frame(list(inputs.values()), "D")
+    spectrum, bartels = cleaning.recurrence_analysis(
+        daily_grid, aggregation.carrington_model(inputs["f107_daily"]))
+    return {"recurrence_spectrum": spectrum, "bartels_matrix": bartels}
+
+
+def spectral(options):
+    daily, monthly = cleaning.spectral_analysis(*_grids())
+    return {"coherence_daily": daily, "coherence_monthly": monthly}
+
+
+def forecast(options):
+    monthly_grid = cleaning.calendar_frame(list(load_results(MONTHLY).values()), "MS")
+    return {"forecast_skill": cleaning.forecast_analysis(monthly_grid)}
+
+
+def rolling(options):
+    daily_grid, monthly_grid = _grids()
+    return {
+        "rolling_corr_daily": rolling_correlation.rolling_correlations(
+            daily_grid, windows=rolling_correlation.ROLLING_WINDOWS_DAILY, unit="d"),
+        "rolling_corr_monthly": rolling_correlation.rolling_correlations(
+            monthly_grid, windows=rolling_correlation.ROLLING_WINDOWS_MONTHLY, unit="m"),
+    }
+
+
+def plots(options):
+    inputs = {
+        "master": load_result("merged_monthly"),
+        "rolling_monthly": load_result("rolling_corr_monthly"),
+        "rolling_daily": load_result("rolling_corr_daily"),
+        "daily": visualization.daily_frame(list(load_results(DAILY).values())),
+        "epoch": load_result("epoch_curves"),
+        "coherence_daily": load_result("coherence_daily"),
+        "coherence_monthly": load_result("coherence_monthly"),
+    }
+    visualization.render_all(inputs, visualization.PLOTS_DIR, options["figures"],
+                             options["parallel"], options["force_plots"])
+    return {}
+
+
+# Name -> (Funktion, Eingabe-Ergebnisse, weitere Eingabedateien, Ausgabe-Ergebnisse)
+STAGES = {
+    "load_sunspots": (functools.partial(load_source, "sunspots"), [],
+                      [cleaning.SN_PATH] + _code(*LOAD_CODE), ["sn_clean"]),
+    "load_f107": (functools.partial(load_source, "f107"), [],
+                  [cleaning.F107_PATH] + _code(*LOAD_CODE), ["f107_daily"]),
+    "load_kp": (functools.partial(load_source, "kp"), [],
+                [cleaning.KP_PATH] + _code(*LOAD_CODE), ["kp_daily"]),
+    "merge_daily": (merge_daily, ["sn_clean", "f107_daily"], _code("cleaning"), ["merged"]),
+    "monthly": (monthly, DAILY, _code("cleaning", "aggregation"), MONTHLY + ["pyramid"]),
+    "master_daily": (master_daily, DAILY, _code("cleaning", "aggregation"), ["merged_daily"]),
+    "master_monthly": (master_monthly, MONTHLY, _code("cleaning"), ["merged_monthly"]),
+    "correlations": (correlations, ["merged_monthly"],
+                     _code("cleaning", "significance", "batching") + [SIGNIFICANCE_SETTING],
+                     ["corr_matrix", "lag_corr_kp", "lag_corr_ap"]),
+    "lag_spectra": (lag_spectra, DAILY + MONTHLY,
+                    _code("cleaning", "lag_correlation", "significance", "batching") + [SIGNIFICANCE_SETTING],
+                    ["lag_spectrum_daily", "lag_spectrum_monthly"]),
+    "superposed_epoch": (storm_epochs, DAILY, _code("cleaning", "superposed_epoch", "batching"),
+                         ["storm_events", "epoch_curves"]),
+    "recurrence": (recurrence, DAILY, _code("cleaning", "recurrence", "lag_correlation", "aggregation"),
+                   ["recurrence_spectrum", "bartels_matrix"]),
+    "spectral": (spectral, DAILY + MONTHLY, _code("cleaning", "spectral"),
+                 ["coherence_daily", "coherence_monthly"]),
+    "forecast": (forecast, MONTHLY, _code("cleaning", "forecasting", "batching"), ["forecast_skill"]),
+    "rolling": (rolling, DAILY + MONTHLY, _code("cleaning", "rolling_correlation"),
+                ["rolling_corr_daily", "rolling_corr_monthly"]),
+}
+
+
+def execute(name, options):
+    """Führt die Stufe ``name`` aus und speichert ihre Ergebnisse."""
+    if name == "plots":
+        plots(options)
+        return
+    func, _, _, keys = STAGES[name]
+    results = func(options)
+    for key in keys:
+        if key not in NO_ARTIFACT:
+            save_result(key, results[key])
+    if options["write_csv"]:
+        cleaning.write_outputs(results)
+
+
+def _write_setting(path, value):
+    """
+    Schreibt eine Einstellung als JSON-Eingabedatei.
+
+    Die Datei wird nur bei geändertem Inhalt neu geschrieben; ein Wechsel der
+    Einstellung macht damit genau die Stufen veraltet, die sie als Eingabe haben.
+    """
+    text = json.dumps(value, sort_keys=True)
+    if not os.path.exists(path) or Path(path).read_text() != text:
+        Path(path).write_text(text)
+
+
+def build_stages(options):
+    """
+    Stufen als ``scheduler.Stage`` für die gegebenen Optionen.
+
+    ``options`` enthält ``write_csv``, ``use_cache``, ``rebuild_cache``,
+    ``incremental``, ``parallel``, ``significance``, ``figures`` und
+    ``force_plots``.
+    """
+    Path(STAGE_DIR).mkdir(parents=True, exist_ok=True)
+    _write_setting(SIGNIFICANCE_SETTING, {"significance": options["significance"]})
+    for d in (cleaning.PROCESSED_DIR, cleaning.RESULTS_DIR):
+        os.makedirs(d, exist_ok=True)
+
+    stages = []
+    for name, (_, needs, files, keys) in STAGES.items():
+        outputs = [artifact_path(k) for k in keys if k not in NO_ARTIFACT]
+        if options["write_csv"]:
+            outputs += cleaning.output_paths(keys)
+        stages.append(scheduler.Stage(
+            name, functools.partial(execute, name, options),
+            [artifact_path(k) for k in needs] + files, outputs,
+        ))
+
+    figures = options["figures"] or list(visualization.FIGURES)
+    stages.append(scheduler.Stage(
+        "plots", functools.partial(execute, "plots", options),
+        [artifact_path(k) for k in ["merged_monthly", "rolling_corr_monthly", "rolling_corr_daily", "epoch_curves",
+                                    "coherence_daily", "coherence_monthly"] + DAILY]
+        + _code("visualization", "downsampling"),
+        [os.path.join(visualization.PLOTS_DIR, visualization.FIGURES[f][2]) for f in figures],
+    ))
+    return stages
+
+
+STAGE_NAMES = list(STAGES) + ["plots"]
+
+
+def summary_results():
+    """
+    Alle vorhandenen Zwischenergebnisse (für ``cleaning.print_summary``).
+
+    Nach ``--only`` existieren nicht alle; fehlende werden ausgelassen.
+    """
+    keys = [k for _, _, _, out in STAGES.values() for k in out if k not in NO_ARTIFACT]
+    return load_results([k for k in keys if os.path.exists(artifact_path(k))])
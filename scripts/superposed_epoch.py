@@ -0,0 +1,130 @@
+"""
+Überlagerte Epochenanalyse (Superposed Epoch Analysis) um geomagnetische Stürme
+
+Sturmbeginne werden auf dem täglichen Kalenderraster (siehe
+``cleaning.calendar_frame``) gesucht: ein Sturm ist eine Folge von Tagen, an
+denen ``column`` (Standard: Tagesmittel ap) mindestens ``threshold`` erreicht,
+sein Beginn der erste dieser Tage. Beim Entbündeln (Runs-Declustering) gehört
+ein Sturm, der höchstens ``min_gap`` Tage nach dem Ende des vorherigen beginnt,
+noch zu diesem; gezählt wird nur der Beginn des ersten.
+
+Um jeden Beginn wird ein Fenster von ±``window`` Tagen aus allen Variablen
+ausgeschnitten. Das geschieht in einem einzigen Zugriff über eine Indexmatrix
+(Ereignisse × Fensterpositionen) auf die an beiden Enden mit NaN aufgefüllten
+Reihen; Fenster am Rand oder über Datenlücken enthalten NaN. Daraus entstehen
+pro Variable und Tag relativ zum Beginn Mittelwert, Median und Quantile über
+alle Ereignisse.
+"""
+
+import numpy as np
+import pandas as pd
+
+import batching
+
+# Sturmkriterium: Tagesmittel ap >= 30 (kleiner Sturm). Ein Tagesmittel Kp >= 5
+# entspricht etwa ap >= 48 und wird nur von starken Stürmen erreicht.
+STORM_COLUMN = "ap"
+STORM_THRESHOLD = 30.0
+# Stürme, die höchstens so viele Tage nach dem Ende des vorherigen beginnen, gehören zu diesem
+MIN_GAP_DAYS = 3
+# Fenster ±27 Tage (eine Sonnenrotation)
+EPOCH_DAYS = 27
+
+EPOCH_VARS = ["sn", "fluxadjflux", "ap", "kp"]
+QUANTILES = [0.1, 0.25, 0.75, 0.9]
+
+
+def storm_onsets(values, threshold=STORM_THRESHOLD, min_gap=MIN_GAP_DAYS):
+    """
+    Positionen der Sturmbeginne und Ende des jeweiligen (entbündelten) Sturms.
+
+    ``values`` ist eine Tagesreihe auf lückenlosem Raster (NaN = fehlend,
+    zählt als ruhig). Gibt (start, stop) zurück; ``stop`` ist die Position
+    nach dem letzten Sturmtag.
+    """
+    active = np.asarray(values, dtype=float) >= threshold
+    edges = np.diff(np.concatenate(([0], active.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    stops = np.flatnonzero(edges == -1)
+    if len(starts) == 0:
+        return starts, stops
+    # neuer Sturm erst nach mehr als min_gap ruhigen Tagen
+    new = np.concatenate(([True], starts[1:] - stops[:-1] > min_gap))
+    # Ende eines Sturms: Ende des letzten Laufs vor dem nächsten Beginn
+    last = np.concatenate((new[1:], [True]))
+    return starts[new], stops[last]
+
+
+def epoch_windows(values, onsets, window=EPOCH_DAYS):
+    """
+    Fenster ±``window`` um jeden Beginn für alle Reihen in einem Zugriff.
+
+    ``values`` hat die Form (Variablen, Tage). Gibt ein Array der Form
+    (Variablen, Ereignisse, 2 * window + 1) zurück; Positionen außerhalb der
+    Reihe sind NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    padded = np.pad(values, ((0, 0), (window, window)), constant_values=np.nan)
+    # Zeile i: Positionen onsets[i] - window ... onsets[i] + window in ``padded``
+    index = np.asarray(onsets)[:, None] + np.arange(2 * window + 1)[None, :]
+    return padded[:, index]
+
+
+def epoch_curves(windows, variables, window=EPOCH_DAYS, quantiles=QUANTILES):
+    """
+    Mittelwert, Median und Quantile über die Ereignisse (tidy-Tabelle).
+
+    Spalten: variable, day (Tag relativ zum Beginn), n (Ereignisse mit Wert),
+    mean, median und ``q<prozent>`` pro Quantil.
+    """
+    n_vars, n_events, width = windows.shape
+    valid = ~np.isnan(windows)
+    n = valid.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(valid, windows, 0.0).sum(axis=1) / n
+    if n_events:
+        # Ereignisse auf Achse 0: Quantile vektorisiert über Variablen und Tage
+        median, *q = batching.quantiles(windows.transpose(1, 0, 2), [0.5] + list(quantiles))
+    else:
+        median, *q = [np.full((n_vars, width), np.nan)] * (len(quantiles) + 1)
+
+    table = {
+        "variable": np.repeat(variables, width),
+        "day": np.tile(np.arange(-window, window + 1), n_vars),
+        "n": n.ravel(),
+        "mean": mean.ravel(),
+        "median": median.ravel(),
+    }
+    for prob, values in zip(quantiles, q):
+        table[f"q{round(prob * 100):02d}"] = values.ravel()
+    return pd.DataFrame(table)
+
+
+def superposed_epoch(daily_grid, column=STORM_COLUMN, threshold=STORM_THRESHOLD,
+                     min_gap=MIN_GAP_DAYS, window=EPOCH_DAYS, variables=EPOCH_VARS):
+    """
+    Sturmereignisse und Epochenkurven aus dem täglichen Kalenderraster.
+
+    ``daily_grid`` hat das Datum als Index (``cleaning.calendar_frame``).
+    Gibt (events, curves) zurück: ``events`` mit date, days (Dauer des
+    entbündelten Sturms), peak (Maximum von ``column``) und ``column`` am
+    Beginn; ``curves`` siehe ``epoch_curves``.
+    """
+    variables = [v for v in variables if v in daily_grid]
+    signal = daily_grid[column].to_numpy(dtype=float)
+    starts, stops = storm_onsets(signal, threshold, min_gap)
+
+    # Maximum je Sturm: reduceat über [Beginn, Ende) jedes Sturms (jedes zweite Segment)
+    padded = np.append(np.nan_to_num(signal, nan=-np.inf), -np.inf)
+    bounds = np.column_stack([starts, stops]).ravel()
+    peaks = np.maximum.reduceat(padded, bounds)[::2] if len(starts) else np.array([])
+    events = pd.DataFrame({
+        "date": daily_grid.index[starts],
+        "days": stops - starts,
+        "peak": peaks,
+        column: signal[starts],
+    })
+
+    values = daily_grid[variables].to_numpy(dtype=float).T
+    curves = epoch_curves(epoch_windows(values, starts, window), variables, window)
+    return events, curves
@@ -0,0 +1,234 @@
+"""
+Parameter-Sweep: viele Varianten der Pipeline mit gemeinsamen Zwischenergebnissen
+
+Die Analyseentscheidungen in cleaning.py (nur definitive Werte, ``how="inner"``
+beim Merge, ``fluxadjflux`` als F10.7, Mittelwert als Aggregation,
+Monatsbeginn als Raster) werden hier als Raster von Optionen
+(``SWEEP_GRID``) durchlaufen; jede Kombination ist eine Variante:
+
+- ``definitive``: nur definitive Sunspot- und Kp/ap-Werte oder auch vorläufige
+  (F10.7 hat keine solche Kennung)
+- ``merge``: ``how`` beim Zusammenführen von Sunspots, F10.7 und Kp/ap
+- ``flux``: F10.7-Spalte (``fluxadjflux`` auf 1 AE korrigiert, ``fluxobsflux``
+  beobachtet)
+- ``aggregation``: Aggregation der Tageswerte (``mean`` oder ``median``;
+  ``n_obs`` wird immer summiert)
+- ``resolution``: Zeitraster aus der Aggregations-Pyramide (``monthly``,
+  ``carrington``, ``quarterly``, ...); Lags zählen in Schritten dieses Rasters
+
+Gemeinsame Zwischenergebnisse werden nur einmal berechnet: Die Rohdaten werden
+einmal mit vorläufigen Werten und Kennung geparst (über den Rohdaten-Cache
+unter den Namen ``<quelle>_all``); die definitiven Tagesdaten entstehen
+daraus durch Filtern. Pro Kombination aus ``definitive`` und ``aggregation``
+wird eine Pyramide für alle benötigten Raster gebaut; Merge, Lags und
+Korrelationen laufen danach für alle Varianten dieser Gruppe auf denselben
+Frames. Die Gruppen sind unabhängig und laufen in einem Prozesspool.
+
+Ergebnis ist eine Tabelle ``data/results/sweep_correlations.csv`` mit einer
+Zeile pro Variante und Korrelation (x, y, lag, r, n). Konfidenzintervalle
+(siehe significance.py) werden im Sweep nicht berechnet.
+
+Ausführung (vom Hauptverzeichnis):
+    python scripts/sweep.py                                   # alle Varianten aus SWEEP_GRID
+    python scripts/sweep.py --set resolution=monthly --set merge=inner,outer
+"""
+
+import argparse
+import functools
+import itertools
+import time
+
+import pandas as pd
+
+import aggregation
+import batching
+import cleaning
+
+SWEEP_PATH = f"{cleaning.RESULTS_DIR}/sweep_correlations.csv"
+
+# Option -> Werte; die erste Angabe entspricht jeweils der Pipeline
+SWEEP_GRID = {
+    "definitive": [True, False],
+    "merge": ["inner", "outer"],
+    "flux": ["fluxadjflux", "fluxobsflux"],
+    "aggregation": ["mean", "median"],
+    "resolution": ["monthly", "carrington", "quarterly"],
+}
+
+# Rohdateien für den Sweep: vorläufige Werte behalten (Spalte ``definitive``)
+SWEEP_SOURCES = {
+    "sunspots": (cleaning.SN_PATH, functools.partial(cleaning.load_sunspots, definitive_only=False)),
+    "f107": (cleaning.F107_PATH, cleaning.load_f107_daily),
+    "kp": (cleaning.KP_PATH, functools.partial(cleaning.load_kp_daily, definitive_only=False)),
+}
+
+# Korrelationen pro Variante: Hauptvariablen paarweise, Lag-Features gegen die Ziele
+SWEEP_VARS = ["sn", "f107", "kp", "ap"]
+SWEEP_DRIVERS = ["sn", "f107"]
+SWEEP_TARGETS = ["kp", "ap"]
+
+
+def variants(grid=SWEEP_GRID):
+    """Alle Kombinationen des Rasters als Liste von dicts (Option -> Wert)."""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*grid.values())]
+
+
+def load_daily(use_cache=True, rebuild_cache=False):
+    """
+    Tagesdaten pro Wert von ``definitive`` aus einem einzigen Parse-Durchgang.
+
+    Gibt ``{True: frames, False: frames}`` zurück, ``frames`` jeweils ein dict
+    ``{"sunspots": ..., "f107": ..., "kp": ...}`` wie in ``cleaning.build_pyramids``.
+    Definitive Kp-Tage sind Tage, deren Werte alle definitiv sind (in den
+    GFZ-Dateien gilt die Kennung pro Tag).
+    """
+    parsed = {}
+    for name, (path, loader) in SWEEP_SOURCES.items():
+        key = name if name == "f107" else f"{name}_all"
+        parsed[name], seconds = cleaning.load_source(key, path, loader, use_cache, rebuild_cache)
+        print(f"Ladezeit {name:<9} {seconds:6.3f} s")
+
+    def definitive(frame):
+        if "definitive" not in frame:
+            return frame
+        return frame[frame["definitive"].to_numpy(dtype=bool)].drop(columns="definitive").reset_index(drop=True)
+
+    def provisional(frame):
+        return frame.drop(columns="definitive", errors="ignore")
+
+    return {
+        True: {name: definitive(frame) for name, frame in parsed.items()},
+        False: {name: provisional(frame) for name, frame in parsed.items()},
+    }
+
+
+def variant_correlations(master, flux, lags=cleaning.LAG_MONTHS):
+    """
+    Pearson-Korrelationen einer Variante als tidy-Tabelle (x, y, lag, r, n).
+
+    Lag 0: alle Paare der Hauptvariablen (F10.7 als ``f107``), paarweise
+    gültige Zeilen. Lag k: die Lag-Features ``sn_lag_{k}m`` / ``f107_lag_{k}m``
+    gegen Kp und ap auf den Zeilen, in denen Ziel und alle Lag-Features
+    vorhanden sind (wie ``cleaning.lag_correlations``). ``n`` ist die Anzahl
+    verwendeter Zeilen.
+    """
+    data = master.rename(columns={flux: "f107"})
+    frame = data[SWEEP_VARS]
+    r = frame.corr()
+    valid = frame.notna().to_numpy(dtype=float)
+    n = valid.T @ valid
+    rows = [(x, y, 0, r.iloc[i, j], int(n[i, j]))
+            for i, x in enumerate(SWEEP_VARS) for j, y in enumerate(SWEEP_VARS) if j > i]
+
+    features = {(d, lag): f"{d}_lag_{lag}m" for d in SWEEP_DRIVERS for lag in lags}
+    for target in SWEEP_TARGETS:
+        complete = data[[target] + list(features.values())].dropna()
+        r = complete.corr()[target]
+        rows += [(d, target, lag, r[col], len(complete)) for (d, lag), col in features.items()]
+    return pd.DataFrame(rows, columns=["x", "y", "lag", "r", "n"])
+
+
+def _run_group(frames, rule, group, carrington):
+    """
+    Alle Varianten mit gleicher Datenbasis und Aggregation.
+
+    Baut die Pyramide einmal für alle Raster der Gruppe; pro Variante folgen
+    Merge, Lag-Features und Korrelationen.
+    """
+    rules = {col: "sum" if agg == "sum" else rule for col, agg in aggregation.AGG_RULES.items()}
+    resolutions = sorted({v["resolution"] for _, v in group})
+    pyramids = {
+        name: aggregation.build_pyramid([daily], resolutions, rules, carrington)
+        for name, daily in frames.items()
+    }
+    tables = []
+    for number, variant in group:
+        sn, f107, kp = (pyramids[name][variant["resolution"]].drop(columns="rotation", errors="ignore")
+                        for name in ("sunspots", "f107", "kp"))
+        master = cleaning.build_master_monthly(sn, f107, kp, how=variant["merge"])
+        master = cleaning.add_lag_features(master, flux_column=variant["flux"])
+        table = variant_correlations(master, variant["flux"])
+        for key, value in reversed(list(variant.items())):
+            table.insert(0, key, value)
+        table.insert(0, "variant", number)
+        tables.append(table)
+    return tables
+
+
+def run_sweep(grid=SWEEP_GRID, use_cache=True, rebuild_cache=False, parallel=True):
+    """
+    Führt alle Varianten aus ``grid`` aus.
+
+    Gibt (table, times) zurück: ``table`` enthält pro Variante und
+    Korrelation variant (Nummer), die Optionen, x, y, lag, r und n; ``times``
+    die Wall-Zeit für das Laden und für alle Varianten in Sekunden.
+    """
+    start = time.perf_counter()
+    daily = load_daily(use_cache, rebuild_cache)
+    carrington = aggregation.carrington_model(daily[True]["f107"])
+    loaded = time.perf_counter()
+
+    groups = {}
+    for number, variant in enumerate(variants(grid)):
+        groups.setdefault((variant["definitive"], variant["aggregation"]), []).append((number, variant))
+    jobs = [(daily[definitive], rule, group, carrington) for (definitive, rule), group in groups.items()]
+    tables = [t for result in batching.run_jobs(_run_group, jobs, parallel) for t in result]
+    table = pd.concat(tables).sort_values("variant", kind="stable").reset_index(drop=True)
+    return table, {"load": loaded - start, "variants": time.perf_counter() - loaded}
+
+
+def _parse_value(text):
+    return {"true": True, "false": False}.get(text.lower(), text)
+
+
+def parse_grid(overrides, grid=SWEEP_GRID):
+    """Ersetzt Werte aus ``grid`` durch ``--set option=wert1,wert2``-Angaben."""
+    grid = dict(grid)
+    for item in overrides:
+        key, _, values = item.partition("=")
+        if key not in grid or not values:
+            raise SystemExit(f"Ungültige Angabe --set {item} (Optionen: {', '.join(grid)})")
+        grid[key] = [_parse_value(v) for v in values.split(",")]
+    for resolution in grid["resolution"]:
+        if resolution not in aggregation.RESOLUTIONS:
+            raise SystemExit(f"Unbekannte Auflösung: {resolution}")
+    return grid
+
+
+def print_sweep(table, times):
+    """Anzahl Varianten, Zeiten und r(Sunspots/F10.7 ↔ Kp) pro Variante."""
+    n_variants = table["variant"].nunique()
+    print(f"\n{n_variants} Varianten: Laden {times['load']:.2f} s, "
+          f"Varianten {times['variants']:.2f} s ({times['variants'] / max(n_variants, 1) * 1000:.1f} ms/Variante)")
+    options = [c for c in table.columns if c in SWEEP_GRID]
+    main = table[(table["lag"] == 0) & (table["y"] == "kp") & table["x"].isin(SWEEP_DRIVERS)]
+    wide = main.pivot_table(index=["variant"] + options, columns="x", values="r").reset_index()
+    with pd.option_context("display.width", 200, "display.max_rows", None):
+        print(wide.drop(columns="variant").rename(columns={"sn": "r(sn,kp)", "f107": "r(f107,kp)"})
+                  .round(3).to_string(index=False))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parameter-Sweep über Varianten der Pipeline")
+    parser.add_argument("--set", action="append", default=[], metavar="OPTION=WERT[,WERT]",
+                        help=f"Werte einer Option ersetzen ({', '.join(SWEEP_GRID)})")
+    parser.add_argument("--output", default=SWEEP_PATH, help="Ausgabedatei (CSV)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Rohdaten immer neu parsen, data/cache nicht verwenden")
+    parser.add_argument("--rebuild-cache", action="store_true",
+                        help="Cache-Einträge verwerfen und aus den Rohdaten neu aufbauen")
+    parser.add_argument("--serial", action="store_true", help="Varianten nicht im Prozesspool ausführen")
+    args = parser.parse_args(argv)
+
+    grid = parse_grid(args.set)
+    table, times = run_sweep(grid, use_cache=not args.no_cache, rebuild_cache=args.rebuild_cache,
+                             parallel=not args.serial)
+    table.to_csv(args.output, index=False)
+    print_sweep(table, times)
+    print(f"\nGespeichert: {args.output}")
+    return table
+
+
+if __name__ == "__main__":
+    main()
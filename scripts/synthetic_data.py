@@ -0,0 +1,286 @@
+"""
+Synthetische Rohdaten im Format der Originaldateien (für Benchmarks)
+
+Erzeugt ``SN_d_tot_V2.0.csv``, ``fluxtable.txt`` und ``Kp_ap_since_1932.txt``
+mit realistischem Verlauf und denselben Eigenheiten wie die echten Dateien:
+
+- Sonnenzyklen mit zufälliger Länge (9–13 Jahre) und Amplitude, 27-Tage-
+  Rotationsmodulation und multiplikativem Rauschen
+- Sunspots: Lücken in der frühen Historie (``-1`` und 0 Beobachtungen),
+  vorläufige Werte am Ende (Flag 0)
+- F10.7: aus der Sonnenfleckenzahl abgeleitet (mit Jahresgang des
+  Sonnenabstands in ``fluxobsflux``), fehlende Tage und vereinzelt ungültige
+  Uhrzeiten; Julianisches Datum und Carrington-Rotation passend zum Datum
+- Kp/ap: Drittelstufen mit zugehörigem ap, schwach an die Sonnenaktivität
+  und an die 27-Tage-Wiederkehr gekoppelt, ``-1``-Fehlkennungen, vorläufige
+  (D=0) und Echtzeit-Werte (D=2) am Ende
+
+Größe ``scale`` bezieht sich auf die Zeilenzahl der mitgelieferten Dateien
+(Sunspots ab 1818, F10.7 ab 2004 mit drei Messungen pro Tag, Kp ab 1932 mit
+acht Werten pro Tag). Größere Dateien reichen zunächst weiter in die
+Vergangenheit zurück, höchstens bis ``EARLIEST`` (Grenze von datetime64[ns]
+in der Pipeline); der Rest wird durch eine höhere Kadenz (mehr Zeilen pro
+Tag) erreicht. Die Sunspot-Datei hat genau eine Zeile pro Tag und wächst
+daher nur bis ``EARLIEST`` – ihre tatsächliche Zeilenzahl steht in den
+Metadaten (``generate``).
+
+Alle Werte hängen nur von ``seed`` und ``scale`` ab; die Dateien werden
+blockweise geschrieben, auch 100-fache Kp-Dateien passen nicht komplett in
+den Speicher.
+"""
+
+import json
+import math
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import cache
+
+GENERATOR_VERSION = 1
+
+END = np.datetime64("2025-09-30")
+EARLIEST = np.datetime64("1700-01-01")
+
+# Beginn und Zeilen pro Tag der mitgelieferten Dateien (Größe 1×)
+SN_START = np.datetime64("1818-01-01")
+F107_START = np.datetime64("2004-10-28")
+F107_PER_DAY = 3
+KP_START = np.datetime64("1932-01-01")
+KP_PER_DAY = 8
+
+SN_NAME = "SN_d_tot_V2.0.csv"
+F107_NAME = "fluxtable.txt"
+KP_NAME = "Kp_ap_since_1932.txt"
+
+# Tage pro Schreibblock
+BLOCK_DAYS = 20_000
+
+# Kp in Dritteln (0, 0+, 1-, 1o, ... 9o) -> ap
+AP_TABLE = np.array([0, 2, 3, 4, 5, 6, 7, 9, 12, 15, 18, 22, 27, 32, 39, 48,
+                     56, 67, 80, 94, 111, 132, 154, 179, 207, 236, 300, 400])
+
+UNIX_EPOCH_JD = 2440587.5
+CARRINGTON_EPOCH_JD = 2398167.4
+CARRINGTON_PERIOD_DAYS = 27.2753
+
+
+def layout(start, per_day, scale):
+    """
+    (erster Tag, Zeilen pro Tag) für eine Datei mit ``scale``-facher Zeilenzahl.
+
+    Erst wird der Zeitraum bis ``EARLIEST`` verlängert, dann die Kadenz erhöht.
+    """
+    base_days = int((END - start).astype(int)) + 1
+    rows = base_days * per_day * scale
+    max_days = int((END - EARLIEST).astype(int)) + 1
+    days = min(math.ceil(rows / per_day), max_days)
+    cadence = max(per_day, math.ceil(rows / days))
+    return END - (days - 1), cadence
+
+
+def solar_cycle(days, rng):
+    """
+    Synthetische tägliche Sonnenfleckenzahl (ohne Rauschen) für ``days``.
+
+    ``days`` sind Tagesnummern (seit 1970-01-01), aufsteigend und lückenlos.
+    """
+    t = days - days[0]
+    span = t[-1] + 1
+    lengths = rng.uniform(9.0, 13.0, int(span / (9 * 365.25)) + 2) * 365.25
+    amplitudes = rng.uniform(80.0, 300.0, len(lengths))
+    starts = np.concatenate([[-rng.uniform(0, lengths[0])], np.cumsum(lengths)[:-1]])
+    starts[1:] += starts[0]
+
+    cycle = np.searchsorted(starts, t, side="right") - 1
+    phase = (t - starts[cycle]) / lengths[cycle]
+    # schneller Anstieg, langsamer Abfall
+    shape = np.sin(np.pi * phase ** 0.7) ** 2
+    rotation = 1 + 0.25 * np.sin(2 * np.pi * t / CARRINGTON_PERIOD_DAYS + rng.uniform(0, 2 * np.pi))
+    return amplitudes[cycle] * shape * rotation
+
+
+def _date_parts(dates):
+    d = dates.astype("datetime64[D]")
+    year = d.astype("datetime64[Y]").astype(int) + 1970
+    month = d.astype("datetime64[M]").astype(int) % 12 + 1
+    day = (d - d.astype("datetime64[M]")).astype(int) + 1
+    return year, month, day
+
+
+def _write_blocks(path, header, blocks, sep):
+    """Schreibt Kopfzeilen und DataFrame-Blöcke (ohne Spaltenkopf) atomar nach ``path``."""
+    def write(tmp):
+        with open(tmp, "w", newline="") as fh:
+            fh.write(header)
+            for block in blocks:
+                block.to_csv(fh, sep=sep, header=False, index=False)
+    cache._atomic_write(Path(path), write)
+
+
+def _rows_per_day(days, cadence):
+    """Tagesindex und Tageszeit (Sekunden) für ``cadence`` gleichverteilte Zeilen pro Tag."""
+    index = np.repeat(np.arange(len(days)), cadence)
+    seconds = ((np.tile(np.arange(cadence), len(days)) + 0.5) * 86400 / cadence).astype(np.int64)
+    return index, seconds
+
+
+def write_sunspots(path, days, sn, rng):
+    n = len(days)
+    noisy = np.round(sn * rng.lognormal(0, 0.25, n)).astype(np.int64)
+    n_obs = rng.poisson(30, n)
+    # frühe Historie mit Lücken: kein Wert, keine Beobachtungen
+    early = np.arange(n) < n // 5
+    missing = early & (rng.random(n) < 0.3)
+    noisy[missing] = -1
+    n_obs[missing] = 0
+    std = np.where(missing, -1.0, np.round(0.08 * noisy + rng.uniform(0.5, 2.0, n), 1))
+    definitive = np.ones(n, dtype=np.int64)
+    definitive[-90:] = 0
+
+    dates = days.astype("datetime64[D]")
+    year, month, day = _date_parts(dates)
+    day_of_year = (dates - dates.astype("datetime64[Y]")).astype(int)
+    frame = pd.DataFrame({
+        "year": year,
+        "month": month,
+        "day": day,
+        "year_frac": np.round(year + (day_of_year + 0.5) / 365.25, 3),
+        "sn": noisy,
+        "sn_std": std,
+        "n_obs": n_obs,
+        "definitive": definitive,
+    })
+    blocks = (frame.iloc[i:i + BLOCK_DAYS] for i in range(0, n, BLOCK_DAYS))
+    _write_blocks(path, "", blocks, ";")
+    return n
+
+
+def write_f107(path, days, sn, cadence, rng):
+    # tägliche Werte glätten (F10.7 folgt dem Mittel über einige Tage)
+    smooth = pd.Series(sn).rolling(7, center=True, min_periods=1).mean().to_numpy()
+    adjusted = 63.7 + 0.728 * smooth + 0.00089 * smooth ** 2
+    present = rng.random(len(days)) > 0.02  # fehlende Tage
+
+    header = (
+        "fluxdate    fluxtime    fluxjulian    fluxcarrington  fluxobsflux  fluxadjflux  fluxursi  \n"
+        "----------  ----------  ------------  --------------  -----------  -----------  ----------\n"
+    )
+
+    def blocks():
+        for start in range(0, len(days), BLOCK_DAYS):
+            sl = slice(start, start + BLOCK_DAYS)
+            block_days = days[sl][present[sl]]
+            index, seconds = _rows_per_day(block_days, cadence)
+            day_number = block_days[index]
+            n = len(index)
+            adj = np.round(adjusted[sl][present[sl]][index] * rng.normal(1, 0.02, n), 1)
+            dates = day_number.astype("datetime64[D]")
+            year, month, day = _date_parts(dates)
+            day_of_year = (dates - dates.astype("datetime64[Y]")).astype(int)
+            distance = 1 + 0.033 * np.cos(2 * np.pi * (day_of_year - 3) / 365.25)
+            julian = UNIX_EPOCH_JD + day_number + seconds / 86400
+            hms = seconds // 3600 * 10000 + seconds // 60 % 60 * 100 + seconds % 60
+            hms[rng.random(n) < 1e-4] = 250000  # vereinzelt ungültige Uhrzeiten
+            yield pd.DataFrame({
+                "fluxdate": year * 10000 + month * 100 + day,
+                "fluxtime": hms,
+                "fluxjulian": np.round(julian, 3),
+                "fluxcarrington": np.round(1 + (julian - CARRINGTON_EPOCH_JD) / CARRINGTON_PERIOD_DAYS, 3),
+                "fluxobsflux": np.round(adj * distance, 1),
+                "fluxadjflux": adj,
+                "fluxursi": np.round(0.9 * adj, 1),
+            })
+
+    _write_blocks(path, header, blocks(), " ")
+    return int(present.sum()) * cadence
+
+
+def write_kp(path, days, sn, cadence, rng):
+    # Tagesniveau: schwach von der Sonnenaktivität abhängig, 27-Tage-Wiederkehr
+    level = 1.8 + 0.0012 * sn + 0.4 * np.sin(2 * np.pi * days / CARRINGTON_PERIOD_DAYS)
+    level *= rng.lognormal(0, 0.5, len(days))
+    n_days = len(days)
+    header = "".join(f"# Synthetische Kp/ap-Daten (GFZ-Format), Kopfzeile {i + 1}\n" for i in range(30))
+
+    def blocks():
+        for start in range(0, n_days, BLOCK_DAYS):
+            block_days = days[start:start + BLOCK_DAYS]
+            index, seconds = _rows_per_day(block_days, cadence)
+            n = len(index)
+            thirds = np.clip(np.round(rng.gamma(4.0, level[start:][index] / 4.0) * 3), 0, 27).astype(np.int64)
+            kp = np.round(thirds / 3, 3)
+            ap = AP_TABLE[thirds]
+            sentinel = rng.random(n) < 5e-4
+            kp[sentinel] = -1.0
+            ap[sentinel] = -1
+            position = start + index
+            definitive = np.where(position >= n_days - 10, 2, np.where(position >= n_days - 40, 0, 1))
+
+            dates = block_days[index].astype("datetime64[D]")
+            year, month, day = _date_parts(dates)
+            hours = seconds / 3600 - 12 / cadence  # Beginn des Intervalls
+            elapsed = (block_days[index] - KP_START.astype(int)) + hours / 24
+            yield pd.DataFrame({
+                "year": year,
+                "month": month,
+                "day": day,
+                "hour_start": np.round(hours, 2),
+                "hour_mid": np.round(hours + 12 / cadence, 2),
+                "days": np.round(elapsed, 5),
+                "days_mid": np.round(elapsed + 0.5 / cadence, 5),
+                "kp": kp,
+                "ap": ap,
+                "definitive": definitive,
+            })
+
+    _write_blocks(path, header, blocks(), " ")
+    return n_days * cadence
+
+
+def generate(out_dir, scale=1, seed=0):
+    """
+    Schreibt die drei Rohdateien mit ``scale``-facher Größe nach ``out_dir``.
+
+    Sind die Dateien für dieselben Parameter schon vorhanden, werden sie
+    wiederverwendet. Gibt die Metadaten (Pfade, Zeilen, Zeitraum, Kadenz) zurück.
+    """
+    out_dir = Path(out_dir)
+    meta_path = out_dir / "synthetic.json"
+    params = {"version": GENERATOR_VERSION, "scale": scale, "seed": seed}
+    if meta_path.exists():
+        meta = json.loads(meta_path.read_text())
+        if meta.get("params") == params and all(Path(p).exists() for p in meta["paths"].values()):
+            return meta
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    earliest = min(layout(s, c, scale)[0] for s, c in
+                   [(SN_START, 1), (F107_START, F107_PER_DAY), (KP_START, KP_PER_DAY)])
+    all_days = np.arange(earliest.astype(int), END.astype(int) + 1)
+    sn = solar_cycle(all_days, rng)
+
+    def window(start):
+        offset = int((start - earliest).astype(int))
+        return all_days[offset:], sn[offset:]
+
+    sn_start, _ = layout(SN_START, 1, scale)
+    f107_start, f107_cadence = layout(F107_START, F107_PER_DAY, scale)
+    kp_start, kp_cadence = layout(KP_START, KP_PER_DAY, scale)
+    paths = {"sunspots": out_dir / SN_NAME, "f107": out_dir / F107_NAME, "kp": out_dir / KP_NAME}
+    rows = {
+        "sunspots": write_sunspots(paths["sunspots"], *window(sn_start), rng),
+        "f107": write_f107(paths["f107"], *window(f107_start), f107_cadence, rng),
+        "kp": write_kp(paths["kp"], *window(kp_start), kp_cadence, rng),
+    }
+    meta = {
+        "params": params,
+        "paths": {k: str(v) for k, v in paths.items()},
+        "rows": rows,
+        "start": {"sunspots": str(sn_start), "f107": str(f107_start), "kp": str(kp_start)},
+        "rows_per_day": {"sunspots": 1, "f107": f107_cadence, "kp": kp_cadence},
+        "bytes": {k: v.stat().st_size for k, v in paths.items()},
+    }
+    cache._atomic_write(meta_path, lambda tmp: tmp.write_text(json.dumps(meta, indent=2)))
+    return meta
@@ -1,159 +1,573 @@
 # Visualisierung der Sonnenaktivitäts-Daten
 # Erstellt Zeitreihenplots, die den 11-Jahres-Zyklus und Zusammenhänge zeigen
+#
+# Als Skript ausgeführt werden die Eingaben aus data/processed bzw. data/results
+# geladen (das Master-Dataset memory-mapped aus data/processed/series, siehe
+# series_store.py); run_pipeline.py übergibt die DataFrames direkt an render_all().
+#
+# Lange Reihen (Tageswerte, tägliche rollende Korrelationen) werden vor dem
+# Zeichnen auf die Breite der Achse in Pixeln ausgedünnt (downsampling.py), die
+# Renderzeit hängt damit nicht von der Anzahl der Rohwerte ab.
+#
+# Jede Abbildung ist ein unabhängiger Render-Job (siehe FIGURES). Die Jobs laufen
+# parallel in einem Prozesspool auf dem Agg-Backend; seaborn wird nur von der
+# Heatmap importiert.
+#
+# In plots/.render_manifest.json wird pro Abbildung ein Fingerabdruck der
+# Eingabedaten und Render-Parameter gespeichert. Abbildungen, deren
+# Fingerabdruck sich nicht geändert hat (und deren PNG existiert), werden nicht
+# neu gerendert; ``--force`` rendert alle.
+#
+#   python scripts/visualization.py                       # alle Abbildungen
+#   python scripts/visualization.py --only heatmap scatter
+
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use("Agg")
 
 import pandas as pd
+import matplotlib.dates as mdates
 import matplotlib.pyplot as plt
-import seaborn as sns
 import numpy as np
 
-# Setze Stil für bessere Plots
-sns.set_style("whitegrid")
-plt.rcParams['figure.figsize'] = (14, 8)
-plt.rcParams['font.size'] = 10
+import downsampling
+import instrumentation
+import series_store
+
+MASTER_SERIES = "master_monthly"
+MASTER_PATH = "data/processed/master_monthly_merged.csv"
+# Tagesreihen (series_store) und ihre Spalten für die tägliche Zeitreihe
+DAILY_SERIES = {"sunspots_daily": ["sn"], "f107_daily": ["fluxadjflux"], "kp_daily": ["kp", "ap"]}
+ROLLING_DAILY_PATH = "data/results/rolling_correlation_daily.csv"
+ROLLING_MONTHLY_PATH = "data/results/rolling_correlation_monthly.csv"
+EPOCH_PATH = "data/results/superposed_epoch_daily.csv"
+COHERENCE_DAILY_PATH = "data/results/coherence_daily.csv"
+COHERENCE_MONTHLY_PATH = "data/results/coherence_monthly.csv"
+PLOTS_DIR = "plots"
+MANIFEST_NAME = ".render_manifest.json"
+
+# Stil für bessere Plots (entspricht sns.set_style("whitegrid"), ohne seaborn zu laden)
+PLOT_STYLE = "seaborn-v0_8-whitegrid"
+PLOT_RC = {"figure.figsize": (14, 8), "font.size": 10}
+DPI = 300
+
+
+def load_master(path=MASTER_PATH):
+    """
+    Lädt das Master-Dataset.
+
+    Standardmäßig ohne Parsen und ohne Kopie aus der Binärreihe
+    ``master_monthly`` (falls vorhanden), sonst aus der CSV-Datei ``path``.
+    """
+    if path == MASTER_PATH and series_store.exists(MASTER_SERIES):
+        return series_store.load_frame(MASTER_SERIES)
+    master = pd.read_csv(path)
+    master["date"] = pd.to_datetime(master["date"])
+    return master
+
+
+def daily_frame(frames):
+    """
+    Tagesraster (Spalte ``date``) mit Sunspots, F10.7 und Kp/Ap über den
+    gesamten Zeitraum aller Quellen; fehlende Tage sind NaN.
+    """
+    columns = [c for cols in DAILY_SERIES.values() for c in cols]
+    aligned = pd.concat([f.set_index("date")[[c for c in columns if c in f]] for f in frames],
+                        axis=1, join="outer")
+    return aligned.sort_index().asfreq("D").rename_axis("date").reset_index()
+
+
+def load_daily():
+    """Lädt die Tagesreihen memory-mapped (None, falls keine vorhanden ist)."""
+    frames = [series_store.load_frame(name, columns)
+              for name, columns in DAILY_SERIES.items() if series_store.exists(name)]
+    return daily_frame(frames) if frames else None
+
+
+def plot_line(ax, x, y, method="minmax", dpi=DPI, **kwargs):
+    """
+    ``ax.plot`` mit auf die Achsenbreite ausgedünnter Reihe.
+
+    Die Breite in Pixeln ergibt sich aus der Achsenposition, der
+    Abbildungsbreite und ``dpi`` (Auflösung von ``savefig``). ``method`` siehe
+    ``downsampling.downsample``: ``"minmax"`` erhält Spitzen exakt,
+    ``"lttb"`` eignet sich für glatte Kurven.
+    """
+    n_px = ax.get_position().width * ax.figure.get_figwidth() * dpi
+    return ax.plot(*downsampling.downsample(x, y, n_px, method), **kwargs)
 
-# Lade Master-Dataset
-master = pd.read_csv("data/processed/master_monthly_merged.csv")
-master["date"] = pd.to_datetime(master["date"])
 
 # -------------------------
 # Plot 1: Zeitreihen aller Variablen (11-Jahres-Zyklus)
 # -------------------------
-fig, axes = plt.subplots(4, 1, figsize=(16, 12), sharex=True)
-
-# Sunspots
-axes[0].plot(master["date"], master["sn"], color="tab:blue", linewidth=1.5, alpha=0.8)
-axes[0].set_ylabel("Sunspot Number", fontsize=12, fontweight="bold")
-axes[0].set_title("Zeitreihen der Sonnenaktivität und geomagnetischen Indizes", 
-                  fontsize=14, fontweight="bold", pad=20)
-axes[0].grid(True, alpha=0.3)
-
-# F10.7
-axes[1].plot(master["date"], master["fluxadjflux"], color="tab:orange", linewidth=1.5, alpha=0.8)
-axes[1].set_ylabel("F10.7 (adjusted)", fontsize=12, fontweight="bold")
-axes[1].grid(True, alpha=0.3)
-
-# Kp-Index
-axes[2].plot(master["date"], master["kp"], color="tab:red", linewidth=1.5, alpha=0.8)
-axes[2].set_ylabel("Kp Index", fontsize=12, fontweight="bold")
-axes[2].grid(True, alpha=0.3)
-
-# Ap-Index
-axes[3].plot(master["date"], master["ap"], color="tab:green", linewidth=1.5, alpha=0.8)
-axes[3].set_ylabel("Ap Index", fontsize=12, fontweight="bold")
-axes[3].set_xlabel("Jahr", fontsize=12, fontweight="bold")
-axes[3].grid(True, alpha=0.3)
-
-# Formatierung der x-Achse
-for ax in axes:
-    ax.tick_params(labelsize=10)
-    # Zeige alle 5 Jahre auf x-Achse
-    years = pd.date_range(start=master["date"].min(), end=master["date"].max(), freq="5YS")
-    ax.set_xticks(years)
-    ax.set_xticklabels([y.strftime("%Y") for y in years], rotation=45, ha="right")
-
-plt.tight_layout()
-plt.savefig("plots/timeseries_all_variables.png", dpi=300, bbox_inches="tight")
-print("Gespeichert: plots/timeseries_all_variables.png")
-plt.close()
+def plot_timeseries(master, plots_dir=PLOTS_DIR):
+    fig, axes = plt.subplots(4, 1, figsize=(16, 12), sharex=True)
+
+    # Sunspots
+    axes[0].plot(master["date"], master["sn"], color="tab:blue", linewidth=1.5, alpha=0.8)
+    axes[0].set_ylabel("Sunspot Number", fontsize=12, fontweight="bold")
+    axes[0].set_title("Zeitreihen der Sonnenaktivität und geomagnetischen Indizes", 
+                      fontsize=14, fontweight="bold", pad=20)
+    axes[0].grid(True, alpha=0.3)
+
+    # F10.7
+    axes[1].plot(master["date"], master["fluxadjflux"], color="tab:orange", linewidth=1.5, alpha=0.8)
+    axes[1].set_ylabel("F10.7 (adjusted)", fontsize=12, fontweight="bold")
+    axes[1].grid(True, alpha=0.3)
+
+    # Kp-Index
+    axes[2].plot(master["date"], master["kp"], color="tab:red", linewidth=1.5, alpha=0.8)
+    axes[2].set_ylabel("Kp Index", fontsize=12, fontweight="bold")
+    axes[2].grid(True, alpha=0.3)
+
+    # Ap-Index
+    axes[3].plot(master["date"], master["ap"], color="tab:green", linewidth=1.5, alpha=0.8)
+    axes[3].set_ylabel("Ap Index", fontsize=12, fontweight="bold")
+    axes[3].set_xlabel("Jahr", fontsize=12, fontweight="bold")
+    axes[3].grid(True, alpha=0.3)
+
+    # Formatierung der x-Achse
+    for ax in axes:
+        ax.tick_params(labelsize=10)
+        # Zeige alle 5 Jahre auf x-Achse
+        years = pd.date_range(start=master["date"].min(), end=master["date"].max(), freq="5YS")
+        ax.set_xticks(years)
+        ax.set_xticklabels([y.strftime("%Y") for y in years], rotation=45, ha="right")
+
+    plt.tight_layout()
+    plt.savefig(f"{plots_dir}/timeseries_all_variables.png", dpi=DPI, bbox_inches="tight")
+    print(f"Gespeichert: {plots_dir}/timeseries_all_variables.png")
+    plt.close()
+
 
 # -------------------------
 # Plot 2: Scatterplots - Korrelationen zwischen Variablen
 # -------------------------
-fig, axes = plt.subplots(2, 2, figsize=(14, 10))
-
-# Sunspots vs F10.7
-axes[0, 0].scatter(master["sn"], master["fluxadjflux"], alpha=0.5, s=20, color="tab:blue")
-axes[0, 0].set_xlabel("Sunspot Number", fontsize=11, fontweight="bold")
-axes[0, 0].set_ylabel("F10.7 (adjusted)", fontsize=11, fontweight="bold")
-axes[0, 0].set_title("Sunspots ↔ F10.7", fontsize=12, fontweight="bold")
-corr_sn_f107 = master[["sn", "fluxadjflux"]].corr().iloc[0, 1]
-axes[0, 0].text(0.05, 0.95, f"r = {corr_sn_f107:.3f}", 
-                transform=axes[0, 0].transAxes, fontsize=10,
-                verticalalignment="top", bbox=dict(boxstyle="round", facecolor="wheat", alpha=0.5))
-axes[0, 0].grid(True, alpha=0.3)
-
-# Sunspots vs Kp
-axes[0, 1].scatter(master["sn"], master["kp"], alpha=0.5, s=20, color="tab:red")
-axes[0, 1].set_xlabel("Sunspot Number", fontsize=11, fontweight="bold")
-axes[0, 1].set_ylabel("Kp Index", fontsize=11, fontweight="bold")
-axes[0, 1].set_title("Sunspots ↔ Kp", fontsize=12, fontweight="bold")
-corr_sn_kp = master[["sn", "kp"]].corr().iloc[0, 1]
-axes[0, 1].text(0.05, 0.95, f"r = {corr_sn_kp:.3f}", 
-                transform=axes[0, 1].transAxes, fontsize=10,
-                verticalalignment="top", bbox=dict(boxstyle="round", facecolor="wheat", alpha=0.5))
-axes[0, 1].grid(True, alpha=0.3)
-
-# F10.7 vs Kp
-axes[1, 0].scatter(master["fluxadjflux"], master["kp"], alpha=0.5, s=20, color="tab:orange")
-axes[1, 0].set_xlabel("F10.7 (adjusted)", fontsize=11, fontweight="bold")
-axes[1, 0].set_ylabel("Kp Index", fontsize=11, fontweight="bold")
-axes[1, 0].set_title("F10.7 ↔ Kp", fontsize=12, fontweight="bold")
-corr_f107_kp = master[["fluxadjflux", "kp"]].corr().iloc[0, 1]
-axes[1, 0].text(0.05, 0.95, f"r = {corr_f107_kp:.3f}", 
-                transform=axes[1, 0].transAxes, fontsize=10,
-                verticalalignment="top", bbox=dict(boxstyle="round", facecolor="wheat", alpha=0.5))
-axes[1, 0].grid(True, alpha=0.3)
-
-# F10.7 vs Ap
-axes[1, 1].scatter(master["fluxadjflux"], master["ap"], alpha=0.5, s=20, color="tab:green")
-axes[1, 1].set_xlabel("F10.7 (adjusted)", fontsize=11, fontweight="bold")
-axes[1, 1].set_ylabel("Ap Index", fontsize=11, fontweight="bold")
-axes[1, 1].set_title("F10.7 ↔ Ap", fontsize=12, fontweight="bold")
-corr_f107_ap = master[["fluxadjflux", "ap"]].corr().iloc[0, 1]
-axes[1, 1].text(0.05, 0.95, f"r = {corr_f107_ap:.3f}", 
-                transform=axes[1, 1].transAxes, fontsize=10,
-                verticalalignment="top", bbox=dict(boxstyle="round", facecolor="wheat", alpha=0.5))
-axes[1, 1].grid(True, alpha=0.3)
-
-plt.suptitle("Korrelationsanalyse: Sonnenaktivität ↔ Geomagnetische Indizes", 
-             fontsize=14, fontweight="bold", y=0.995)
-plt.tight_layout()
-plt.savefig("plots/correlation_scatterplots.png", dpi=300, bbox_inches="tight")
-print("Gespeichert: plots/correlation_scatterplots.png")
-plt.close()
+def plot_scatter(master, plots_dir=PLOTS_DIR):
+    fig, axes = plt.subplots(2, 2, figsize=(14, 10))
+
+    # Sunspots vs F10.7
+    axes[0, 0].scatter(master["sn"], master["fluxadjflux"], alpha=0.5, s=20, color="tab:blue")
+    axes[0, 0].set_xlabel("Sunspot Number", fontsize=11, fontweight="bold")
+    axes[0, 0].set_ylabel("F10.7 (adjusted)", fontsize=11, fontweight="bold")
+    axes[0, 0].set_title("Sunspots ↔ F10.7", fontsize=12, fontweight="bold")
+    corr_sn_f107 = master[["sn", "fluxadjflux"]].corr().iloc[0, 1]
+    axes[0, 0].text(0.05, 0.95, f"r = {corr_sn_f107:.3f}", 
+                    transform=axes[0, 0].transAxes, fontsize=10,
+                    verticalalignment="top", bbox=dict(boxstyle="round", facecolor="wheat", alpha=0.5))
+    axes[0, 0].grid(True, alpha=0.3)
+
+    # Sunspots vs Kp
+    axes[0, 1].scatter(master["sn"], master["kp"], alpha=0.5, s=20, color="tab:red")
+    axes[0, 1].set_xlabel("Sunspot Number", fontsize=11, fontweight="bold")
+    axes[0, 1].set_ylabel("Kp Index", fontsize=11, fontweight="bold")
+    axes[0, 1].set_title("Sunspots ↔ Kp", fontsize=12, fontweight="bold")
+    corr_sn_kp = master[["sn", "kp"]].corr().iloc[0, 1]
+    axes[0, 1].text(0.05, 0.95, f"r = {corr_sn_kp:.3f}", 
+                    transform=axes[0, 1].transAxes, fontsize=10,
+                    verticalalignment="top", bbox=dict(boxstyle="round", facecolor="wheat", alpha=0.5))
+    axes[0, 1].grid(True, alpha=0.3)
+
+    # F10.7 vs Kp
+    axes[1, 0].scatter(master["fluxadjflux"], master["kp"], alpha=0.5, s=20, color="tab:orange")
+    axes[1, 0].set_xlabel("F10.7 (adjusted)", fontsize=11, fontweight="bold")
+    axes[1, 0].set_ylabel("Kp Index", fontsize=11, fontweight="bold")
+    axes[1, 0].set_title("F10.7 ↔ Kp", fontsize=12, fontweight="bold")
+    corr_f107_kp = master[["fluxadjflux", "kp"]].corr().iloc[0, 1]
+    axes[1, 0].text(0.05, 0.95, f"r = {corr_f107_kp:.3f}", 
+                    transform=axes[1, 0].transAxes, fontsize=10,
+                    verticalalignment="top", bbox=dict(boxstyle="round", facecolor="wheat", alpha=0.5))
+    axes[1, 0].grid(True, alpha=0.3)
+
+    # F10.7 vs Ap
+    axes[1, 1].scatter(master["fluxadjflux"], master["ap"], alpha=0.5, s=20, color="tab:green")
+    axes[1, 1].set_xlabel("F10.7 (adjusted)", fontsize=11, fontweight="bold")
+    axes[1, 1].set_ylabel("Ap Index", fontsize=11, fontweight="bold")
+    axes[1, 1].set_title("F10.7 ↔ Ap", fontsize=12, fontweight="bold")
+    corr_f107_ap = master[["fluxadjflux", "ap"]].corr().iloc[0, 1]
+    axes[1, 1].text(0.05, 0.95, f"r = {corr_f107_ap:.3f}", 
+                    transform=axes[1, 1].transAxes, fontsize=10,
+                    verticalalignment="top", bbox=dict(boxstyle="round", facecolor="wheat", alpha=0.5))
+    axes[1, 1].grid(True, alpha=0.3)
+
+    plt.suptitle("Korrelationsanalyse: Sonnenaktivität ↔ Geomagnetische Indizes", 
+                 fontsize=14, fontweight="bold", y=0.995)
+    plt.tight_layout()
+    plt.savefig(f"{plots_dir}/correlation_scatterplots.png", dpi=DPI, bbox_inches="tight")
+    print(f"Gespeichert: {plots_dir}/correlation_scatterplots.png")
+    plt.close()
+
 
 # -------------------------
 # Plot 3: Korrelationsmatrix (Heatmap)
 # -------------------------
-corr_vars = ["sn", "fluxadjflux", "kp", "ap"]
-corr_matrix = master[corr_vars].corr()
+def plot_heatmap(master, plots_dir=PLOTS_DIR):
+    import seaborn as sns
+
+    corr_vars = ["sn", "fluxadjflux", "kp", "ap"]
+    corr_matrix = master[corr_vars].corr()
+
+    fig, ax = plt.subplots(figsize=(8, 6))
+    sns.heatmap(corr_matrix, annot=True, fmt=".3f", cmap="coolwarm", center=0,
+                square=True, linewidths=1, cbar_kws={"label": "Korrelation"})
+    ax.set_title("Korrelationsmatrix: Sonnenaktivität und geomagnetische Indizes", 
+                 fontsize=13, fontweight="bold", pad=15)
+    plt.tight_layout()
+    plt.savefig(f"{plots_dir}/correlation_heatmap.png", dpi=DPI, bbox_inches="tight")
+    print(f"Gespeichert: {plots_dir}/correlation_heatmap.png")
+    plt.close()
 
-fig, ax = plt.subplots(figsize=(8, 6))
-sns.heatmap(corr_matrix, annot=True, fmt=".3f", cmap="coolwarm", center=0,
-            square=True, linewidths=1, cbar_kws={"label": "Korrelation"})
-ax.set_title("Korrelationsmatrix: Sonnenaktivität und geomagnetische Indizes", 
-             fontsize=13, fontweight="bold", pad=15)
-plt.tight_layout()
-plt.savefig("plots/correlation_heatmap.png", dpi=300, bbox_inches="tight")
-print("Gespeichert: plots/correlation_heatmap.png")
-plt.close()
 
 # -------------------------
 # Plot 4: Lag-Korrelationen (wie gut können Sonnenflecken/F10.7 Kp vorhersagen?)
 # -------------------------
-lag_vars_kp = ["sn_lag_1m", "sn_lag_3m", "sn_lag_6m", "f107_lag_1m", "f107_lag_3m", "f107_lag_6m"]
-lag_data = master[["kp"] + lag_vars_kp].dropna()
-
-if len(lag_data) > 0:
-    lag_corrs = lag_data.corr()["kp"].drop("kp")
-    
-    fig, ax = plt.subplots(figsize=(10, 6))
-    colors = ["tab:blue" if "sn" in var else "tab:orange" for var in lag_corrs.index]
-    bars = ax.barh(lag_corrs.index, lag_corrs.values, color=colors, alpha=0.7)
-    ax.axvline(x=0, color="black", linestyle="--", linewidth=1)
-    ax.set_xlabel("Korrelation mit Kp-Index", fontsize=12, fontweight="bold")
-    ax.set_title("Vorhersagekraft: Lag-Features für Kp-Index", fontsize=13, fontweight="bold", pad=15)
-    ax.grid(True, alpha=0.3, axis="x")
-    
-    # Werte auf Bars anzeigen
-    for i, (bar, val) in enumerate(zip(bars, lag_corrs.values)):
-        ax.text(val + 0.01 if val >= 0 else val - 0.01, i, f"{val:.3f}",
-                va="center", ha="left" if val >= 0 else "right", fontsize=10)
-    
+def plot_lag_correlations(master, plots_dir=PLOTS_DIR):
+    lag_vars_kp = ["sn_lag_1m", "sn_lag_3m", "sn_lag_6m", "f107_lag_1m", "f107_lag_3m", "f107_lag_6m"]
+    lag_data = master[["kp"] + lag_vars_kp].dropna()
+
+    if len(lag_data) > 0:
+        lag_corrs = lag_data.corr()["kp"].drop("kp")
+
+        fig, ax = plt.subplots(figsize=(10, 6))
+        colors = ["tab:blue" if "sn" in var else "tab:orange" for var in lag_corrs.index]
+        bars = ax.barh(lag_corrs.index, lag_corrs.values, color=colors, alpha=0.7)
+        ax.axvline(x=0, color="black", linestyle="--", linewidth=1)
+        ax.set_xlabel("Korrelation mit Kp-Index", fontsize=12, fontweight="bold")
+        ax.set_title("Vorhersagekraft: Lag-Features für Kp-Index", fontsize=13, fontweight="bold", pad=15)
+        ax.grid(True, alpha=0.3, axis="x")
+
+        # Werte auf Bars anzeigen
+        for i, (bar, val) in enumerate(zip(bars, lag_corrs.values)):
+            ax.text(val + 0.01 if val >= 0 else val - 0.01, i, f"{val:.3f}",
+                    va="center", ha="left" if val >= 0 else "right", fontsize=10)
+
+        plt.tight_layout()
+        plt.savefig(f"{plots_dir}/lag_correlations_kp.png", dpi=DPI, bbox_inches="tight")
+        print(f"Gespeichert: {plots_dir}/lag_correlations_kp.png")
+        plt.close()
+
+
+# -------------------------
+# Plot 5: Rollende Korrelationen (zeitlich veränderliche Kopplung)
+# -------------------------
+def plot_rolling_correlation(rolling_monthly, rolling_daily, plots_dir=PLOTS_DIR):
+    panels = [
+        (rolling_monthly, "Monatlich, Fenster 132 Monate (~1 Sonnenzyklus)",
+         ["sn_kp_132m", "sn_ap_132m", "fluxadjflux_kp_132m"]),
+        (rolling_daily, "Täglich, Fenster 365 Tage",
+         ["sn_kp_365d", "sn_ap_365d", "fluxadjflux_kp_365d"]),
+    ]
+    colors = ["tab:blue", "tab:green", "tab:orange"]
+
+    fig, axes = plt.subplots(2, 1, figsize=(16, 9), sharex=True)
+    for ax, (data, title, cols) in zip(axes, panels):
+        for col, color in zip(cols, colors):
+            if col in data:
+                plot_line(ax, data["date"], data[col], "lttb", color=color, linewidth=1.2, alpha=0.8,
+                          label=col.rsplit("_", 1)[0].replace("_", " ↔ "))
+        ax.axhline(0, color="black", linestyle="--", linewidth=1)
+        ax.set_ylim(-1, 1)
+        ax.set_ylabel("Pearson r", fontsize=12, fontweight="bold")
+        ax.set_title(title, fontsize=12, fontweight="bold")
+        ax.legend(loc="upper left", fontsize=10)
+        ax.grid(True, alpha=0.3)
+    axes[-1].set_xlabel("Jahr", fontsize=12, fontweight="bold")
+
+    plt.suptitle("Rollende Korrelation: Sonnenaktivität ↔ Geomagnetische Indizes",
+                 fontsize=14, fontweight="bold")
+    plt.tight_layout()
+    plt.savefig(f"{plots_dir}/rolling_correlation.png", dpi=DPI, bbox_inches="tight")
+    print(f"Gespeichert: {plots_dir}/rolling_correlation.png")
+    plt.close()
+
+
+# -------------------------
+# Plot 6: Tägliche Zeitreihen über den gesamten Zeitraum
+# -------------------------
+def plot_timeseries_daily(daily, plots_dir=PLOTS_DIR):
+    panels = [
+        ("sn", "Sunspot Number", "tab:blue"),
+        ("fluxadjflux", "F10.7 (adjusted)", "tab:orange"),
+        ("kp", "Kp Index", "tab:red"),
+        ("ap", "Ap Index", "tab:green"),
+    ]
+    fig, axes = plt.subplots(len(panels), 1, figsize=(16, 12), sharex=True)
+    for ax, (col, label, color) in zip(axes, panels):
+        # Min/Max pro Pixelspalte: einzelne Sturmtage bleiben als Spitzen sichtbar
+        plot_line(ax, daily["date"], daily[col], "minmax", color=color, linewidth=0.6)
+        ax.set_ylabel(label, fontsize=12, fontweight="bold")
+        ax.grid(True, alpha=0.3)
+    axes[0].set_title("Tageswerte der Sonnenaktivität und geomagnetischen Indizes",
+                      fontsize=14, fontweight="bold", pad=20)
+    axes[-1].set_xlabel("Jahr", fontsize=12, fontweight="bold")
+    # automatische Jahresmarken: ihre Anzahl hängt nicht von der Länge des Zeitraums ab
+    axes[-1].xaxis.set_major_locator(mdates.AutoDateLocator(minticks=10, maxticks=25))
+    axes[-1].xaxis.set_major_formatter(mdates.DateFormatter("%Y"))
+    plt.setp(axes[-1].get_xticklabels(), rotation=45, ha="right")
+
     plt.tight_layout()
-    plt.savefig("plots/lag_correlations_kp.png", dpi=300, bbox_inches="tight")
-    print("Gespeichert: plots/lag_correlations_kp.png")
+    plt.savefig(f"{plots_dir}/timeseries_daily.png", dpi=DPI, bbox_inches="tight")
+    print(f"Gespeichert: {plots_dir}/timeseries_daily.png")
     plt.close()
 
-print("\n=== Alle Visualisierungen erstellt ===")
 
+# -------------------------
+# Plot 7: Überlagerte Epochen um Sturmbeginne
+# -------------------------
+def plot_superposed_epoch(epoch, plots_dir=PLOTS_DIR):
+    panels = [
+        ("sn", "Sunspot Number", "tab:blue"),
+        ("fluxadjflux", "F10.7 (adjusted)", "tab:orange"),
+        ("ap", "Ap Index", "tab:green"),
+    ]
+    fig, axes = plt.subplots(len(panels), 1, figsize=(12, 11), sharex=True)
+    for ax, (var, label, color) in zip(axes, panels):
+        curve = epoch[epoch["variable"] == var]
+        ax.fill_between(curve["day"], curve["q10"], curve["q90"], color=color, alpha=0.15,
+                        linewidth=0, label="10–90 %")
+        ax.fill_between(curve["day"], curve["q25"], curve["q75"], color=color, alpha=0.3,
+                        linewidth=0, label="25–75 %")
+        ax.plot(curve["day"], curve["mean"], color=color, linewidth=2, label="Mittelwert")
+        ax.plot(curve["day"], curve["median"], color=color, linewidth=1.2, linestyle="--", label="Median")
+        ax.axvline(0, color="black", linestyle="--", linewidth=1)
+        ax.set_ylabel(label, fontsize=12, fontweight="bold")
+        ax.grid(True, alpha=0.3)
+    axes[0].legend(loc="upper left", fontsize=10)
+    axes[-1].set_xlabel("Tage relativ zum Sturmbeginn", fontsize=12, fontweight="bold")
+
+    n_events = int(epoch.loc[epoch["day"] == 0, "n"].max()) if len(epoch) else 0
+    plt.suptitle(f"Überlagerte Epochen um geomagnetische Stürme ({n_events} Ereignisse)",
+                 fontsize=14, fontweight="bold")
+    plt.tight_layout()
+    plt.savefig(f"{plots_dir}/superposed_epoch.png", dpi=DPI, bbox_inches="tight")
+    print(f"Gespeichert: {plots_dir}/superposed_epoch.png")
+    plt.close()
+
+
+# -------------------------
+# Plot 8: Spektrale Kohärenz und Phase
+# -------------------------
+def plot_coherence(coherence_daily, coherence_monthly, plots_dir=PLOTS_DIR):
+    # Markierte Perioden; 128 Monate ist die Segmentlänge in spectral.NPERSEG und
+    # damit die längste aufgelöste Periode (wie in cleaning.print_summary)
+    rows = [
+        (coherence_daily, "Täglich", "Periode [Tage]", [27, 182.6, 365.25]),
+        (coherence_monthly, "Monatlich", "Periode [Monate]", [6, 12, 128]),
+    ]
+    colors = {("sn", "kp"): "tab:blue", ("sn", "ap"): "tab:green",
+              ("fluxadjflux", "kp"): "tab:orange", ("fluxadjflux", "ap"): "tab:red"}
+
+    fig, axes = plt.subplots(2, 2, figsize=(16, 10))
+    for (data, title, xlabel, periods), (ax_coh, ax_phase) in zip(rows, axes):
+        for (driver, target), pair in data.groupby(["driver", "target"], sort=False):
+            color = colors.get((driver, target))
+            label = f"{driver} ↔ {target} ({pair['n_segments'].iloc[0]} Segmente)"
+            ax_coh.plot(pair["period"], pair["coherence"], color=color, linewidth=1.2, alpha=0.8, label=label)
+            ax_coh.axhline(pair["coherence_95"].iloc[0], color=color, linestyle="--", linewidth=0.8, alpha=0.6)
+            # Phase nur dort, wo die Kohärenz die 95 %-Schwelle überschreitet
+            coherent = pair[pair["coherence"] > pair["coherence_95"]]
+            ax_phase.plot(coherent["period"], coherent["phase"], color=color, linewidth=0, marker="o",
+                          markersize=4, alpha=0.8)
+        for ax in (ax_coh, ax_phase):
+            ax.set_xscale("log")
+            for period in periods:
+                ax.axvline(period, color="gray", linestyle=":", linewidth=1)
+            ax.set_xlabel(xlabel, fontsize=12, fontweight="bold")
+            ax.grid(True, alpha=0.3)
+        ax_coh.set_ylim(0, 1)
+        ax_coh.set_ylabel("Kohärenz (MSC)", fontsize=12, fontweight="bold")
+        ax_coh.set_title(title, fontsize=12, fontweight="bold")
+        ax_coh.legend(loc="upper left", fontsize=9)
+        ax_phase.set_ylim(-180, 180)
+        ax_phase.set_yticks([-180, -90, 0, 90, 180])
+        ax_phase.set_ylabel("Phase [°]", fontsize=12, fontweight="bold")
+        ax_phase.set_title(f"{title}: Phase bei signifikanter Kohärenz (negativ = Treiber läuft voraus)",
+                           fontsize=12, fontweight="bold")
+
+    plt.suptitle("Spektrale Kohärenz: Sonnenaktivität ↔ Geomagnetische Indizes",
+                 fontsize=14, fontweight="bold")
+    plt.tight_layout()
+    plt.savefig(f"{plots_dir}/coherence.png", dpi=DPI, bbox_inches="tight")
+    print(f"Gespeichert: {plots_dir}/coherence.png")
+    plt.close()
+
+
+def load_table(path):
+    """Lädt eine Ergebnistabelle ohne Datumsspalte (None, falls nicht vorhanden)."""
+    try:
+        return pd.read_csv(path)
+    except FileNotFoundError:
+        return None
+
+
+def load_rolling(path):
+    """Lädt eine Tabelle rollender Korrelationen (None, falls nicht vorhanden)."""
+    try:
+        return pd.read_csv(path, parse_dates=["date"])
+    except FileNotFoundError:
+        return None
+
+
+# -------------------------
+# Render-Jobs
+# -------------------------
+# Name -> (Plotfunktion, benötigte Eingaben, Ausgabedatei)
+FIGURES = {
+    "timeseries": (plot_timeseries, ["master"], "timeseries_all_variables.png"),
+    "scatter": (plot_scatter, ["master"], "correlation_scatterplots.png"),
+    "heatmap": (plot_heatmap, ["master"], "correlation_heatmap.png"),
+    "lag_correlations": (plot_lag_correlations, ["master"], "lag_correlations_kp.png"),
+    "rolling_correlation": (plot_rolling_correlation, ["rolling_monthly", "rolling_daily"],
+                            "rolling_correlation.png"),
+    "timeseries_daily": (plot_timeseries_daily, ["daily"], "timeseries_daily.png"),
+    "superposed_epoch": (plot_superposed_epoch, ["epoch"], "superposed_epoch.png"),
+    "coherence": (plot_coherence, ["coherence_daily", "coherence_monthly"], "coherence.png"),
+}
+
+# Eingabe -> Loader für die Ausführung als Skript
+INPUT_LOADERS = {
+    "master": load_master,
+    "rolling_monthly": lambda: load_rolling(ROLLING_MONTHLY_PATH),
+    "rolling_daily": lambda: load_rolling(ROLLING_DAILY_PATH),
+    "daily": load_daily,
+    "epoch": lambda: load_table(EPOCH_PATH),
+    "coherence_daily": lambda: load_table(COHERENCE_DAILY_PATH),
+    "coherence_monthly": lambda: load_table(COHERENCE_MONTHLY_PATH),
+}
+
+
+def render_figure(name, inputs, plots_dir=PLOTS_DIR):
+    """Rendert eine Abbildung aus FIGURES; gibt (name, Sekunden) zurück."""
+    func, needs, _ = FIGURES[name]
+    start = time.perf_counter()
+    with instrumentation.stage(f"plot_{name}"), plt.style.context(PLOT_STYLE), plt.rc_context(PLOT_RC):
+        func(*[inputs[key] for key in needs], plots_dir)
+    return name, time.perf_counter() - start
+
+
+def data_fingerprint(df):
+    """Inhalts-Hash eines DataFrames (Werte, Index, Spaltennamen und dtypes)."""
+    h = hashlib.sha256()
+    h.update(repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _render_code():
+    """Quelltext, den Abbildungen beim Rendern durchlaufen (auch das Ausdünnen langer Reihen)."""
+    return "".join(inspect.getsource(obj) for obj in (render_figure, plot_line, downsampling))
+
+
+def figure_fingerprint(name, fingerprints):
+    """Fingerabdruck einer Abbildung: Eingabedaten, Plot-Code, Render-Code, Stil und Auflösung."""
+    func, needs, filename = FIGURES[name]
+    h = hashlib.sha256()
+    for key in needs:
+        h.update(fingerprints[key].encode())
+    h.update(inspect.getsource(func).encode())
+    h.update(_render_code().encode())
+    h.update(repr((filename, PLOT_STYLE, sorted(PLOT_RC.items()), DPI, matplotlib.__version__)).encode())
+    return h.hexdigest()
+
+
+def _read_manifest(plots_dir):
+    try:
+        with open(os.path.join(plots_dir, MANIFEST_NAME)) as fh:
+            return json.load(fh)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _write_manifest(plots_dir, manifest):
+    path = os.path.join(plots_dir, MANIFEST_NAME)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def load_inputs(figures):
+    """Lädt nur die Eingaben, die die gewählten Abbildungen brauchen."""
+    needed = {key for name in figures for key in FIGURES[name][1]}
+    return {key: INPUT_LOADERS[key]() for key in needed}
+
+
+def render_all(inputs, plots_dir=PLOTS_DIR, figures=None, parallel=True, force=False):
+    """
+    Erstellt die Abbildungen ``figures`` (Standard: alle) aus ``inputs``.
+
+    ``inputs`` ist ein dict mit den DataFrames ``master`` (monatliches
+    Master-Dataset), ``rolling_monthly``, ``rolling_daily``, ``daily``
+    (Tagesraster aus ``daily_frame``), ``epoch`` (Epochenkurven) sowie
+    ``coherence_daily`` und ``coherence_monthly`` (Kohärenzspektren). Abbildungen,
+    deren Eingaben fehlen, werden übersprungen; Abbildungen mit unverändertem
+    Fingerabdruck (siehe Manifest) werden wiederverwendet, außer bei ``force``.
+    Mit ``parallel`` laufen die Jobs in einem Prozesspool (höchstens ein
+    Prozess pro CPU).
+    """
+    figures = list(FIGURES) if figures is None else list(figures)
+    manifest = _read_manifest(plots_dir)
+    fingerprints = {key: data_fingerprint(df) for key, df in inputs.items() if df is not None}
+
+    jobs, keys, reused = [], {}, []
+    for name in figures:
+        needs, filename = FIGURES[name][1], FIGURES[name][2]
+        if not all(key in fingerprints for key in needs):
+            print(f"Übersprungen: {name} (Eingabedaten fehlen)")
+            continue
+        keys[name] = figure_fingerprint(name, fingerprints)
+        up_to_date = (
+            manifest.get(name) == keys[name]
+            and os.path.exists(os.path.join(plots_dir, filename))
+        )
+        if up_to_date and not force:
+            reused.append(name)
+        else:
+            jobs.append(name)
+
+    workers = min(len(jobs), os.cpu_count() or 1)
+    if parallel and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(render_figure, name, {k: inputs[k] for k in FIGURES[name][1]}, plots_dir)
+                for name in jobs
+            ]
+            timings = [f.result() for f in futures]
+    else:
+        timings = [render_figure(name, inputs, plots_dir) for name in jobs]
+
+    for name in jobs:
+        manifest[name] = keys[name]
+    if jobs:
+        _write_manifest(plots_dir, manifest)
+
+    for name in reused:
+        print(f"Wiederverwendet: {name} (Eingaben unverändert)")
+    for name, seconds in timings:
+        print(f"Neu erstellt:    {name:<20} {seconds:6.2f} s")
+    print("\n=== Alle Visualisierungen erstellt ===")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Visualisierung der Sonnenaktivitäts-Daten")
+    parser.add_argument("--only", nargs="+", choices=list(FIGURES), metavar="FIGURE",
+                        help=f"Nur diese Abbildungen erstellen ({', '.join(FIGURES)})")
+    parser.add_argument("--serial", action="store_true",
+                        help="Abbildungen nacheinander im selben Prozess erstellen")
+    parser.add_argument("--force", action="store_true",
+                        help="Alle Abbildungen neu rendern, auch wenn die Eingaben unverändert sind")
+    args = parser.parse_args(argv)
+
+    figures = args.only or list(FIGURES)
+    render_all(load_inputs(figures), figures=figures, parallel=not args.serial, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
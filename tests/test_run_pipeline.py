@@ -0,0 +1,65 @@
+"""
+Pipeline-Läufe mit ``run_pipeline.py --only`` auf leerem Zwischenergebnis-Cache
+
+Die Pipeline wird samt scripts/ in ein temporäres Verzeichnis kopiert und mit
+synthetischen Rohdaten (``synthetic_data.generate``) ausgeführt; das
+Repository selbst bleibt unverändert.
+
+Ausführung (vom Hauptverzeichnis):
+    python -m pytest tests
+"""
+
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "scripts"))
+
+import synthetic_data  # noqa: E402
+
+
+class OnlyStageTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.raw = Path(cls._tmp.name) / "raw"
+        synthetic_data.generate(cls.raw)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def run_only(self, stage):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            shutil.copy(ROOT / "run_pipeline.py", root)
+            shutil.copytree(ROOT / "scripts", root / "scripts",
+                            ignore=shutil.ignore_patterns("__pycache__"))
+            (root / "data" / "raw").mkdir(parents=True)
+            for name in (synthetic_data.SN_NAME, synthetic_data.F107_NAME, synthetic_data.KP_NAME):
+                shutil.copy(self.raw / name, root / "data" / "raw" / name)
+            result = subprocess.run(
+                [sys.executable, "run_pipeline.py", "--only", stage, "--no-csv", "--serial"],
+                cwd=root, capture_output=True, text=True,
+            )
+            self.assertEqual(result.returncode, 0, result.stdout[-2000:] + result.stderr[-2000:])
+            self.assertIn("PIPELINE ERFOLGREICH ABGESCHLOSSEN", result.stdout)
+            return result.stdout
+
+    def test_only_rolling(self):
+        output = self.run_only("rolling")
+        # Zusammenfassung nur aus den vorhandenen Zwischenergebnissen
+        self.assertIn("Sunspots daily:", output)
+        self.assertNotIn("Pearson-Korrelationen", output)
+
+    def test_only_spectral(self):
+        self.run_only("spectral")
+
+
+if __name__ == "__main__":
+    unittest.main()